@@ -4,108 +4,121 @@ Authentication dependencies for FastAPI routes
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import decode_token, verify_supabase_jwt
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import database
+from app.core.pubsub import notify
+from app.core.security import verify_access_token
 from app.core.supabase import supabase
 from app.schemas.common import UserRole
 
 
 security = HTTPBearer()
 
+# Authenticated profiles keyed by user id, so polling clients don't hit
+# `profiles` on every request. Await invalidate_principal() after any write
+# that changes a cached column (role, name, email, is_active, is_verified);
+# it reaches every worker's copy, not just this one.
+principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> dict:
-    """
-    Get current authenticated user from JWT token
 
-    This dependency can be used to protect routes:
-        @app.get("/protected")
-        async def protected_route(current_user: dict = Depends(get_current_user)):
-            ...
+async def get_principal(user_id: str) -> Optional[dict]:
     """
-    token = credentials.credentials
-
-    try:
-        # First try to verify as Supabase token
-        payload = verify_supabase_jwt(token)
-        user_id = payload.get("sub")
+    Load the profile fields used for authorization, served from principal_cache when fresh
 
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: user ID not found",
-            )
+    Returns a copy, so callers may modify the dict without touching the cache.
+    """
+    user_id = str(user_id)
+    principal = principal_cache.get(user_id)
 
-        # Fetch user profile from database
+    if principal is None:
         query = """
             SELECT id, role, full_name, email, is_active, is_verified
             FROM profiles
             WHERE id = :user_id
         """
 
-        from app.core.database import database
         user = await database.fetch_one(query=query, values={"user_id": user_id})
 
         if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-            )
+            return None
 
-        if not user["is_active"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Account is deactivated",
-            )
+        principal = dict(user)
+        principal_cache.set(user_id, principal)
 
-        return dict(user)
-
-    except Exception as e:
-        # If Supabase token verification fails, try our own token
-        try:
-            payload = decode_token(token)
-            user_id = payload.get("sub") or payload.get("user_id")
-
-            if not user_id:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token",
-                )
-
-            # Fetch user
-            query = """
-                SELECT id, role, full_name, email, is_active, is_verified
-                FROM profiles
-                WHERE id = :user_id
-            """
-
-            from app.core.database import database
-            user = await database.fetch_one(query=query, values={"user_id": user_id})
-
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="User not found",
-                )
-
-            if not user["is_active"]:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Account is deactivated",
-                )
-
-            return dict(user)
-
-        except Exception:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+    return dict(principal)
+
+
+async def invalidate_principal(user_id: str) -> None:
+    """
+    Drop a user's cached profile in this worker and, once the current
+    transaction commits, in every other worker
+    """
+    principal_cache.pop(str(user_id))
+    await notify(settings.principal_invalidation_channel, str(user_id))
+
+
+def on_principal_invalidated(payload: str) -> None:
+    """pg_listener handler for invalidations broadcast by other workers"""
+    principal_cache.pop(payload)
+
+
+async def authenticate_token(token: str) -> dict:
+    """
+    Resolve a bearer token to the active user it belongs to
+
+    Shared by get_current_user and transports that can't use the HTTP bearer
+    dependency (e.g. WebSocket query-string tokens).
+
+    Raises:
+        HTTPException: 401 if the token is invalid or its user is gone,
+            403 if the account is deactivated
+    """
+    payload = verify_access_token(token)
+    user_id = payload.get("sub") or payload.get("user_id")
+
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: user ID not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Fetch user profile (cached)
+    user = await get_principal(user_id)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not user["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is deactivated",
+        )
+
+    return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> dict:
+    """
+    Get current authenticated user from JWT token
+
+    This dependency can be used to protect routes:
+        @app.get("/protected")
+        async def protected_route(current_user: dict = Depends(get_current_user)):
+            ...
+    """
+    return await authenticate_token(credentials.credentials)
 
 
 async def get_current_verified_user(
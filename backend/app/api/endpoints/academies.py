@@ -5,18 +5,25 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import UUID4
 
-from app.core.database import database
+from app.core.database import database, unit_of_work
+from app.core.response_cache import CachedRoute, cached, invalidate_cache
+from app.core.responses import fast_json
 from app.api.dependencies.auth import get_current_user
+from app.services.geo_index import index_branch, unindex_branch
+from app.services.search_suggest import index_suggestion, unindex_suggestion
+from app.utils.profiles import fetch_profile, json_list, rating_summary
+from app.utils.streaming import ListAllParams, list_all
 from app.schemas.academy import (
     AcademyDetails, AcademyDetailsCreate, AcademyDetailsUpdate,
     AcademyBranch, AcademyBranchCreate, AcademyBranchUpdate,
     AcademyPool, AcademyPoolCreate, AcademyPoolUpdate,
     AcademyProgram, AcademyProgramCreate, AcademyProgramUpdate,
     AcademySwimmer, AcademySwimmerCreate, AcademySwimmerUpdate,
-    AcademyCoach, AcademyCoachCreate, AcademyCoachUpdate
+    AcademyCoach, AcademyCoachCreate, AcademyCoachUpdate,
+    AcademyProfile
 )
 
-router = APIRouter(prefix="/academies", tags=["Academies"])
+router = APIRouter(prefix="/academies", tags=["Academies"], route_class=CachedRoute)
 
 
 # ============================================
@@ -24,30 +31,25 @@ router = APIRouter(prefix="/academies", tags=["Academies"])
 # ============================================
 
 @router.get("/all", response_model=List[AcademyDetails])
-async def get_all_academies():
-    """Get all academies (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM academy_details ORDER BY created_at DESC"
-    )
-    return result
+@cached(tags=["academies"])
+@fast_json(trusted=True)
+async def get_all_academies(params: ListAllParams = Depends()):
+    """Get all academies (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("academy_details", AcademyDetails, params, key="user_id")
 
 
 @router.get("/branches/all", response_model=List[AcademyBranch])
-async def get_all_branches():
-    """Get all academy branches (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM academy_branches ORDER BY created_at DESC"
-    )
-    return result
+@fast_json(trusted=True)
+async def get_all_branches(params: ListAllParams = Depends()):
+    """Get all academy branches (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("academy_branches", AcademyBranch, params)
 
 
 @router.get("/programs/all", response_model=List[AcademyProgram])
-async def get_all_programs():
-    """Get all academy programs (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM academy_programs ORDER BY created_at DESC"
-    )
-    return result
+@fast_json(trusted=True)
+async def get_all_programs(params: ListAllParams = Depends()):
+    """Get all academy programs (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("academy_programs", AcademyProgram, params)
 
 
 # ============================================
@@ -85,6 +87,9 @@ async def create_academy_details(details: AcademyDetailsCreate, current_user: di
         **details.dict()
     })
 
+    await invalidate_cache("academies", f"academy:{current_user['id']}")
+    await index_suggestion("academy", current_user["id"], result["academy_name"], ref_id=current_user["id"])
+
     return result
 
 
@@ -106,6 +111,7 @@ async def get_my_academy_details(current_user: dict = Depends(get_current_user))
 
 
 @router.get("/details/{user_id}", response_model=AcademyDetails)
+@cached(tags=["academy:{user_id}"])
 async def get_academy_details(user_id: UUID4):
     """Get academy details by user ID (public)"""
     result = await database.fetch_one(
@@ -153,6 +159,9 @@ async def update_academy_details(details: AcademyDetailsUpdate, current_user: di
             detail="Academy details not found"
         )
 
+    await invalidate_cache("academies", f"academy:{current_user['id']}")
+    await index_suggestion("academy", current_user["id"], result["academy_name"], ref_id=current_user["id"])
+
     return result
 
 
@@ -165,10 +174,10 @@ async def create_branch(branch: AcademyBranchCreate, current_user: dict = Depend
     """Create a new academy branch"""
     query = """
         INSERT INTO academy_branches (
-            user_id, name, city, governorate, location_url,
+            user_id, name, city, governorate, location_url, latitude, longitude,
             opening_time, closing_time, operating_days, created_at, updated_at
         ) VALUES (
-            :user_id, :name, :city, :governorate, :location_url,
+            :user_id, :name, :city, :governorate, :location_url, :latitude, :longitude,
             :opening_time, :closing_time, :operating_days, NOW(), NOW()
         )
         RETURNING *
@@ -179,6 +188,10 @@ async def create_branch(branch: AcademyBranchCreate, current_user: dict = Depend
         **branch.dict()
     })
 
+    await index_suggestion("city", f"academy_branches:{result['id']}", result["city"])
+    await index_branch("academy", result)
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -263,6 +276,10 @@ async def update_branch(branch_id: UUID4, branch: AcademyBranchUpdate, current_u
         **update_fields
     })
 
+    await index_suggestion("city", f"academy_branches:{branch_id}", result["city"])
+    await index_branch("academy", result)
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -292,6 +309,10 @@ async def delete_branch(branch_id: UUID4, current_user: dict = Depends(get_curre
         {"id": str(branch_id)}
     )
 
+    await unindex_suggestion("city", f"academy_branches:{branch_id}")
+    await unindex_branch("academy", branch_id)
+    await invalidate_cache(f"academy:{current_user['id']}")
+
 
 # ============================================
 # ACADEMY POOL ENDPOINTS
@@ -329,6 +350,8 @@ async def create_pool(pool: AcademyPoolCreate, current_user: dict = Depends(get_
 
     result = await database.fetch_one(query, pool.dict())
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -387,6 +410,8 @@ async def update_pool(pool_id: UUID4, pool: AcademyPoolUpdate, current_user: dic
         **update_fields
     })
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -418,6 +443,8 @@ async def delete_pool(pool_id: UUID4, current_user: dict = Depends(get_current_u
         {"id": str(pool_id)}
     )
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
 
 # ============================================
 # ACADEMY PROGRAM ENDPOINTS
@@ -440,6 +467,8 @@ async def create_program(program: AcademyProgramCreate, current_user: dict = Dep
         **program.dict()
     })
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -524,6 +553,8 @@ async def update_program(program_id: UUID4, program: AcademyProgramUpdate, curre
         **update_fields
     })
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -553,39 +584,74 @@ async def delete_program(program_id: UUID4, current_user: dict = Depends(get_cur
         {"id": str(program_id)}
     )
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
 
 # ============================================
 # ACADEMY SWIMMER ENDPOINTS
 # ============================================
 
-@router.post("/swimmers", response_model=AcademySwimmer, status_code=status.HTTP_201_CREATED)
+@router.post("/swimmers", response_model=AcademySwimmer, status_code=status.HTTP_201_CREATED, dependencies=[Depends(unit_of_work)])
 async def create_swimmer(swimmer: AcademySwimmerCreate, current_user: dict = Depends(get_current_user)):
     """Add a new swimmer to the academy"""
-    query = """
+    values = {"user_id": current_user["id"], **swimmer.dict()}
+
+    if not swimmer.program_id:
+        return await database.fetch_one("""
+            INSERT INTO academy_swimmers (
+                user_id, swimmer_name, phone, program_id, branch_id, end_date, created_at
+            ) VALUES (
+                :user_id, :swimmer_name, :phone, :program_id, :branch_id, :end_date, NOW()
+            )
+            RETURNING *
+        """, values)
+
+    # Take a seat in the program and add the swimmer in one statement; the
+    # UPDATE's row lock keeps concurrent adds from overshooting capacity
+    values["program_id"] = str(swimmer.program_id)
+    result = await database.fetch_one("""
+        WITH program AS (
+            UPDATE academy_programs
+            SET enrolled = enrolled + 1
+            WHERE id = :program_id AND user_id = :user_id
+            AND (capacity IS NULL OR enrolled < capacity)
+            RETURNING id
+        )
         INSERT INTO academy_swimmers (
             user_id, swimmer_name, phone, program_id, branch_id, end_date, created_at
-        ) VALUES (
-            :user_id, :swimmer_name, :phone, :program_id, :branch_id, :end_date, NOW()
         )
+        SELECT :user_id, :swimmer_name, :phone, program.id, :branch_id, :end_date, NOW()
+        FROM program
         RETURNING *
-    """
+    """, values)
 
-    result = await database.fetch_one(query, {
-        "user_id": current_user["id"],
-        **swimmer.dict()
-    })
+    if not result:
+        await _raise_program_unavailable(swimmer.program_id, current_user["id"])
 
-    # Update enrolled count if program_id is provided
-    if swimmer.program_id:
-        await database.execute("""
-            UPDATE academy_programs
-            SET enrolled = enrolled + 1
-            WHERE id = :program_id
-        """, {"program_id": str(swimmer.program_id)})
+    await invalidate_cache(f"academy:{current_user['id']}")
 
     return result
 
 
+async def _raise_program_unavailable(program_id, user_id: str):
+    """Explain why a seat couldn't be taken in one of the academy's programs"""
+    program = await database.fetch_one(
+        "SELECT id FROM academy_programs WHERE id = :program_id AND user_id = :user_id",
+        {"program_id": str(program_id), "user_id": user_id}
+    )
+
+    if not program:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Program not found"
+        )
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Program is full"
+    )
+
+
 @router.get("/swimmers", response_model=List[AcademySwimmer])
 async def get_my_swimmers(current_user: dict = Depends(get_current_user)):
     """Get all swimmers for the current user's academy"""
@@ -614,7 +680,7 @@ async def get_swimmer(swimmer_id: UUID4, current_user: dict = Depends(get_curren
     return result
 
 
-@router.put("/swimmers/{swimmer_id}", response_model=AcademySwimmer)
+@router.put("/swimmers/{swimmer_id}", response_model=AcademySwimmer, dependencies=[Depends(unit_of_work)])
 async def update_swimmer(swimmer_id: UUID4, swimmer: AcademySwimmerUpdate, current_user: dict = Depends(get_current_user)):
     """Update a swimmer's information"""
     # Verify ownership
@@ -646,6 +712,22 @@ async def update_swimmer(swimmer_id: UUID4, swimmer: AcademySwimmerUpdate, curre
     # Handle program change
     old_program_id = existing["program_id"]
     new_program_id = update_fields.get("program_id")
+    program_changed = new_program_id and str(old_program_id) != str(new_program_id)
+
+    # Take the seat in the new program first so a full program fails the
+    # whole update (the unit of work rolls back)
+    if program_changed:
+        update_fields["program_id"] = str(new_program_id)
+        seat = await database.fetch_one("""
+            UPDATE academy_programs
+            SET enrolled = enrolled + 1
+            WHERE id = :program_id AND user_id = :user_id
+            AND (capacity IS NULL OR enrolled < capacity)
+            RETURNING id
+        """, {"program_id": str(new_program_id), "user_id": current_user["id"]})
+
+        if not seat:
+            await _raise_program_unavailable(new_program_id, current_user["id"])
 
     set_clause = ", ".join([f"{k} = :{k}" for k in update_fields.keys()])
     query = f"""
@@ -660,64 +742,63 @@ async def update_swimmer(swimmer_id: UUID4, swimmer: AcademySwimmerUpdate, curre
         **update_fields
     })
 
-    # Update enrolled counts if program changed
-    if new_program_id and old_program_id != new_program_id:
-        if old_program_id:
-            await database.execute("""
-                UPDATE academy_programs
-                SET enrolled = GREATEST(enrolled - 1, 0)
-                WHERE id = :program_id
-            """, {"program_id": str(old_program_id)})
-
+    # Release the seat in the old program
+    if program_changed and old_program_id:
         await database.execute("""
             UPDATE academy_programs
-            SET enrolled = enrolled + 1
+            SET enrolled = GREATEST(enrolled - 1, 0)
             WHERE id = :program_id
-        """, {"program_id": str(new_program_id)})
+        """, {"program_id": str(old_program_id)})
+
+    if program_changed:
+        await invalidate_cache(f"academy:{current_user['id']}")
 
     return result
 
 
-@router.delete("/swimmers/{swimmer_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/swimmers/{swimmer_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(unit_of_work)])
 async def delete_swimmer(swimmer_id: UUID4, current_user: dict = Depends(get_current_user)):
     """Delete a swimmer from the academy"""
-    # Verify ownership and get program_id for enrolled count update
-    existing = await database.fetch_one(
-        "SELECT user_id, program_id FROM academy_swimmers WHERE id = :id",
-        {"id": str(swimmer_id)}
-    )
+    # Delete and release the program seat in one statement
+    removed = await database.fetch_one("""
+        WITH removed AS (
+            DELETE FROM academy_swimmers
+            WHERE id = :id AND user_id = :user_id
+            RETURNING program_id
+        ), released AS (
+            UPDATE academy_programs
+            SET enrolled = GREATEST(enrolled - 1, 0)
+            WHERE id IN (SELECT program_id FROM removed)
+        )
+        SELECT program_id FROM removed
+    """, {"id": str(swimmer_id), "user_id": current_user["id"]})
 
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Swimmer not found"
+    if not removed:
+        existing = await database.fetch_one(
+            "SELECT user_id FROM academy_swimmers WHERE id = :id",
+            {"id": str(swimmer_id)}
         )
 
-    if str(existing["user_id"]) != current_user["id"]:
+        if not existing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Swimmer not found"
+            )
+
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to delete this swimmer"
         )
 
-    await database.execute(
-        "DELETE FROM academy_swimmers WHERE id = :id",
-        {"id": str(swimmer_id)}
-    )
-
-    # Update enrolled count if swimmer was in a program
-    if existing["program_id"]:
-        await database.execute("""
-            UPDATE academy_programs
-            SET enrolled = GREATEST(enrolled - 1, 0)
-            WHERE id = :program_id
-        """, {"program_id": str(existing["program_id"])})
+    if removed["program_id"]:
+        await invalidate_cache(f"academy:{current_user['id']}")
 
 
 # ============================================
 # ACADEMY COACH ENDPOINTS
 # ============================================
 
-@router.post("/coaches", response_model=AcademyCoach, status_code=status.HTTP_201_CREATED)
+@router.post("/coaches", response_model=AcademyCoach, status_code=status.HTTP_201_CREATED, dependencies=[Depends(unit_of_work)])
 async def create_coach(coach: AcademyCoachCreate, current_user: dict = Depends(get_current_user)):
     """Add a new coach to the academy"""
     query = """
@@ -743,6 +824,8 @@ async def create_coach(coach: AcademyCoachCreate, current_user: dict = Depends(g
         WHERE user_id = :user_id
     """, {"user_id": current_user["id"]})
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
@@ -827,10 +910,12 @@ async def update_coach(coach_id: UUID4, coach: AcademyCoachUpdate, current_user:
         **update_fields
     })
 
+    await invalidate_cache(f"academy:{current_user['id']}")
+
     return result
 
 
-@router.delete("/coaches/{coach_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/coaches/{coach_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(unit_of_work)])
 async def delete_coach(coach_id: UUID4, current_user: dict = Depends(get_current_user)):
     """Delete a coach from the academy"""
     # Verify ownership
@@ -862,3 +947,51 @@ async def delete_coach(coach_id: UUID4, current_user: dict = Depends(get_current
         SET total_coaches = GREATEST(total_coaches - 1, 0)
         WHERE user_id = :user_id
     """, {"user_id": current_user["id"]})
+
+    await invalidate_cache(f"academy:{current_user['id']}")
+
+
+# ============================================
+# ACADEMY PROFILE ENDPOINT
+# ============================================
+
+ACADEMY_PROFILE_QUERY = f"""
+    SELECT json_build_object(
+        'details', to_json(d),
+        'branches', {json_list('''
+            SELECT json_agg(to_jsonb(b) || jsonb_build_object('pools', COALESCE(p.pools, '[]'::jsonb))
+                            ORDER BY b.created_at DESC)
+            FROM academy_branches b
+            LEFT JOIN LATERAL (
+                SELECT jsonb_agg(ap ORDER BY ap.created_at DESC) AS pools
+                FROM academy_pools ap
+                WHERE ap.branch_id = b.id
+            ) p ON true
+            WHERE b.user_id = d.user_id
+        ''')},
+        'coaches', {json_list('''
+            SELECT json_agg(c ORDER BY c.created_at DESC)
+            FROM academy_coaches c
+            WHERE c.academy_id = d.user_id AND c.is_active = true
+        ''')},
+        'programs', {json_list('''
+            SELECT json_agg(pr ORDER BY pr.created_at DESC)
+            FROM academy_programs pr
+            WHERE pr.user_id = d.user_id
+        ''')},
+        'rating', {rating_summary("academy", "d.user_id")}
+    )::text AS profile
+    FROM academy_details d
+    WHERE d.user_id = :user_id
+"""
+
+
+@router.get("/{user_id}/profile", response_model=AcademyProfile)
+@cached(tags=["academy:{user_id}"])
+@fast_json()
+async def get_academy_profile(user_id: UUID4):
+    """
+    Get an academy's public page in one request: details, branches with
+    their pools, active coaches, programs and rating summary (public)
+    """
+    return await fetch_profile(ACADEMY_PROFILE_QUERY, user_id, "Academy details not found")
@@ -1,13 +1,15 @@
 """
 Authentication endpoints
 """
+import math
+
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, database
+from app.core.rate_limit import rate_limiter
 from app.core.security import (
-    get_password_hash,
-    verify_password,
+    password_hasher,
     create_access_token,
     create_refresh_token,
     generate_verification_token,
@@ -28,7 +30,8 @@ from app.schemas.auth import (
     EmailVerificationResponse,
     PasswordResetResponse,
 )
-from app.api.dependencies.auth import get_current_user
+from app.api.dependencies.auth import get_current_user, invalidate_principal
+from app.services.search_suggest import index_suggestion
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -58,61 +61,66 @@ async def signup(request: SignupRequest, db: AsyncSession = Depends(get_db)):
         from uuid import uuid4
         user_id = str(uuid4())
 
-        # Hash password
-        password_hash = get_password_hash(request.password)
-
-        # Create profile in database
-        profile_query = """
-            INSERT INTO profiles (
-                id, email, role, full_name, phone, governorate, city, password_hash,
-                created_at, updated_at
-            ) VALUES (
-                :id, :email, :role, :full_name, :phone, :governorate, :city, :password_hash,
-                NOW(), NOW()
+        # Hash password (before the transaction: waiting for a hashing slot
+        # mustn't hold a pooled connection)
+        password_hash = await password_hasher.hash(request.password)
+
+        async with database.transaction():
+            # Create profile in database
+            profile_query = """
+                INSERT INTO profiles (
+                    id, email, role, full_name, phone, governorate, city, password_hash,
+                    created_at, updated_at
+                ) VALUES (
+                    :id, :email, :role, :full_name, :phone, :governorate, :city, :password_hash,
+                    NOW(), NOW()
+                )
+                RETURNING id, role, full_name, email
+            """
+
+            profile = await database.fetch_one(
+                query=profile_query,
+                values={
+                    "id": user_id,
+                    "email": request.email,
+                    "role": request.role.value,
+                    "full_name": request.full_name,
+                    "phone": request.phone,
+                    "governorate": request.governorate,
+                    "city": request.city,
+                    "password_hash": password_hash,
+                }
             )
-            RETURNING id, role, full_name, email
-        """
-
-        profile = await database.fetch_one(
-            query=profile_query,
-            values={
-                "id": user_id,
-                "email": request.email,
-                "role": request.role.value,
-                "full_name": request.full_name,
-                "phone": request.phone,
-                "governorate": request.governorate,
-                "city": request.city,
-                "password_hash": password_hash,
-            }
-        )
 
-        # Create role-specific details table based on role
-        if request.role.value == "academy":
-            await database.execute(
-                "INSERT INTO academy_details (user_id, academy_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
-                {"user_id": user_id, "name": request.full_name}
-            )
-        elif request.role.value == "clinic":
-            await database.execute(
-                "INSERT INTO clinic_details (user_id, clinic_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
-                {"user_id": user_id, "name": request.full_name}
-            )
-        elif request.role.value == "online_coach":
-            await database.execute(
-                "INSERT INTO coach_details (user_id, created_at, updated_at) VALUES (:user_id, NOW(), NOW())",
-                {"user_id": user_id}
-            )
-        elif request.role.value == "event_organizer":
-            await database.execute(
-                "INSERT INTO event_organizer_details (user_id, organization_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
-                {"user_id": user_id, "name": request.full_name}
-            )
-        elif request.role.value == "store":
-            await database.execute(
-                "INSERT INTO store_details (user_id, store_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
-                {"user_id": user_id, "name": request.full_name}
-            )
+            # Create role-specific details table based on role
+            if request.role.value == "academy":
+                await database.execute(
+                    "INSERT INTO academy_details (user_id, academy_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
+                    {"user_id": user_id, "name": request.full_name}
+                )
+            elif request.role.value == "clinic":
+                await database.execute(
+                    "INSERT INTO clinic_details (user_id, clinic_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
+                    {"user_id": user_id, "name": request.full_name}
+                )
+            elif request.role.value == "online_coach":
+                await database.execute(
+                    "INSERT INTO coach_details (user_id, created_at, updated_at) VALUES (:user_id, NOW(), NOW())",
+                    {"user_id": user_id}
+                )
+            elif request.role.value == "event_organizer":
+                await database.execute(
+                    "INSERT INTO event_organizer_details (user_id, organization_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
+                    {"user_id": user_id, "name": request.full_name}
+                )
+            elif request.role.value == "store":
+                await database.execute(
+                    "INSERT INTO store_details (user_id, store_name, created_at, updated_at) VALUES (:user_id, :name, NOW(), NOW())",
+                    {"user_id": user_id, "name": request.full_name}
+                )
+
+            if request.role.value in ("academy", "clinic", "store"):
+                await index_suggestion(request.role.value, user_id, request.full_name, ref_id=user_id)
 
         # Generate JWT tokens manually (DEV MODE)
         access_token = create_access_token(data={"sub": user_id})
@@ -126,6 +134,8 @@ async def signup(request: SignupRequest, db: AsyncSession = Depends(get_db)):
             user=dict(profile)
         )
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -140,6 +150,15 @@ async def login(request: LoginRequest):
 
     Uses Supabase Auth for authentication
     """
+    # Per account, so rotating addresses doesn't buy more password guesses
+    wait = rate_limiter.check_account("login", request.email)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts for this account, please retry later",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
     try:
         # DEV MODE: Authenticate against local database
         profile_query = """
@@ -160,7 +179,7 @@ async def login(request: LoginRequest):
             )
 
         # Verify password
-        if not verify_password(request.password, profile["password_hash"]):
+        if not await password_hasher.verify(request.password, profile["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -190,6 +209,8 @@ async def login(request: LoginRequest):
             user=profile_dict
         )
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -262,6 +283,7 @@ async def verify_email(request: VerifyEmailRequest):
             "UPDATE profiles SET is_verified = true, updated_at = NOW() WHERE id = :user_id",
             {"user_id": user_id}
         )
+        await invalidate_principal(user_id)
 
         return EmailVerificationResponse(
             success=True,
@@ -331,23 +353,27 @@ async def change_password(
     Change password for authenticated user
     """
     try:
-        # Verify current password by attempting to sign in
-        try:
-            email = current_user.get("email")
-            supabase.auth.sign_in_with_password({
-                "email": email,
-                "password": request.current_password
-            })
-        except:
+        # DEV MODE: Passwords live in profiles.password_hash (see signup/login)
+        profile = await database.fetch_one(
+            "SELECT password_hash FROM profiles WHERE id = :user_id",
+            {"user_id": current_user["id"]}
+        )
+
+        if not profile or not profile["password_hash"] or not await password_hasher.verify(
+            request.current_password, profile["password_hash"]
+        ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
 
         # Update password
-        supabase.auth.update_user({
-            "password": request.new_password
-        })
+        password_hash = await password_hasher.hash(request.new_password)
+        await database.execute(
+            "UPDATE profiles SET password_hash = :password_hash, updated_at = NOW() WHERE id = :user_id",
+            {"user_id": current_user["id"], "password_hash": password_hash}
+        )
+        await invalidate_principal(current_user["id"])
 
         return PasswordResetResponse(
             success=True,
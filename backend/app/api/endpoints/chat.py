@@ -1,11 +1,14 @@
 """
 Chat and messaging endpoints
 """
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from app.core.database import database
-from app.api.dependencies.auth import get_current_user
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query, WebSocket
+from app.core.config import settings
+from app.core.database import database, unit_of_work
+from app.api.dependencies.auth import get_current_user, authenticate_token
 from app.schemas.chat import *
+from app.services.chat_realtime import chat_hub, publish_event
+from app.utils.pagination import encode_cursor, decode_timestamp_cursor
 
 router = APIRouter(prefix="/chat", tags=["Chat & Messaging"])
 
@@ -44,7 +47,7 @@ async def list_conversations(
     )
 
 
-@router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(unit_of_work)])
 async def create_conversation(
     data: ConversationCreate,
     current_user: dict = Depends(get_current_user)
@@ -77,6 +80,12 @@ async def create_conversation(
         {"participant_1_id": current_user["id"], "participant_2_id": data.participant_2_id}
     )
 
+    await publish_event(
+        "conversation.created",
+        [new_conversation["participant_1_id"], new_conversation["participant_2_id"]],
+        dict(new_conversation),
+    )
+
     return dict(new_conversation)
 
 
@@ -85,9 +94,26 @@ async def list_messages(
     conversation_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this"),
+    include_total: Optional[bool] = Query(
+        None,
+        description="Also count all messages in the conversation (default: on the first page only)",
+    ),
     current_user: dict = Depends(get_current_user)
 ):
-    """List messages in a conversation"""
+    """
+    List messages in a conversation, newest first
+
+    Use `next_cursor` as `before` to scroll back and `prev_cursor` as `after`
+    to fetch new messages. Cursor pages are served from the
+    (conversation_id, created_at, id) index, so deep pages stay as cheap as
+    the first one; `skip` is kept for older clients. `total` is only counted
+    for the first page unless include_total says otherwise.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
     # Verify user is participant
     conversation = await database.fetch_one(
         """
@@ -101,34 +127,82 @@ async def list_messages(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found or access denied")
 
-    # Fetch messages
-    query = """
-        SELECT * FROM messages
-        WHERE conversation_id = :conversation_id
-        AND is_deleted = false
-        ORDER BY created_at DESC
-        LIMIT :limit OFFSET :skip
-    """
+    # Fetch one extra row to know whether another page exists
+    params = {"conversation_id": conversation_id, "limit": limit + 1}
 
-    messages = await database.fetch_all(
-        query,
-        {"conversation_id": conversation_id, "skip": skip, "limit": limit}
-    )
+    if before or after:
+        params["cursor_created_at"], params["cursor_id"] = decode_timestamp_cursor(before or after)
 
-    count_query = """
-        SELECT COUNT(*) as count FROM messages
-        WHERE conversation_id = :conversation_id AND is_deleted = false
-    """
+    if after:
+        query = """
+            SELECT * FROM messages
+            WHERE conversation_id = :conversation_id
+            AND is_deleted = false
+            AND (created_at, id) > (:cursor_created_at, CAST(:cursor_id AS uuid))
+            ORDER BY created_at ASC, id ASC
+            LIMIT :limit
+        """
+    elif before:
+        query = """
+            SELECT * FROM messages
+            WHERE conversation_id = :conversation_id
+            AND is_deleted = false
+            AND (created_at, id) < (:cursor_created_at, CAST(:cursor_id AS uuid))
+            ORDER BY created_at DESC, id DESC
+            LIMIT :limit
+        """
+    else:
+        params["skip"] = skip
+        query = """
+            SELECT * FROM messages
+            WHERE conversation_id = :conversation_id
+            AND is_deleted = false
+            ORDER BY created_at DESC, id DESC
+            LIMIT :limit OFFSET :skip
+        """
+
+    rows = await database.fetch_all(query, params)
+    has_more = len(rows) > limit
+    messages = [dict(m) for m in rows[:limit]]
+
+    if after:
+        messages.reverse()
+
+    next_cursor = None
+    prev_cursor = None
 
-    count_result = await database.fetch_one(count_query, {"conversation_id": conversation_id})
+    if messages:
+        newest, oldest = messages[0], messages[-1]
+        prev_cursor = encode_cursor(newest["created_at"], newest["id"])
+
+        # Paging forward (after) never runs out of older messages
+        if has_more or after:
+            next_cursor = encode_cursor(oldest["created_at"], oldest["id"])
+    elif after:
+        prev_cursor = after
+
+    if include_total is None:
+        include_total = not (before or after or skip)
+
+    total = None
+    if include_total:
+        count_query = """
+            SELECT COUNT(*) as count FROM messages
+            WHERE conversation_id = :conversation_id AND is_deleted = false
+        """
+
+        count_result = await database.fetch_one(count_query, {"conversation_id": conversation_id})
+        total = count_result["count"]
 
     return MessageListResponse(
-        total=count_result["count"],
-        messages=[dict(m) for m in messages]
+        total=total,
+        messages=messages,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
 
 
-@router.post("/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(unit_of_work)])
 async def send_message(
     message: MessageCreate,
     current_user: dict = Depends(get_current_user)
@@ -167,13 +241,14 @@ async def send_message(
     )
 
     # Update conversation last message
-    await database.execute(
+    updated_conversation = await database.fetch_one(
         """
         UPDATE conversations
         SET last_message_at = NOW(),
             last_message_preview = :preview,
             updated_at = NOW()
         WHERE id = :conversation_id
+        RETURNING *
         """,
         {
             "conversation_id": message.conversation_id,
@@ -181,29 +256,77 @@ async def send_message(
         }
     )
 
+    participants = [conversation["participant_1_id"], conversation["participant_2_id"]]
+    await publish_event("message.created", participants, dict(new_message))
+    await publish_event("conversation.updated", participants, dict(updated_conversation))
+
     return dict(new_message)
 
 
-@router.put("/messages/{message_id}/read")
+@router.put("/messages/{message_id}/read", dependencies=[Depends(unit_of_work)])
 async def mark_message_read(
     message_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Mark a message as read"""
-    result = await database.execute(
+    read_message = await database.fetch_one(
         """
-        UPDATE messages
-        SET is_read = true, read_at = NOW()
-        WHERE id = :message_id
-        AND conversation_id IN (
-            SELECT id FROM conversations
-            WHERE participant_1_id = :user_id OR participant_2_id = :user_id
-        )
+        UPDATE messages m
+        SET is_read = true, read_at = COALESCE(m.read_at, NOW())
+        FROM conversations c
+        WHERE m.id = :message_id
+        AND c.id = m.conversation_id
+        AND (c.participant_1_id = :user_id OR c.participant_2_id = :user_id)
+        RETURNING m.id, m.conversation_id, m.read_at,
+                  c.participant_1_id, c.participant_2_id
         """,
         {"message_id": message_id, "user_id": current_user["id"]}
     )
 
-    if result == 0:
+    if not read_message:
         raise HTTPException(status_code=404, detail="Message not found or access denied")
 
+    await publish_event(
+        "message.read",
+        [read_message["participant_1_id"], read_message["participant_2_id"]],
+        {
+            "id": read_message["id"],
+            "conversation_id": read_message["conversation_id"],
+            "read_at": read_message["read_at"],
+            "read_by": current_user["id"],
+        },
+    )
+
     return {"success": True, "message": "Message marked as read"}
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Push chat events to the current user
+
+    Connect with `?token=<access_token>`. The server sends JSON frames
+    `{"type": ..., "data": ...}` for `message.created`, `message.read`,
+    `conversation.created` and `conversation.updated`, plus periodic
+    `{"type": "ping"}` frames; clients must send something (e.g. "ping")
+    within the idle timeout or the socket is closed. Events carrying
+    `"truncated": true` only include ids and should be refetched over HTTP.
+    """
+    if not settings.chat_ws_enabled:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Real-time chat is disabled")
+        return
+
+    try:
+        current_user = await authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    user_id = str(current_user["id"])
+
+    if chat_hub.connection_count(user_id) >= settings.chat_ws_max_connections_per_user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Too many connections")
+        return
+
+    await websocket.accept()
+    await chat_hub.serve(websocket, user_id)
@@ -6,15 +6,22 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import UUID4
 
 from app.core.database import database
+from app.core.response_cache import CachedRoute, cached, invalidate_cache
+from app.core.responses import fast_json
 from app.api.dependencies.auth import get_current_user
+from app.services.geo_index import index_branch, unindex_branch
+from app.services.search_suggest import index_suggestion, unindex_suggestion
+from app.utils.profiles import fetch_profile, json_list, rating_summary
+from app.utils.streaming import ListAllParams, list_all
 from app.schemas.clinic import (
     ClinicDetails, ClinicDetailsCreate, ClinicDetailsUpdate,
     ClinicBranch, ClinicBranchCreate, ClinicBranchUpdate,
     ClinicService, ClinicServiceCreate, ClinicServiceUpdate,
-    ClinicBooking, ClinicBookingCreate, ClinicBookingUpdate
+    ClinicBooking, ClinicBookingCreate, ClinicBookingUpdate,
+    ClinicProfile
 )
 
-router = APIRouter(prefix="/clinics", tags=["Clinics"])
+router = APIRouter(prefix="/clinics", tags=["Clinics"], route_class=CachedRoute)
 
 
 # ============================================
@@ -22,30 +29,25 @@ router = APIRouter(prefix="/clinics", tags=["Clinics"])
 # ============================================
 
 @router.get("/all", response_model=List[ClinicDetails])
-async def get_all_clinics():
-    """Get all clinics (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM clinic_details ORDER BY created_at DESC"
-    )
-    return result
+@fast_json(trusted=True)
+async def get_all_clinics(params: ListAllParams = Depends()):
+    """Get all clinics (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("clinic_details", ClinicDetails, params, key="user_id")
 
 
 @router.get("/branches/all", response_model=List[ClinicBranch])
-async def get_all_clinic_branches():
-    """Get all clinic branches (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM clinic_branches ORDER BY created_at DESC"
-    )
-    return result
+@fast_json(trusted=True)
+async def get_all_clinic_branches(params: ListAllParams = Depends()):
+    """Get all clinic branches (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("clinic_branches", ClinicBranch, params)
 
 
 @router.get("/services/all", response_model=List[ClinicService])
-async def get_all_clinic_services():
-    """Get all clinic services (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM clinic_services ORDER BY created_at DESC"
-    )
-    return result
+@cached(tags=["clinic_services"])
+@fast_json(trusted=True)
+async def get_all_clinic_services(params: ListAllParams = Depends()):
+    """Get all clinic services (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("clinic_services", ClinicService, params)
 
 
 # ============================================
@@ -83,6 +85,9 @@ async def create_clinic_details(details: ClinicDetailsCreate, current_user: dict
         **details.dict()
     })
 
+    await invalidate_cache(f"clinic:{current_user['id']}")
+    await index_suggestion("clinic", current_user["id"], result["clinic_name"], ref_id=current_user["id"])
+
     return result
 
 
@@ -150,6 +155,9 @@ async def update_clinic_details(details: ClinicDetailsUpdate, current_user: dict
             detail="Clinic details not found"
         )
 
+    await invalidate_cache(f"clinic:{current_user['id']}")
+    await index_suggestion("clinic", current_user["id"], result["clinic_name"], ref_id=current_user["id"])
+
     return result
 
 
@@ -162,12 +170,12 @@ async def create_branch(branch: ClinicBranchCreate, current_user: dict = Depends
     """Create a new clinic branch"""
     query = """
         INSERT INTO clinic_branches (
-            user_id, location_name, governorate, city, location_url,
+            user_id, location_name, governorate, city, location_url, latitude, longitude,
             number_of_beds, opening_hour, opening_minute, opening_ampm,
             closing_hour, closing_minute, closing_ampm, services_offered,
             created_at, updated_at
         ) VALUES (
-            :user_id, :location_name, :governorate, :city, :location_url,
+            :user_id, :location_name, :governorate, :city, :location_url, :latitude, :longitude,
             :number_of_beds, :opening_hour, :opening_minute, :opening_ampm,
             :closing_hour, :closing_minute, :closing_ampm, :services_offered,
             NOW(), NOW()
@@ -180,6 +188,10 @@ async def create_branch(branch: ClinicBranchCreate, current_user: dict = Depends
         **branch.dict()
     })
 
+    await index_suggestion("city", f"clinic_branches:{result['id']}", result["city"])
+    await index_branch("clinic", result)
+    await invalidate_cache(f"clinic:{current_user['id']}")
+
     return result
 
 
@@ -264,6 +276,10 @@ async def update_branch(branch_id: UUID4, branch: ClinicBranchUpdate, current_us
         **update_fields
     })
 
+    await index_suggestion("city", f"clinic_branches:{branch_id}", result["city"])
+    await index_branch("clinic", result)
+    await invalidate_cache(f"clinic:{current_user['id']}")
+
     return result
 
 
@@ -293,6 +309,10 @@ async def delete_branch(branch_id: UUID4, current_user: dict = Depends(get_curre
         {"id": str(branch_id)}
     )
 
+    await unindex_suggestion("city", f"clinic_branches:{branch_id}")
+    await unindex_branch("clinic", branch_id)
+    await invalidate_cache(f"clinic:{current_user['id']}")
+
 
 # ============================================
 # CLINIC SERVICE ENDPOINTS
@@ -317,6 +337,8 @@ async def create_service(service: ClinicServiceCreate, current_user: dict = Depe
         **service.dict()
     })
 
+    await invalidate_cache("clinic_services", f"clinic:{current_user['id']}")
+
     return result
 
 
@@ -401,6 +423,8 @@ async def update_service(service_id: UUID4, service: ClinicServiceUpdate, curren
         **update_fields
     })
 
+    await invalidate_cache("clinic_services", f"clinic:{current_user['id']}")
+
     return result
 
 
@@ -430,6 +454,8 @@ async def delete_service(service_id: UUID4, current_user: dict = Depends(get_cur
         {"id": str(service_id)}
     )
 
+    await invalidate_cache("clinic_services", f"clinic:{current_user['id']}")
+
 
 # ============================================
 # CLINIC BOOKING ENDPOINTS
@@ -608,3 +634,38 @@ async def delete_booking(booking_id: UUID4, current_user: dict = Depends(get_cur
         "DELETE FROM clinic_bookings WHERE id = :id",
         {"id": str(booking_id)}
     )
+
+
+# ============================================
+# CLINIC PROFILE ENDPOINT
+# ============================================
+
+CLINIC_PROFILE_QUERY = f"""
+    SELECT json_build_object(
+        'details', to_json(d),
+        'branches', {json_list('''
+            SELECT json_agg(b ORDER BY b.created_at DESC)
+            FROM clinic_branches b
+            WHERE b.user_id = d.user_id
+        ''')},
+        'services', {json_list('''
+            SELECT json_agg(s ORDER BY s.created_at DESC)
+            FROM clinic_services s
+            WHERE s.user_id = d.user_id
+        ''')},
+        'rating', {rating_summary("clinic", "d.user_id")}
+    )::text AS profile
+    FROM clinic_details d
+    WHERE d.user_id = :user_id
+"""
+
+
+@router.get("/{user_id}/profile", response_model=ClinicProfile)
+@cached(tags=["clinic:{user_id}"])
+@fast_json()
+async def get_clinic_profile(user_id: UUID4):
+    """
+    Get a clinic's public page in one request: details, branches, services
+    and rating summary (public)
+    """
+    return await fetch_profile(CLINIC_PROFILE_QUERY, user_id, "Clinic details not found")
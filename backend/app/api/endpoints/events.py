@@ -3,14 +3,18 @@ Event management endpoints
 """
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from app.core.database import database
+from app.core.database import database, unit_of_work
+from app.core.response_cache import CachedRoute, cached, invalidate_cache
+from app.core.responses import fast_json
 from app.api.dependencies.auth import get_current_user, require_event_organizer, get_current_user_optional
 from app.schemas.event import *
 
-router = APIRouter(prefix="/events", tags=["Events"])
+router = APIRouter(prefix="/events", tags=["Events"], route_class=CachedRoute)
 
 
 @router.get("", response_model=EventListResponse)
+@cached(tags=["events"])
+@fast_json()
 async def list_events(
     event_type: Optional[EventType] = None,
     organizer_id: Optional[str] = None,
@@ -151,6 +155,7 @@ async def create_event(
     values["organizer_id"] = current_user["id"]
 
     new_event = await database.fetch_one(query=query, values=values)
+    await invalidate_cache("events")
     return dict(new_event)
 
 
@@ -178,6 +183,7 @@ async def update_event(
     update_data["event_id"] = event_id
 
     updated_event = await database.fetch_one(query=query, values=update_data)
+    await invalidate_cache("events")
     return dict(updated_event)
 
 
@@ -195,6 +201,8 @@ async def delete_event(
     if result == 0:
         raise HTTPException(status_code=404, detail="Event not found or access denied")
 
+    await invalidate_cache("events")
+
 
 @router.get("/{event_id}/registrations", response_model=List[EventRegistrationResponse])
 async def get_event_registrations(
@@ -224,52 +232,67 @@ async def get_event_registrations(
     return [dict(r) for r in registrations]
 
 
-@router.post("/{event_id}/register", response_model=EventRegistrationResponse)
+@router.post("/{event_id}/register", response_model=EventRegistrationResponse, dependencies=[Depends(unit_of_work)])
 async def register_for_event(
     event_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Register for an event"""
-    # Check if event exists
-    event = await database.fetch_one(
-        "SELECT * FROM events WHERE id = :event_id AND is_active = true",
-        {"event_id": event_id}
+    # Claim a spot and create the registration in one statement (see
+    # programs.enroll_in_program for how this stays exact under concurrency)
+    result = await database.fetch_one(
+        """
+        WITH event AS (
+            UPDATE events
+            SET current_participants = current_participants + 1
+            WHERE id = :event_id AND is_active = true
+            AND (max_participants IS NULL OR current_participants < max_participants)
+            RETURNING id, registration_fee
+        ), registration AS (
+            INSERT INTO event_registrations (
+                event_id, user_id, amount_paid, created_at, updated_at
+            )
+            SELECT event.id, :user_id, event.registration_fee, NOW(), NOW()
+            FROM event
+            ON CONFLICT (event_id, user_id) DO NOTHING
+            RETURNING *
+        )
+        SELECT registration.*, EXISTS (SELECT 1 FROM event) AS spot_claimed
+        FROM (SELECT 1) AS one
+        LEFT JOIN registration ON true
+        """,
+        {"event_id": event_id, "user_id": current_user["id"]}
     )
 
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
+    if result["id"] is None:
+        # Already registered: raising rolls the counter bump back
+        if result["spot_claimed"]:
+            raise HTTPException(status_code=400, detail="Already registered for this event")
 
-    # Check if already registered
-    existing = await database.fetch_one(
-        "SELECT * FROM event_registrations WHERE event_id = :event_id AND user_id = :user_id AND is_cancelled = false",
-        {"event_id": event_id, "user_id": current_user["id"]}
-    )
+        event = await database.fetch_one(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM event_registrations
+                WHERE event_id = :event_id AND user_id = :user_id
+            ) AS registered
+            FROM events
+            WHERE id = :event_id AND is_active = true
+            """,
+            {"event_id": event_id, "user_id": current_user["id"]}
+        )
 
-    if existing:
-        raise HTTPException(status_code=400, detail="Already registered for this event")
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
 
-    # Create registration
-    query = """
-        INSERT INTO event_registrations (
-            event_id, user_id, amount_paid, created_at, updated_at
-        ) VALUES (
-            :event_id, :user_id, :amount_paid, NOW(), NOW()
-        ) RETURNING *
-    """
+        if event["registered"]:
+            raise HTTPException(status_code=400, detail="Already registered for this event")
 
-    new_registration = await database.fetch_one(
-        query=query,
-        values={
-            "event_id": event_id,
-            "user_id": current_user["id"],
-            "amount_paid": event["registration_fee"]
-        }
-    )
+        raise HTTPException(status_code=409, detail="Event is full")
 
-    # Update event participant count
-    await database.execute(
-        "UPDATE events SET current_participants = current_participants + 1 WHERE id = :event_id",
-        {"event_id": event_id}
-    )
+    new_registration = dict(result)
+    new_registration.pop("spot_claimed")
+
+    # current_participants is part of the public listing
+    await invalidate_cache("events")
 
-    return dict(new_registration)
+    return new_registration
@@ -0,0 +1,268 @@
+"""
+Media upload endpoints
+"""
+import asyncio
+import mimetypes
+from typing import Dict, List, Tuple
+from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile
+
+from app.core.config import settings
+from app.core.media_objects import MediaNotOwned, dedupe_key, media_objects, object_paths
+from app.core.storage import StorageError, content_digest, media_storage
+from app.api.dependencies.auth import get_current_user
+from app.schemas.common import SuccessResponse
+from app.schemas.media import ImageVariant, MediaBucket, UploadedMedia
+from app.services.image_pipeline import image_pipeline, variant_paths, variant_urls
+
+router = APIRouter(prefix="/media", tags=["Media"])
+
+MAX_FILES_PER_REQUEST = 10
+
+# Stored as thumb/medium/large variants; the rest as uploaded
+PROCESSED_BUCKETS = set(MediaBucket) - {MediaBucket.MESSAGE_ATTACHMENTS}
+
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp"}
+
+
+def _extension(content_type: str) -> str:
+    return EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ""
+
+
+def _from_row(bucket: MediaBucket, row) -> UploadedMedia:
+    """The response entry for an upload that reused an already stored object"""
+    # Only the caller's own earlier uploads are reported: a hit on someone
+    # else's content must not tell them it exists
+    variants = None
+    if row["variants"]:
+        paths = variant_urls(row["path"])
+        variants = {
+            name: ImageVariant(
+                url=media_storage.public_url(bucket.value, paths[name]["url"]),
+                webp=media_storage.public_url(bucket.value, paths[name]["webp"]),
+                width=row["variants"][name]["width"],
+                height=row["variants"][name]["height"],
+            )
+            for name in paths
+        }
+
+    return UploadedMedia(
+        bucket=bucket,
+        path=row["path"],
+        url=media_storage.public_url(bucket.value, row["path"]),
+        content_type=row["content_type"],
+        size=row["size"],
+        variants=variants,
+        deduplicated=row["owned"],
+    )
+
+
+async def _render(bucket: MediaBucket, stem: str, file: UploadFile) -> Tuple[UploadedMedia, List[tuple]]:
+    """The response entry for one upload and the (path, body, content type) objects to store for it"""
+    if bucket not in PROCESSED_BUCKETS:
+        path = f"{stem}{_extension(file.content_type)}"
+        media = UploadedMedia(
+            bucket=bucket,
+            path=path,
+            url=media_storage.public_url(bucket.value, path),
+            content_type=file.content_type,
+            size=file.size or 0,
+        )
+        return media, [(path, file, file.content_type)]
+
+    # Decoding needs the whole image; Starlette has it spooled already
+    await file.seek(0)
+    data = await file.read()
+    if len(data) > settings.max_file_size_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"{file.filename}: exceeds the {settings.max_file_size_mb} MB limit",
+        )
+    rendered = await image_pipeline.process(data)
+
+    extension = rendered["extension"]
+    content_type = "image/png" if extension == "png" else "image/jpeg"
+    paths = variant_paths(stem, extension)
+
+    objects = []
+    variants = {}
+    for name, variant in rendered["variants"].items():
+        objects.append((paths[name]["url"], variant["main"], content_type))
+        objects.append((paths[name]["webp"], variant["webp"], "image/webp"))
+        variants[name] = ImageVariant(
+            url=media_storage.public_url(bucket.value, paths[name]["url"]),
+            webp=media_storage.public_url(bucket.value, paths[name]["webp"]),
+            width=variant["width"],
+            height=variant["height"],
+        )
+
+    media = UploadedMedia(
+        bucket=bucket,
+        path=paths["large"]["url"],
+        url=variants["large"].url,
+        content_type=content_type,
+        size=len(rendered["variants"]["large"]["main"]),
+        variants=variants,
+    )
+    return media, objects
+
+
+async def _store(bucket: MediaBucket, objects: List[tuple]) -> None:
+    """
+    Upload (path, body, content type) objects of reserved uploads
+
+    Everything is sent concurrently; a failure is raised once all uploads
+    have finished. Whatever did get stored is left to the caller's
+    release() of its references.
+    """
+    # Same content under the same name, so overwriting a concurrent upload is harmless
+    results = await asyncio.gather(
+        *(
+            media_storage.upload(bucket.value, path, body, content_type, upsert=True)
+            for path, body, content_type in objects
+        ),
+        return_exceptions=True,
+    )
+
+    failed = [result for result in results if isinstance(result, BaseException)]
+    if failed:
+        error = failed[0]
+        if isinstance(error, StorageError):
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(error))
+        raise error
+
+
+@router.post("/{bucket}", response_model=List[UploadedMedia], status_code=status.HTTP_201_CREATED)
+async def upload_media(
+    bucket: MediaBucket,
+    files: List[UploadFile] = File(..., description=f"Up to {MAX_FILES_PER_REQUEST} images"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Upload images to a storage bucket and get back their public URLs
+
+    Files are stored under the SHA-256 of their content: a photo that is
+    already stored (by anyone) is not stored again, the upload just takes a
+    reference to it. Message attachments are only shared with your own
+    earlier uploads of the same file. deduplicated is true when you had
+    already uploaded the same file yourself. Photos are stored as
+    <hash>_<size>.jpg|.webp in thumb (200 px), medium (800 px) and large
+    (1600 px) sizes with EXIF removed; url is the large JPEG (PNG if the
+    image has transparency). Message attachments are stored as uploaded.
+    Everything is sent to storage concurrently (within the worker's upload
+    limit); if any file fails, nothing is kept (other than what a concurrent
+    upload of the same content still holds).
+    """
+    if len(files) > MAX_FILES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FILES_PER_REQUEST} files per upload")
+
+    allowed = settings.allowed_image_types_list
+    for file in files:
+        if file.content_type not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"{file.filename}: unsupported type {file.content_type} (allowed: {', '.join(allowed)})",
+            )
+        if file.size is not None and file.size > settings.max_file_size_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"{file.filename}: exceeds the {settings.max_file_size_mb} MB limit",
+            )
+
+    owner_id = str(current_user["id"])
+    hashes = [dedupe_key(bucket.value, (await content_digest(file))[0], owner_id) for file in files]
+
+    # Content already stored: take a reference instead of uploading it again
+    reused: Dict[int, UploadedMedia] = {}
+    new: Dict[str, UploadFile] = {}
+    for index, (content_hash, file) in enumerate(zip(hashes, files)):
+        row = await media_objects.acquire(bucket.value, content_hash, owner_id)
+        if row is not None:
+            reused[index] = _from_row(bucket, row)
+        else:
+            new.setdefault(content_hash, file)
+
+    # References this request holds, by path
+    held = [media.path for media in reused.values()]
+    stored: Dict[str, UploadedMedia] = {}
+    try:
+        rendered = dict(zip(new, await asyncio.gather(
+            *(_render(bucket, content_hash, file) for content_hash, file in new.items())
+        )))
+
+        # Reserve every new file's row before sending anything, so a failed
+        # upload only removes objects nobody else has reserved meanwhile
+        uploads: Dict[str, List[tuple]] = {}
+        for index, content_hash in enumerate(hashes):
+            if index in reused:
+                continue
+            media, objects = rendered[content_hash]
+            row = await media_objects.reserve(
+                bucket.value,
+                content_hash,
+                media.path,
+                media.content_type,
+                media.size,
+                {name: {"width": v.width, "height": v.height} for name, v in media.variants.items()}
+                if media.variants else None,
+                owner_id,
+            )
+            held.append(row["path"])
+            if content_hash in stored:
+                continue
+            if row["stored"]:
+                # Stored by a concurrent upload since acquire() missed
+                stored[content_hash] = _from_row(bucket, row)
+                continue
+            if row["path"] != media.path:
+                # Reserved first under another name (upload_file() keeps the caller's extension)
+                # and stores the file as uploaded: do the same
+                file = new[content_hash]
+                media = _from_row(bucket, row)
+                objects = [(row["path"], file, row["content_type"])]
+            stored[content_hash] = media
+            uploads[content_hash] = objects
+
+        await _store(bucket, [obj for objects in uploads.values() for obj in objects])
+        for content_hash in uploads:
+            await media_objects.mark_stored(bucket.value, content_hash)
+    except Exception:
+        # Give back every reference this request took; objects go only with the last one
+        for path in held:
+            try:
+                await media_objects.release(bucket.value, path, owner_id)
+            except (MediaNotOwned, StorageError) as e:
+                print(f"⚠️  Could not release {bucket.value}/{path}: {e}")
+        raise
+
+    return [reused[index] if index in reused else stored[content_hash] for index, content_hash in enumerate(hashes)]
+
+
+@router.delete("/{bucket}/{path:path}", response_model=SuccessResponse)
+async def delete_media(
+    bucket: MediaBucket,
+    path: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Delete a file you uploaded (for a processed photo, pass its large path)
+
+    Drops your reference to it; the file (every size, for a photo) is removed
+    from storage once nobody else has uploaded the same content.
+    """
+    try:
+        removed = await media_objects.release(bucket.value, path, str(current_user["id"]))
+    except MediaNotOwned:
+        raise HTTPException(status_code=403, detail="You can only delete your own files")
+    except StorageError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+
+    if removed is None:
+        # Uploaded before deduplication, under <user id>/
+        if not path.startswith(f"{current_user['id']}/"):
+            raise HTTPException(status_code=403, detail="You can only delete your own files")
+        try:
+            await media_storage.delete(bucket.value, object_paths(path))
+        except StorageError as e:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+
+    return SuccessResponse(message="File deleted")
@@ -0,0 +1,33 @@
+"""
+Nearby branches API endpoints
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Query
+
+from app.schemas.search import BranchType, NearbyBranch
+from app.services.geo_index import geo_index, local_now
+
+router = APIRouter(prefix="/nearby", tags=["Search"])
+
+
+@router.get("", response_model=List[NearbyBranch])
+async def find_nearby_branches(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=100),
+    type: Optional[List[BranchType]] = Query(None, description="Only these kinds of branch"),
+    open_now: bool = Query(False, description="Only branches whose opening hours say they are open now"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    The nearest academy, clinic and store branches to a point, closest first (public)
+
+    Only branches with coordinates on file are considered. Served from each
+    worker's in-memory grid index; no database query is made.
+    """
+    return geo_index.nearest(
+        lat, lng, radius_km, limit,
+        kinds=[t.value for t in type] if type else None,
+        now=local_now(),
+        open_only=open_now,
+    )
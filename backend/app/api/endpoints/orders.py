@@ -3,7 +3,7 @@ Order management endpoints
 """
 from typing import List
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from app.core.database import database
+from app.core.database import database, unit_of_work
 from app.api.dependencies.auth import get_current_user, require_store
 from app.schemas.order import *
 import uuid
@@ -67,7 +67,7 @@ async def get_order(
     return order_dict
 
 
-@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(unit_of_work)])
 async def create_order(
     order_data: OrderCreate,
     current_user: dict = Depends(get_current_user)
@@ -79,13 +79,20 @@ async def create_order(
     # Generate order number
     order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
 
+    # Fetch every product in the order in one round trip
+    product_rows = await database.fetch_all(
+        """
+        SELECT id, product_name, brand, price FROM products
+        WHERE id = ANY(CAST(:product_ids AS uuid[]))
+        """,
+        {"product_ids": list({str(item.product_id) for item in order_data.items})}
+    )
+    products = {str(p["id"]): p for p in product_rows}
+
     # Calculate totals
     subtotal = 0
     for item in order_data.items:
-        product = await database.fetch_one(
-            "SELECT price FROM products WHERE id = :product_id",
-            {"product_id": item.product_id}
-        )
+        product = products.get(str(item.product_id))
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
 
@@ -95,17 +102,23 @@ async def create_order(
     service_fee = subtotal * 0.05  # 5% service fee
     delivery_fee = 50.0  # Fixed delivery fee
 
-    # Apply promo code if provided
+    # Apply promo code if provided. Validation and the use count increment are
+    # one statement, so concurrent orders can't overshoot max_uses.
     discount_amount = 0
+    promo = None
     if order_data.promo_code:
         promo = await database.fetch_one(
             """
-            SELECT * FROM promo_codes
+            UPDATE promo_codes
+            SET current_uses = COALESCE(current_uses, 0) + 1, updated_at = NOW()
             WHERE code = :code AND is_active = true
+            AND (valid_from IS NULL OR valid_from <= NOW())
             AND (valid_until IS NULL OR valid_until > NOW())
             AND (max_uses IS NULL OR current_uses < max_uses)
+            AND (minimum_order_amount IS NULL OR minimum_order_amount <= :subtotal)
+            RETURNING id, discount_percentage, discount_fixed_amount
             """,
-            {"code": order_data.promo_code}
+            {"code": order_data.promo_code, "subtotal": subtotal}
         )
 
         if promo:
@@ -156,37 +169,54 @@ async def create_order(
         }
     )
 
-    # Create order items
-    for item in order_data.items:
-        product = await database.fetch_one(
-            "SELECT * FROM products WHERE id = :product_id",
-            {"product_id": item.product_id}
-        )
+    # Create all order items in a single statement, one array per column
+    lines = [(item, products[str(item.product_id)]) for item in order_data.items]
 
-        item_subtotal = float(product["price"]) * item.quantity
+    await database.execute(
+        """
+        INSERT INTO order_items (
+            order_id, product_id, product_name, product_brand,
+            selected_size, selected_color, unit_price, quantity, subtotal,
+            created_at
+        )
+        SELECT
+            :order_id, i.product_id, i.product_name, i.product_brand,
+            i.selected_size, i.selected_color, i.unit_price, i.quantity, i.subtotal,
+            NOW()
+        FROM unnest(
+            CAST(:product_ids AS uuid[]), CAST(:product_names AS text[]),
+            CAST(:product_brands AS text[]), CAST(:selected_sizes AS text[]),
+            CAST(:selected_colors AS text[]), CAST(:unit_prices AS numeric[]),
+            CAST(:quantities AS integer[]), CAST(:subtotals AS numeric[])
+        ) AS i(
+            product_id, product_name, product_brand, selected_size,
+            selected_color, unit_price, quantity, subtotal
+        )
+        """,
+        {
+            "order_id": new_order["id"],
+            "product_ids": [str(product["id"]) for _, product in lines],
+            "product_names": [product["product_name"] for _, product in lines],
+            "product_brands": [product["brand"] for _, product in lines],
+            "selected_sizes": [item.selected_size for item, _ in lines],
+            "selected_colors": [item.selected_color for item, _ in lines],
+            "unit_prices": [product["price"] for _, product in lines],
+            "quantities": [item.quantity for item, _ in lines],
+            "subtotals": [product["price"] * item.quantity for item, product in lines],
+        }
+    )
 
+    if promo:
         await database.execute(
             """
-            INSERT INTO order_items (
-                order_id, product_id, product_name, product_brand,
-                selected_size, selected_color, unit_price, quantity, subtotal,
-                created_at
-            ) VALUES (
-                :order_id, :product_id, :product_name, :product_brand,
-                :selected_size, :selected_color, :unit_price, :quantity, :subtotal,
-                NOW()
-            )
+            INSERT INTO promo_code_usage (promo_code_id, user_id, order_id, discount_applied)
+            VALUES (:promo_code_id, :user_id, :order_id, :discount_applied)
             """,
             {
+                "promo_code_id": promo["id"],
+                "user_id": current_user["id"],
                 "order_id": new_order["id"],
-                "product_id": product["id"],
-                "product_name": product["product_name"],
-                "product_brand": product["brand"],
-                "selected_size": item.selected_size,
-                "selected_color": item.selected_color,
-                "unit_price": product["price"],
-                "quantity": item.quantity,
-                "subtotal": item_subtotal
+                "discount_applied": discount_amount,
             }
         )
 
@@ -4,14 +4,20 @@ Product, cart, and marketplace endpoints
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from app.core.database import database
+from app.core.response_cache import CachedRoute, cached, invalidate_cache
+from app.core.responses import fast_json
 from app.api.dependencies.auth import get_current_user, require_store, get_current_user_optional
+from app.services.image_pipeline import photo_variants_json
+from app.services.search_suggest import index_suggestion, unindex_suggestion
 from app.schemas.product import *
 from app.schemas.common import UserRole
 
-router = APIRouter(prefix="/products", tags=["Products & Marketplace"])
+router = APIRouter(prefix="/products", tags=["Products & Marketplace"], route_class=CachedRoute)
 
 
 @router.get("", response_model=ProductListResponse)
+@cached(tags=["products"])
+@fast_json()
 async def list_products(
     category: Optional[ProductCategory] = None,
     store_id: Optional[str] = None,
@@ -87,19 +93,22 @@ async def create_product(
     query = """
         INSERT INTO products (
             store_id, product_name, category, brand, description, price, currency,
-            discount_percentage, photos, intro_video_url, available_colors,
+            discount_percentage, photos, photo_variants, intro_video_url, available_colors,
             available_sizes, total_stock, created_at, updated_at
         ) VALUES (
             :store_id, :product_name, :category, :brand, :description, :price, :currency,
-            :discount_percentage, :photos, :intro_video_url, :available_colors,
+            :discount_percentage, :photos, CAST(:photo_variants AS jsonb), :intro_video_url, :available_colors,
             :available_sizes, :total_stock, NOW(), NOW()
         ) RETURNING *
     """
 
     values = product.dict()
     values["store_id"] = current_user["id"]
+    values["photo_variants"] = photo_variants_json(values["photos"] or [])
 
     new_product = await database.fetch_one(query=query, values=values)
+    await invalidate_cache("products")
+    await index_suggestion("brand", f"products:{new_product['id']}", new_product["brand"])
     return dict(new_product)
 
 
@@ -137,10 +146,15 @@ async def update_product(
         return dict(existing)
 
     set_clause = ", ".join([f"{key} = :{key}" for key in update_data.keys()])
+    if "photos" in update_data:
+        set_clause += ", photo_variants = CAST(:photo_variants AS jsonb)"
+        update_data["photo_variants"] = photo_variants_json(update_data["photos"] or [])
     query = f"UPDATE products SET {set_clause}, updated_at = NOW() WHERE id = :product_id RETURNING *"
     update_data["product_id"] = product_id
 
     updated_product = await database.fetch_one(query=query, values=update_data)
+    await invalidate_cache("products")
+    await index_suggestion("brand", f"products:{updated_product['id']}", updated_product["brand"])
     return dict(updated_product)
 
 
@@ -158,6 +172,9 @@ async def delete_product(
     if result == 0:
         raise HTTPException(status_code=404, detail="Product not found or access denied")
 
+    await invalidate_cache("products")
+    await unindex_suggestion("brand", f"products:{product_id.lower()}")
+
 
 # ==================== CART ====================
 
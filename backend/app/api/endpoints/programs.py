@@ -1,9 +1,11 @@
 """
 Program management endpoints (Academies & Coaches)
 """
+from datetime import date
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from app.core.database import database
+from app.core.database import database, unit_of_work
+from app.core.responses import FastJSONRoute, fast_json
 from app.api.dependencies.auth import get_current_user, require_provider, get_current_user_optional
 from app.schemas.program import (
     ProgramCreate, ProgramUpdate, ProgramResponse,
@@ -12,10 +14,11 @@ from app.schemas.program import (
 )
 from app.schemas.common import UserRole
 
-router = APIRouter(prefix="/programs", tags=["Programs"])
+router = APIRouter(prefix="/programs", tags=["Programs"], route_class=FastJSONRoute)
 
 
 @router.get("", response_model=ProgramListResponse)
+@fast_json()
 async def list_programs(
     category: Optional[ProgramCategory] = None,
     provider_type: Optional[UserRole] = None,
@@ -183,7 +186,7 @@ async def delete_program(
         raise HTTPException(status_code=404, detail="Program not found or access denied")
 
 
-@router.post("/{program_id}/enroll", response_model=ProgramEnrollmentResponse)
+@router.post("/{program_id}/enroll", response_model=ProgramEnrollmentResponse, dependencies=[Depends(unit_of_work)])
 async def enroll_in_program(
     program_id: str,
     enrollment: ProgramEnrollmentCreate,
@@ -193,50 +196,74 @@ async def enroll_in_program(
     if current_user["role"] != UserRole.SWIMMER.value:
         raise HTTPException(status_code=403, detail="Only swimmers can enroll in programs")
 
-    # Check if program exists
-    program = await database.fetch_one(
-        "SELECT * FROM programs WHERE id = :program_id AND is_active = true",
-        {"program_id": program_id}
+    try:
+        start_date = date.fromisoformat(enrollment.start_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date must be a date (YYYY-MM-DD)")
+
+    # Claim a seat and create the enrollment in one statement. The UPDATE's
+    # row lock serializes concurrent enrollments, so the capacity check and
+    # the counter bump can't race.
+    result = await database.fetch_one(
+        """
+        WITH program AS (
+            UPDATE programs
+            SET current_participants = current_participants + 1,
+                total_enrollments = total_enrollments + 1
+            WHERE id = :program_id AND is_active = true
+            AND (max_participants IS NULL OR current_participants < max_participants)
+            RETURNING id, price
+        ), enrollment AS (
+            INSERT INTO program_enrollments (
+                swimmer_id, program_id, start_date, amount_paid, created_at, updated_at
+            )
+            SELECT :swimmer_id, program.id, :start_date, program.price, NOW(), NOW()
+            FROM program
+            ON CONFLICT (swimmer_id, program_id) DO NOTHING
+            RETURNING *
+        )
+        SELECT enrollment.*, EXISTS (SELECT 1 FROM program) AS seat_claimed
+        FROM (SELECT 1) AS one
+        LEFT JOIN enrollment ON true
+        """,
+        {
+            "swimmer_id": current_user["id"],
+            "program_id": program_id,
+            "start_date": start_date,
+        }
     )
 
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
-
-    # Check if already enrolled
-    existing = await database.fetch_one(
-        "SELECT * FROM program_enrollments WHERE swimmer_id = :swimmer_id AND program_id = :program_id AND is_active = true",
-        {"swimmer_id": current_user["id"], "program_id": program_id}
-    )
+    if result["id"] is None:
+        # A seat was claimed but the swimmer is already enrolled: raising
+        # rolls the counter bump back with the rest of the unit of work
+        if result["seat_claimed"]:
+            raise HTTPException(status_code=400, detail="Already enrolled in this program")
+
+        # Nothing claimed: one more query to say why
+        program = await database.fetch_one(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM program_enrollments
+                WHERE swimmer_id = :swimmer_id AND program_id = :program_id
+            ) AS enrolled
+            FROM programs
+            WHERE id = :program_id AND is_active = true
+            """,
+            {"swimmer_id": current_user["id"], "program_id": program_id}
+        )
 
-    if existing:
-        raise HTTPException(status_code=400, detail="Already enrolled in this program")
+        if not program:
+            raise HTTPException(status_code=404, detail="Program not found")
 
-    # Create enrollment
-    query = """
-        INSERT INTO program_enrollments (
-            swimmer_id, program_id, start_date, amount_paid, created_at, updated_at
-        ) VALUES (
-            :swimmer_id, :program_id, :start_date, :amount_paid, NOW(), NOW()
-        ) RETURNING *
-    """
+        if program["enrolled"]:
+            raise HTTPException(status_code=400, detail="Already enrolled in this program")
 
-    new_enrollment = await database.fetch_one(
-        query=query,
-        values={
-            "swimmer_id": current_user["id"],
-            "program_id": program_id,
-            "start_date": enrollment.start_date,
-            "amount_paid": program["price"]
-        }
-    )
+        raise HTTPException(status_code=409, detail="Program is full")
 
-    # Update program participant count
-    await database.execute(
-        "UPDATE programs SET current_participants = current_participants + 1, total_enrollments = total_enrollments + 1 WHERE id = :program_id",
-        {"program_id": program_id}
-    )
+    new_enrollment = dict(result)
+    new_enrollment.pop("seat_claimed")
 
-    return dict(new_enrollment)
+    return new_enrollment
 
 
 @router.get("/enrollments/my", response_model=List[ProgramEnrollmentResponse])
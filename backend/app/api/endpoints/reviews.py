@@ -4,11 +4,15 @@ Reviews, ratings, favorites, and notifications
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from app.core.database import database
+from app.core.response_cache import invalidate_cache
 from app.api.dependencies.auth import get_current_user
 from app.schemas.review import *
 
 router = APIRouter(prefix="/reviews", tags=["Reviews & Social"])
 
+# Review targets with a cached profile page (see the /{id}/profile endpoints)
+PROFILE_TARGET_TYPES = ("academy", "clinic", "store")
+
 
 # ==================== REVIEWS ====================
 
@@ -113,6 +117,8 @@ async def create_review(
         }
     )
 
+    await _invalidate_profile(new_review)
+
     return dict(new_review)
 
 
@@ -140,9 +146,17 @@ async def update_review(
     update_data["review_id"] = review_id
 
     updated_review = await database.fetch_one(query=query, values=update_data)
+    await _invalidate_profile(updated_review)
+
     return dict(updated_review)
 
 
+async def _invalidate_profile(review):
+    """Drop the cached profile page whose rating summary includes this review"""
+    if review["target_type"] in PROFILE_TARGET_TYPES:
+        await invalidate_cache(f"{review['target_type']}:{review['target_id']}")
+
+
 # ==================== FAVORITES ====================
 
 @router.get("/favorites", response_model=List[FavoriteResponse])
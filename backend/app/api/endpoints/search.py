@@ -0,0 +1,31 @@
+"""
+Search API endpoints
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Query
+
+from app.schemas.search import SuggestionType, SuggestResponse
+from app.services.search_suggest import suggest_index
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100, description="What the user has typed so far"),
+    types: Optional[List[SuggestionType]] = Query(None, description="Only suggest these kinds"),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """
+    Typeahead suggestions for academy, clinic and store names, product brands
+    and cities (public)
+
+    Matches any word of a label by prefix, case- and accent-insensitively.
+    Served from each worker's in-memory index; no database query is made.
+    """
+    kinds = [t.value for t in types] if types else None
+
+    return {
+        "query": q,
+        "suggestions": suggest_index.suggest(q, limit=limit, kinds=kinds),
+    }
@@ -4,16 +4,18 @@ Service management endpoints (Clinics)
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from app.core.database import database
+from app.core.responses import FastJSONRoute, fast_json
 from app.api.dependencies.auth import get_current_user, require_clinic, get_current_user_optional
 from app.schemas.service import (
     ServiceCreate, ServiceUpdate, ServiceResponse,
     ServiceListResponse, ServiceFilterParams, ServiceCategory
 )
 
-router = APIRouter(prefix="/services", tags=["Services"])
+router = APIRouter(prefix="/services", tags=["Services"], route_class=FastJSONRoute)
 
 
 @router.get("", response_model=ServiceListResponse)
+@fast_json()
 async def list_services(
     category: Optional[ServiceCategory] = None,
     clinic_id: Optional[str] = None,
@@ -1,21 +1,30 @@
 """
 Store and Marketplace API endpoints
 """
+import re
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from pydantic import UUID4
 
-from app.core.database import database
+from app.core.database import database, unit_of_work
+from app.core.response_cache import CachedRoute, cached, invalidate_cache
+from app.core.responses import fast_json
 from app.api.dependencies.auth import get_current_user
+from app.services.geo_index import index_branch, unindex_branch
+from app.services.image_pipeline import photo_variants_json
+from app.services.search_suggest import index_suggestion, unindex_suggestion
+from app.utils.pagination import decode_rank_cursor, decode_timestamp_cursor, encode_cursor
+from app.utils.profiles import fetch_profile, json_list, rating_summary
+from app.utils.streaming import ListAllParams, list_all
 from app.schemas.store import (
     StoreDetails, StoreDetailsCreate, StoreDetailsUpdate,
     StoreBranch, StoreBranchCreate, StoreBranchUpdate,
-    StoreProduct, StoreProductCreate, StoreProductUpdate,
+    StoreProduct, StoreProductCreate, StoreProductUpdate, StoreProfile,
     StoreOrder, StoreOrderCreate, StoreOrderUpdate, OrderItem,
     UsedItem, UsedItemCreate, UsedItemUpdate
 )
 
-router = APIRouter(tags=["Stores & Marketplace"])
+router = APIRouter(tags=["Stores & Marketplace"], route_class=CachedRoute)
 
 
 # ============================================
@@ -23,12 +32,10 @@ router = APIRouter(tags=["Stores & Marketplace"])
 # ============================================
 
 @router.get("/stores/all", response_model=List[StoreDetails])
-async def get_all_stores():
-    """Get all stores (public)"""
-    result = await database.fetch_all(
-        "SELECT * FROM store_details ORDER BY created_at DESC"
-    )
-    return result
+@fast_json(trusted=True)
+async def get_all_stores(params: ListAllParams = Depends()):
+    """Get all stores (public), paginated with skip/limit (100 by default) or streamed with stream=true"""
+    return await list_all("store_details", StoreDetails, params, key="user_id")
 
 
 # ============================================
@@ -67,6 +74,9 @@ async def create_store_details(details: StoreDetailsCreate, current_user: dict =
         **details.dict()
     })
 
+    await invalidate_cache(f"store:{current_user['id']}")
+    await index_suggestion("store", current_user["id"], result["store_name"], ref_id=current_user["id"])
+
     return result
 
 
@@ -134,6 +144,9 @@ async def update_store_details(details: StoreDetailsUpdate, current_user: dict =
             detail="Store details not found"
         )
 
+    await invalidate_cache(f"store:{current_user['id']}")
+    await index_suggestion("store", current_user["id"], result["store_name"], ref_id=current_user["id"])
+
     return result
 
 
@@ -146,11 +159,11 @@ async def create_store_branch(branch: StoreBranchCreate, current_user: dict = De
     """Create a new store branch"""
     query = """
         INSERT INTO store_branches (
-            user_id, location_name, governorate, city, location_url, branch_phone,
+            user_id, location_name, governorate, city, location_url, latitude, longitude, branch_phone,
             opening_hour, opening_minute, opening_ampm, closing_hour, closing_minute,
             closing_ampm, delivery_options, created_at, updated_at
         ) VALUES (
-            :user_id, :location_name, :governorate, :city, :location_url, :branch_phone,
+            :user_id, :location_name, :governorate, :city, :location_url, :latitude, :longitude, :branch_phone,
             :opening_hour, :opening_minute, :opening_ampm, :closing_hour, :closing_minute,
             :closing_ampm, :delivery_options, NOW(), NOW()
         )
@@ -162,6 +175,10 @@ async def create_store_branch(branch: StoreBranchCreate, current_user: dict = De
         **branch.dict()
     })
 
+    await index_suggestion("city", f"store_branches:{result['id']}", result["city"])
+    await index_branch("store", result)
+    await invalidate_cache(f"store:{current_user['id']}")
+
     return result
 
 
@@ -228,6 +245,10 @@ async def update_store_branch(branch_id: UUID4, branch: StoreBranchUpdate, curre
         **update_fields
     })
 
+    await index_suggestion("city", f"store_branches:{branch_id}", result["city"])
+    await index_branch("store", result)
+    await invalidate_cache(f"store:{current_user['id']}")
+
     return result
 
 
@@ -256,6 +277,10 @@ async def delete_store_branch(branch_id: UUID4, current_user: dict = Depends(get
         {"id": str(branch_id)}
     )
 
+    await unindex_suggestion("city", f"store_branches:{branch_id}")
+    await unindex_branch("store", branch_id)
+    await invalidate_cache(f"store:{current_user['id']}")
+
 
 # ============================================
 # STORE PRODUCT ENDPOINTS
@@ -280,6 +305,9 @@ async def create_product(product: StoreProductCreate, current_user: dict = Depen
         **product.dict()
     })
 
+    await invalidate_cache(f"store_products:{current_user['id']}", f"store:{current_user['id']}")
+    await index_suggestion("brand", f"store_products:{result['id']}", result["brand"])
+
     return result
 
 
@@ -295,6 +323,7 @@ async def get_my_products(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/stores/products/store/{user_id}", response_model=List[StoreProduct])
+@cached(tags=["store_products:{user_id}"])
 async def get_store_products(user_id: UUID4):
     """Get all products for a specific store (public)"""
     result = await database.fetch_all(
@@ -363,6 +392,9 @@ async def update_product(product_id: UUID4, product: StoreProductUpdate, current
         **update_fields
     })
 
+    await invalidate_cache(f"store_products:{current_user['id']}", f"store:{current_user['id']}")
+    await index_suggestion("brand", f"store_products:{product_id}", result["brand"])
+
     return result
 
 
@@ -391,12 +423,50 @@ async def delete_product(product_id: UUID4, current_user: dict = Depends(get_cur
         {"id": str(product_id)}
     )
 
+    await invalidate_cache(f"store_products:{current_user['id']}", f"store:{current_user['id']}")
+    await unindex_suggestion("brand", f"store_products:{product_id}")
+
+
+# ============================================
+# STORE PROFILE ENDPOINT
+# ============================================
+
+STORE_PROFILE_QUERY = f"""
+    SELECT json_build_object(
+        'details', to_json(d),
+        'branches', {json_list('''
+            SELECT json_agg(b ORDER BY b.created_at DESC)
+            FROM store_branches b
+            WHERE b.user_id = d.user_id
+        ''')},
+        'products', {json_list('''
+            SELECT json_agg(p ORDER BY p.created_at DESC)
+            FROM store_products p
+            WHERE p.user_id = d.user_id
+        ''')},
+        'rating', {rating_summary("store", "d.user_id")}
+    )::text AS profile
+    FROM store_details d
+    WHERE d.user_id = :user_id
+"""
+
+
+@router.get("/stores/{user_id}/profile", response_model=StoreProfile)
+@cached(tags=["store:{user_id}"])
+@fast_json()
+async def get_store_profile(user_id: UUID4):
+    """
+    Get a store's public page in one request: details, branches, products
+    and rating summary (public)
+    """
+    return await fetch_profile(STORE_PROFILE_QUERY, user_id, "Store details not found")
+
 
 # ============================================
 # STORE ORDER ENDPOINTS
 # ============================================
 
-@router.post("/stores/orders", response_model=StoreOrder, status_code=status.HTTP_201_CREATED)
+@router.post("/stores/orders", response_model=StoreOrder, status_code=status.HTTP_201_CREATED, dependencies=[Depends(unit_of_work)])
 async def create_order(order: StoreOrderCreate, current_user: dict = Depends(get_current_user)):
     """Create a new store order"""
     # Calculate total amount
@@ -526,18 +596,41 @@ async def update_order(order_id: int, order: StoreOrderUpdate, current_user: dic
 # MARKETPLACE (USED ITEMS) ENDPOINTS
 # ============================================
 
+MAX_SEARCH_LENGTH = 100
+MAX_SEARCH_TERMS = 8
+
+# Letters and digits in any script; everything else separates words
+_SEARCH_TERM = re.compile(r"[^\W_]+")
+
+
+def _prefix_tsquery(search: str) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery() expression that ANDs every word and
+    matches the last one as a prefix ("speedo gog" -> "speedo & gog:*")
+
+    Only letters and digits reach the query, so user input can't produce
+    tsquery syntax errors. Returns None when nothing searchable is left.
+    """
+    terms = _SEARCH_TERM.findall(search.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+
+    terms[-1] += ":*"
+    return " & ".join(terms)
+
+
 @router.post("/marketplace/items", response_model=UsedItem, status_code=status.HTTP_201_CREATED)
 async def create_used_item(item: UsedItemCreate, current_user: dict = Depends(get_current_user)):
     """Create a new used item listing"""
     query = """
         INSERT INTO used_items (
             seller_id, title, description, category, brand, condition, price,
-            currency, is_negotiable, size, color, year_purchased, photos,
+            currency, is_negotiable, size, color, year_purchased, photos, photo_variants,
             contact_phone, contact_whatsapp, preferred_contact_method,
             city, governorate, created_at, updated_at
         ) VALUES (
             :seller_id, :title, :description, :category, :brand, :condition, :price,
-            :currency, :is_negotiable, :size, :color, :year_purchased, :photos,
+            :currency, :is_negotiable, :size, :color, :year_purchased, :photos, CAST(:photo_variants AS jsonb),
             :contact_phone, :contact_whatsapp, :preferred_contact_method,
             :city, :governorate, NOW(), NOW()
         )
@@ -546,6 +639,7 @@ async def create_used_item(item: UsedItemCreate, current_user: dict = Depends(ge
 
     result = await database.fetch_one(query, {
         "seller_id": current_user["id"],
+        "photo_variants": photo_variants_json(item.photos or []),
         **item.dict()
     })
 
@@ -553,47 +647,100 @@ async def create_used_item(item: UsedItemCreate, current_user: dict = Depends(ge
 
 
 @router.get("/marketplace/items", response_model=List[UsedItem], response_model_by_alias=True)
+@fast_json()
 async def get_used_items(
+    response: Response,
     category: Optional[str] = Query(None),
     condition: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
     governorate: Optional[str] = Query(None),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
 ):
-    """Get all used items with optional filters (public)"""
-    query = "SELECT * FROM used_items WHERE is_active = true AND is_sold = false"
-    params = {}
+    """
+    Get active used items with optional filters (public)
+
+    Without `search` items are listed newest first. With `search` they are
+    ranked by relevance: full-text matches on title, brand and description
+    (the last word is matched as a prefix, for search-as-you-type) plus
+    trigram similarity on the title, so small typos still find the item.
+
+    Pages hold at most `limit` items; when there are more, the X-Next-Cursor
+    response header carries the cursor for the next page.
+    """
+    filters = ["is_active = true", "is_sold = false"]
+    params = {"limit": limit + 1}
 
     if category:
-        query += " AND category = :category"
+        filters.append("category = :category")
         params["category"] = category
 
     if condition:
-        query += " AND condition = :condition"
+        filters.append("condition = :condition")
         params["condition"] = condition
 
     if min_price is not None:
-        query += " AND price >= :min_price"
+        filters.append("price >= :min_price")
         params["min_price"] = min_price
 
     if max_price is not None:
-        query += " AND price <= :max_price"
+        filters.append("price <= :max_price")
         params["max_price"] = max_price
 
     if governorate:
-        query += " AND governorate = :governorate"
+        filters.append("governorate = :governorate")
         params["governorate"] = governorate
 
-    if search:
-        query += " AND (title ILIKE :search OR description ILIKE :search)"
-        params["search"] = f"%{search}%"
-
-    query += " ORDER BY created_at DESC"
+    tsquery = _prefix_tsquery(search) if search else None
+
+    if tsquery:
+        params["tsquery"] = tsquery
+        params["search"] = search.strip()
+        ranked_where = ""
+
+        if cursor:
+            params["cursor_rank"], params["cursor_id"] = decode_rank_cursor(cursor)
+            ranked_where = "WHERE (rank, id) < (CAST(:cursor_rank AS float8), CAST(:cursor_id AS uuid))"
+
+        # Both match conditions are index-backed (GIN on search_vector and
+        # the title trigram index), so Postgres ORs two bitmap scans
+        query = f"""
+            SELECT * FROM (
+                SELECT ui.*,
+                       CAST(ts_rank_cd(ui.search_vector, q.tsq) + word_similarity(:search, ui.title) AS float8) AS rank
+                FROM used_items ui, to_tsquery('simple', :tsquery) AS q(tsq)
+                WHERE {" AND ".join("ui." + f for f in filters)}
+                AND (ui.search_vector @@ q.tsq OR :search <% ui.title)
+            ) ranked
+            {ranked_where}
+            ORDER BY rank DESC, id DESC
+            LIMIT :limit
+        """
+    else:
+        if cursor:
+            params["cursor_created_at"], params["cursor_id"] = decode_timestamp_cursor(cursor)
+            filters.append("(created_at, id) < (:cursor_created_at, CAST(:cursor_id AS uuid))")
+
+        query = f"""
+            SELECT * FROM used_items
+            WHERE {" AND ".join(filters)}
+            ORDER BY created_at DESC, id DESC
+            LIMIT :limit
+        """
+
+    rows = await database.fetch_all(query, params)
+    items = rows[:limit]
+
+    if len(rows) > limit:
+        last = items[-1]
+        response.headers["X-Next-Cursor"] = (
+            encode_cursor(last["rank"], last["id"]) if tsquery
+            else encode_cursor(last["created_at"], last["id"])
+        )
 
-    result = await database.fetch_all(query, params)
-
-    return result
+    return items
 
 
 @router.get("/marketplace/items/my", response_model=List[UsedItem])
@@ -666,6 +813,10 @@ async def update_used_item(item_id: UUID4, item: UsedItemUpdate, current_user: d
     else:
         set_clause = ", ".join([f"{k} = :{k}" for k in update_fields.keys()])
 
+    if "photos" in update_fields:
+        set_clause += ", photo_variants = CAST(:photo_variants AS jsonb)"
+        update_fields["photo_variants"] = photo_variants_json(update_fields["photos"])
+
     query = f"""
         UPDATE used_items
         SET {set_clause}, updated_at = NOW()
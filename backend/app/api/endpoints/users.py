@@ -6,7 +6,8 @@ from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, database
-from app.api.dependencies.auth import get_current_user, require_provider
+from app.api.dependencies.auth import get_current_user, require_provider, invalidate_principal
+from app.services.image_pipeline import photo_variants_json
 from app.schemas.user import (
     ProfileResponse,
     ProfileUpdate,
@@ -61,11 +62,15 @@ async def update_my_profile(
 
     # Build update query
     set_clause = ", ".join([f"{key} = :{key}" for key in update_data.keys()])
+    if "profile_photo_url" in update_data:
+        set_clause += ", photo_variants = CAST(:photo_variants AS jsonb)"
+        update_data["photo_variants"] = photo_variants_json([update_data["profile_photo_url"]])
     query = f"UPDATE profiles SET {set_clause}, updated_at = NOW() WHERE id = :user_id RETURNING *"
 
     update_data["user_id"] = current_user["id"]
 
     profile = await database.fetch_one(query=query, values=update_data)
+    await invalidate_principal(current_user["id"])
 
     return dict(profile)
 
@@ -148,6 +153,9 @@ async def update_branch(
         return dict(existing)
 
     set_clause = ", ".join([f"{key} = :{key}" for key in update_data.keys()])
+    if "branch_photo_url" in update_data:
+        set_clause += ", photo_variants = CAST(:photo_variants AS jsonb)"
+        update_data["photo_variants"] = photo_variants_json([update_data["branch_photo_url"]])
     query = f"UPDATE branches SET {set_clause}, updated_at = NOW() WHERE id = :branch_id RETURNING *"
 
     update_data["branch_id"] = branch_id
@@ -25,6 +25,23 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
     workers: int = Field(default=4)
+    # Proxies trusted to set X-Forwarded-For/-Proto: comma-separated IPs or
+    # networks, or "*" when a proxy is the only way in (Railway). The client is
+    # the forwarded_hops-th X-Forwarded-For entry from the right (the one the
+    # proxies appended, never what the caller sent); see app.core.proxy_headers
+    forwarded_allow_ips: str = Field(default="127.0.0.1")
+    forwarded_hops: int = Field(default=1)
+
+    # Production launcher (python -m app.serve)
+    serve_preload: bool = Field(default=True)
+    # Recycle a worker after this many requests (plus up to 10% jitter); 0 = never
+    serve_max_requests: int = Field(default=0)
+    # ...or once its resident memory passes this many MB; 0 = no limit
+    serve_max_rss_mb: int = Field(default=0)
+    serve_graceful_timeout_seconds: float = Field(default=30.0)
+    serve_worker_timeout_seconds: float = Field(default=60.0)
+    # Per-worker status file read by /health (default /dev/shm/swim360-workers.json)
+    serve_status_path: Optional[str] = None
 
     # Database
     database_url: PostgresDsn
@@ -32,11 +49,86 @@ class Settings(BaseSettings):
     supabase_key: str
     supabase_service_key: str
 
+    # Database Pool, per worker: at most db_pool_max_size connections, of which
+    # db_pool_max_overflow are opened only under load. Each worker also holds a
+    # LISTEN connection and a health check connection, so a host uses up to
+    # workers * (db_pool_max_size + 2).
+    db_pool_enabled: bool = Field(default=True)
+    db_pool_min_size: int = Field(default=2)
+    db_pool_max_size: int = Field(default=10)
+    db_pool_max_overflow: int = Field(default=5)
+    db_pool_recycle_seconds: int = Field(default=1800)
+    db_pool_pre_ping: bool = Field(default=True)
+    db_pool_timeout_seconds: float = Field(default=10.0)
+    # LISTEN needs a session connection; set this when DATABASE_URL points at a
+    # transaction-mode pooler
+    listen_database_url: Optional[str] = None
+
     # Security
     secret_key: str
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30)
     refresh_token_expire_days: int = Field(default=7)
+    principal_cache_size: int = Field(default=10000)
+    token_cache_size: int = Field(default=10000)
+    password_hash_workers: int = Field(default=2)
+    password_hash_max_pending: int = Field(default=32)
+    principal_cache_ttl_seconds: float = Field(default=30.0)
+    principal_invalidation_channel: str = Field(default="principal_invalidation")
+
+    # Chat (WebSocket delivery)
+    chat_ws_enabled: bool = Field(default=True)
+    chat_notify_channel: str = Field(default="chat_events")
+    chat_ws_send_queue_size: int = Field(default=100)
+    chat_ws_heartbeat_seconds: float = Field(default=25.0)
+    chat_ws_idle_timeout_seconds: float = Field(default=75.0)
+    chat_ws_max_connections_per_user: int = Field(default=5)
+
+    # Response cache (public catalog reads)
+    response_cache_enabled: bool = Field(default=True)
+    response_cache_ttl_seconds: float = Field(default=60.0)
+    response_cache_max_entries: int = Field(default=2000)
+    response_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    response_cache_max_entry_bytes: int = Field(default=1024 * 1024)
+    cache_invalidation_channel: str = Field(default="cache_invalidation")
+
+    # Typeahead suggestions (in-memory prefix index)
+    search_suggest_enabled: bool = Field(default=True)
+    search_suggest_channel: str = Field(default="search_suggest")
+    search_suggest_refresh_seconds: float = Field(default=600.0)
+
+    # Branch geo index for /nearby (in-memory grid)
+    geo_index_enabled: bool = Field(default=True)
+    geo_index_channel: str = Field(default="geo_index")
+    geo_index_refresh_seconds: float = Field(default=600.0)
+    # Time zone branch opening hours are written in
+    branch_timezone: str = Field(default="Africa/Cairo")
+
+    # Fast JSON encoding (orjson default response class, @fast_json endpoints)
+    fast_json_enabled: bool = Field(default=False)
+
+    # Metrics (/metrics in Prometheus text format)
+    metrics_enabled: bool = Field(default=True)
+    metrics_refresh_seconds: float = Field(default=5.0)
+    # Directory shared by all workers so /metrics covers every one of them;
+    # needed whenever uvicorn runs with more than one worker
+    metrics_multiproc_dir: Optional[str] = None
+    # Bearer token for /metrics and the detailed /health sections (SQL text,
+    # pool and worker internals); unset, /metrics is off and /health is a summary
+    metrics_token: Optional[str] = None
+
+    # Health probes (/health/live, /health/ready)
+    health_refresh_seconds: float = Field(default=5.0)
+    # Not ready once the last successful database check is older than this
+    health_stale_seconds: float = Field(default=30.0)
+    # ...or while the event loop runs this late
+    health_max_loop_lag_ms: float = Field(default=500.0)
+
+    # Query instrumentation (per-fingerprint timings, slow-query log, N+1 warnings)
+    query_stats_enabled: bool = Field(default=True)
+    slow_query_ms: float = Field(default=250.0)
+    # Warn when a request runs the same statement more than this many times
+    n_plus_one_threshold: int = Field(default=10)
 
     # CORS
     allowed_origins: str = Field(default="*")
@@ -44,8 +136,19 @@ class Settings(BaseSettings):
     # Supabase Auth
     supabase_jwt_secret: str
 
-    # Storage
+    # Storage ("supabase", or "local" to keep files on disk for development and tests)
     storage_provider: str = Field(default="supabase")
+    # Uploads in flight per worker; further ones wait their turn
+    storage_max_concurrent_uploads: int = Field(default=4)
+    storage_upload_chunk_bytes: int = Field(default=256 * 1024)
+    storage_timeout_seconds: float = Field(default=60.0)
+    # STORAGE_PROVIDER=local: where files go and the URL the app is reached at
+    local_storage_path: str = Field(default="media")
+    local_storage_base_url: str = Field(default="http://localhost:8000")
+    # Startup skips checking the storage buckets while this file records a
+    # successful check of the same buckets, at most ttl hours old (unset: always check)
+    storage_buckets_marker_path: Optional[str] = None
+    storage_buckets_marker_ttl_hours: float = Field(default=24.0)
     aws_access_key_id: Optional[str] = None
     aws_secret_access_key: Optional[str] = None
     aws_region: str = Field(default="us-east-1")
@@ -73,14 +176,31 @@ class Settings(BaseSettings):
     log_level: str = Field(default="INFO")
     log_file: str = Field(default="logs/app.log")
 
-    # Rate Limiting
+    # Rate Limiting (token bucket per user / IP, shared by all workers)
+    rate_limit_enabled: bool = Field(default=True)
     rate_limit_per_minute: int = Field(default=60)
+    # Per IP, on top of the above, for /auth/login and /auth/signup; also per
+    # account for /auth/login
+    rate_limit_auth_per_minute: int = Field(default=10)
+    # Clients tracked at once (least recently seen are evicted first)
+    rate_limit_max_keys: int = Field(default=65536)
+    # Bucket table file shared by the workers (default /dev/shm/swim360-rate-limit)
+    rate_limit_shm_path: Optional[str] = None
 
     # File Upload
     max_file_size_mb: int = Field(default=10)
     allowed_image_types: str = Field(default="image/jpeg,image/png,image/webp")
     allowed_video_types: str = Field(default="video/mp4,video/quicktime")
 
+    # Image variants (thumb/medium/large JPEG or PNG plus WebP) rendered at upload
+    # Pool processes per API worker
+    image_workers: int = Field(default=2)
+    image_max_pending: int = Field(default=32)
+    image_jpeg_quality: int = Field(default=82)
+    image_webp_quality: int = Field(default=80)
+    # Larger images (in pixels, before resizing) are refused
+    image_max_pixels: int = Field(default=50_000_000)
+
     # Business Logic
     default_currency: str = Field(default="USD")
     service_fee_percentage: float = Field(default=5.0)
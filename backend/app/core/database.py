@@ -1,13 +1,17 @@
 """
 Database connection and session management
 """
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from typing import AsyncGenerator
 from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 
 from app.core.config import settings
+from app.core.query_stats import query_stats
 
 
 # Convert postgres:// to postgresql:// for SQLAlchemy
@@ -30,10 +34,26 @@ engine = create_engine(
     echo=settings.debug,
 )
 
+# Pooled mode keeps warm connections around instead of paying connect + TLS +
+# auth on every query. NullPool is kept as an escape hatch for setups where an
+# external pooler (e.g. PgBouncer in transaction mode) already does this job.
+# db_pool_max_size is the hard cap per worker: max_overflow of it are only
+# opened under load and closed again once returned.
+if settings.db_pool_enabled:
+    ASYNC_POOL_OPTIONS = {
+        "pool_size": max(settings.db_pool_max_size - settings.db_pool_max_overflow, 1),
+        "max_overflow": min(settings.db_pool_max_overflow, max(settings.db_pool_max_size - 1, 0)),
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
+else:
+    ASYNC_POOL_OPTIONS = {"poolclass": NullPool}
+
 async_engine = create_async_engine(
     ASYNC_DATABASE_URL,
-    poolclass=NullPool,
     echo=settings.debug,
+    **ASYNC_POOL_OPTIONS,
 )
 
 # Session factories
@@ -46,34 +66,113 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Connection pinned by the enclosing DatabaseWrapper.transaction() block, if any
+_current_connection: ContextVar = ContextVar("database_connection", default=None)
+
+
 class DatabaseWrapper:
     """Drop-in replacement for the 'databases' library API using SQLAlchemy async engine."""
 
     def __init__(self, engine):
         self._engine = engine
+        self._waiting = 0
 
     async def connect(self):
-        pass
+        """Open the pool's minimum number of connections up front"""
+        warm_size = min(settings.db_pool_min_size, settings.db_pool_max_size) if settings.db_pool_enabled else 1
+
+        async def ping():
+            async with self._begin() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(ping() for _ in range(max(warm_size, 1))))
 
     async def disconnect(self):
         await self._engine.dispose()
 
+    @asynccontextmanager
+    async def _begin(self):
+        """Check out a connection and open a transaction on it"""
+        conn = self._engine.connect()
+        self._waiting += 1
+        try:
+            await conn.start()
+        finally:
+            self._waiting -= 1
+
+        try:
+            async with conn.begin():
+                yield conn
+        finally:
+            await conn.close()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run every database call inside the block on one connection and one transaction
+
+        Nested blocks join the outermost one. The transaction commits when the
+        outermost block exits and rolls back if it raises. Statements inside the
+        block share a connection, so don't asyncio.gather() queries within it.
+
+        Usage:
+            async with database.transaction():
+                order = await database.fetch_one(...)
+                await database.execute(...)
+        """
+        conn = _current_connection.get()
+        if conn is not None:
+            yield conn
+            return
+
+        async with self._begin() as conn:
+            token = _current_connection.set(conn)
+            try:
+                yield conn
+            finally:
+                _current_connection.reset(token)
+
     async def fetch_one(self, query, values=None):
-        async with self._engine.begin() as conn:
-            result = await conn.execute(text(query), values or {})
+        async with self.transaction() as conn:
+            with query_stats.timed(query, values):
+                result = await conn.execute(text(query), values or {})
             row = result.mappings().first()
             return row
 
     async def fetch_all(self, query, values=None):
-        async with self._engine.begin() as conn:
-            result = await conn.execute(text(query), values or {})
+        async with self.transaction() as conn:
+            with query_stats.timed(query, values):
+                result = await conn.execute(text(query), values or {})
             return result.mappings().all()
 
     async def execute(self, query, values=None):
-        async with self._engine.begin() as conn:
-            result = await conn.execute(text(query), values or {})
+        async with self.transaction() as conn:
+            with query_stats.timed(query, values):
+                result = await conn.execute(text(query), values or {})
             return result
 
+    def pool_stats(self) -> dict:
+        """Current connection usage, as reported by the engine's pool"""
+        pool = self._engine.pool
+
+        if not isinstance(pool, QueuePool):
+            return {
+                "mode": "unpooled",
+                "in_use": None,
+                "idle": None,
+                "waiting": self._waiting,
+            }
+
+        return {
+            "mode": "pooled",
+            "size": pool.size(),
+            "max_overflow": settings.db_pool_max_overflow,
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "waiting": self._waiting,
+        }
+
 
 database = DatabaseWrapper(async_engine)
 
@@ -104,11 +203,27 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def unit_of_work() -> AsyncGenerator[None, None]:
+    """
+    Dependency that runs the whole request on one connection and one transaction
+
+    Every database.* call made by the handler (and by dependencies resolved after
+    this one, such as get_current_user) reuses the pinned connection, and all
+    writes commit together once the handler returns.
+
+    Usage in endpoints:
+        @router.post("/orders", dependencies=[Depends(unit_of_work)])
+        async def create_order(...):
+            ...
+    """
+    async with database.transaction():
+        yield
+
+
 async def connect_db():
     """Connect to database on startup"""
-    async with async_engine.begin() as conn:
-        await conn.execute(text("SELECT 1"))
-    print("✅ Database connected")
+    await database.connect()
+    print(f"✅ Database connected ({database.pool_stats()['mode']})")
 
 
 async def disconnect_db():
@@ -0,0 +1,148 @@
+"""
+Liveness and readiness state for the health probes
+
+/health/live only proves the event loop is answering. /health/ready serves
+what HealthMonitor last saw, so probes never wait on the database:
+
+- database: a SELECT 1 every health_refresh_seconds (one per worker,
+  however often the probes come) on a connection of its own, so a busy
+  pool can't make a healthy database look down
+- pool: in-use/idle/waiting connections and saturation, read from memory
+- event loop: how late a timer scheduled every LOOP_SAMPLE_SECONDS fires;
+  the worst lag over the last refresh interval is reported
+- listener: whether the LISTEN connection for cross-worker notifications
+  is up
+
+A worker is ready while its last database check succeeded recently
+(health_stale_seconds) and loop lag stays under health_max_loop_lag_ms;
+a saturated pool or a down listener are reported as degraded without
+taking it out of rotation.
+"""
+import asyncio
+import time
+from typing import Optional
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.database import async_engine, database
+from app.core.pubsub import pg_listener
+
+LOOP_SAMPLE_SECONDS = 0.25
+
+
+class HealthMonitor:
+    """Refreshes dependency checks in the background and answers probes from memory"""
+
+    def __init__(self):
+        self.db_ok: Optional[bool] = None
+        self.db_latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.last_ok_at: Optional[float] = None
+        self.loop_lag_ms = 0.0
+        self._window_lag_ms = 0.0
+        self._tasks = []
+        self._connection: Optional[asyncpg.Connection] = None
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._check_forever()),
+            asyncio.create_task(self._sample_loop_lag()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        await self._close()
+
+    async def _ping_database(self) -> bool:
+        """SELECT 1 on the monitor's own connection, reconnecting if it was lost"""
+        try:
+            if self._connection is None or self._connection.is_closed():
+                connect_args, connect_kwargs = async_engine.dialect.create_connect_args(async_engine.url)
+                self._connection = await asyncpg.connect(*connect_args, **connect_kwargs)
+            await self._connection.execute("SELECT 1")
+            return True
+        except Exception as e:
+            print(f"⚠️  Health check: database error: {e}")
+            await self._close()
+            return False
+
+    async def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.close(timeout=1)
+            except Exception:
+                self._connection.terminate()
+            self._connection = None
+
+    async def _check_forever(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.health_refresh_seconds)
+
+    async def check(self) -> None:
+        """Run the dependency checks once and fold in the loop lag seen since the last one"""
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(self._ping_database(), timeout=settings.health_refresh_seconds)
+        except asyncio.TimeoutError:
+            print("⚠️  Health check: database did not answer in time")
+            await self._close()
+            ok = False
+
+        self.db_ok = ok
+        self.db_latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.checked_at = time.time()
+        if ok:
+            self.last_ok_at = self.checked_at
+
+        self.loop_lag_ms = round(self._window_lag_ms, 2)
+        self._window_lag_ms = 0.0
+
+    async def _sample_loop_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_SAMPLE_SECONDS
+            await asyncio.sleep(LOOP_SAMPLE_SECONDS)
+            lag_ms = max(loop.time() - expected, 0.0) * 1000
+            self._window_lag_ms = max(self._window_lag_ms, lag_ms)
+
+    def readiness(self) -> dict:
+        """The cached report behind /health/ready ("ready" decides 200 vs 503)"""
+        now = time.time()
+        lag_ms = max(self.loop_lag_ms, self._window_lag_ms)
+        db_fresh = self.last_ok_at is not None and now - self.last_ok_at <= settings.health_stale_seconds
+
+        pool = database.pool_stats()
+        capacity = (pool.get("size") or 0) + (pool.get("max_overflow") or 0)
+        saturation = round(pool["in_use"] / capacity, 3) if capacity and pool["in_use"] is not None else None
+
+        checks = {
+            "database": "ok" if self.db_ok and db_fresh else ("unknown" if self.db_ok is None else "down"),
+            "event_loop": "ok" if lag_ms <= settings.health_max_loop_lag_ms else "lagging",
+            "pool": "saturated" if saturation is not None and saturation >= 1 and pool["waiting"] else "ok",
+            "listener": "ok" if pg_listener.listening else "down",
+        }
+        ready = checks["database"] == "ok" and checks["event_loop"] == "ok"
+
+        return {
+            "status": ("ready" if all(v == "ok" for v in checks.values()) else "degraded") if ready else "not_ready",
+            "ready": ready,
+            "checks": checks,
+            "database": {
+                "latency_ms": self.db_latency_ms,
+                "checked_seconds_ago": round(now - self.checked_at, 1) if self.checked_at else None,
+            },
+            "pool": {**pool, "saturation": saturation},
+            "event_loop_lag_ms": round(lag_ms, 2),
+        }
+
+
+health_monitor = HealthMonitor()
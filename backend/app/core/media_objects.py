@@ -0,0 +1,241 @@
+"""
+Content-addressed, reference-counted uploads
+
+Uploads are stored under their SHA-256 (computed chunk by chunk from the
+spooled upload before anything is sent to storage), with one media_objects
+row per stored object:
+
+    media_objects       bucket, content_hash -> path, variants, ref_count
+    media_references    bucket, content_hash, owner_id -> ref_count
+
+The same file uploaded again (the same product photo on several listings, a
+re-sent attachment) takes another reference instead of being rendered and
+uploaded a second time. Releasing a reference drops the count, and the
+stored object(s) are removed from storage only when it reaches zero.
+
+An upload that misses reserves the row before sending anything to storage
+(stored = false until the upload has finished), and the reference it takes
+there is what keeps the object alive: an upload that fails just releases it
+like any other, and the object(s) are only removed if no other request has
+reserved the same content meanwhile. acquire() and release() lock the row,
+so a release that removes an object and an upload that would reuse it can't
+interleave. Two uploads of the same new content both reserve it and both
+store it; the object is written with upsert (identical bytes under the same
+name), so neither depends on the other succeeding.
+
+Private buckets (message attachments) are only deduplicated per owner:
+their key is an HMAC of the owner and the content hash (dedupe_key()), so
+uploading a guessed file can't reveal that someone else sent it, and the
+stored path can't be worked out from the content.
+"""
+import hashlib
+import hmac
+import json
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import database
+from app.core.storage import media_storage
+from app.schemas.media import MediaBucket
+from app.services.image_pipeline import variant_urls
+
+PRIVATE_BUCKETS = {MediaBucket.MESSAGE_ATTACHMENTS.value}
+
+
+class MediaNotOwned(PermissionError):
+    """The caller holds no reference to the object it tried to release"""
+
+
+def object_paths(path: str) -> List[str]:
+    """Every stored object behind path: all sizes and formats of a processed photo, or path itself"""
+    variants = variant_urls(path)
+    if variants is None:
+        return [path]
+    return [p for variant in variants.values() for p in variant.values()]
+
+
+def dedupe_key(bucket: str, content_hash: str, owner_id: Optional[str] = None) -> str:
+    """The media_objects key (and stored name) for content: its hash, or per owner in a private bucket"""
+    if bucket not in PRIVATE_BUCKETS:
+        return content_hash
+    message = f"{owner_id or ''}:{content_hash}".encode()
+    return hmac.new(settings.secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+
+class MediaObjects:
+    """Reference counts of stored uploads, keyed by bucket and content hash"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.released = 0
+        self.removed = 0
+        self.bytes_saved = 0
+
+    async def acquire(self, bucket: str, content_hash: str, owner_id: Optional[str] = None):
+        """
+        Take a reference to an already stored upload
+
+        Returns its media_objects row (path, content_type, size, variants,
+        and owned: whether owner_id already held a reference to it), or None
+        if this content isn't stored yet (or its first upload is still in
+        flight) and has to be reserved and uploaded.
+        """
+        async with database.transaction():
+            row = await database.fetch_one(
+                """
+                UPDATE media_objects SET ref_count = ref_count + 1
+                WHERE bucket = :bucket AND content_hash = :content_hash AND ref_count > 0 AND stored
+                RETURNING path, content_type, size, variants
+                """,
+                {"bucket": bucket, "content_hash": content_hash},
+            )
+            if row is None:
+                self.misses += 1
+                return None
+            owned = owner_id is not None and await self._add_reference(bucket, content_hash, owner_id) > 1
+
+        self.hits += 1
+        self.bytes_saved += row["size"]
+        return {**row, "owned": owned}
+
+    async def reserve(
+        self,
+        bucket: str,
+        content_hash: str,
+        path: str,
+        content_type: str,
+        size: int,
+        variants: Optional[dict] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """
+        Take a reference to content that is about to be uploaded
+
+        Inserts its media_objects row (stored = false) if there is none yet,
+        before anything is sent to storage. If the upload fails, release()
+        the reference again.
+
+        Returns the row (path, content_type, size, variants, stored, and
+        owned as for acquire()): upload to its path unless stored is already
+        true, then call mark_stored().
+        """
+        async with database.transaction():
+            row = await database.fetch_one(
+                """
+                INSERT INTO media_objects (bucket, content_hash, path, content_type, size, variants, ref_count, stored)
+                VALUES (:bucket, :content_hash, :path, :content_type, :size, CAST(:variants AS jsonb), 1, false)
+                ON CONFLICT (bucket, content_hash) DO UPDATE SET ref_count = media_objects.ref_count + 1
+                RETURNING path, content_type, size, variants, stored
+                """,
+                {
+                    "bucket": bucket,
+                    "content_hash": content_hash,
+                    "path": path,
+                    "content_type": content_type,
+                    "size": size,
+                    "variants": json.dumps(variants) if variants is not None else None,
+                },
+            )
+            owned = owner_id is not None and await self._add_reference(bucket, content_hash, owner_id) > 1
+        return {**row, "owned": owned}
+
+    async def mark_stored(self, bucket: str, content_hash: str) -> None:
+        """Record that a reserved upload is in storage, so acquire() hands it out"""
+        await database.execute(
+            "UPDATE media_objects SET stored = true WHERE bucket = :bucket AND content_hash = :content_hash",
+            {"bucket": bucket, "content_hash": content_hash},
+        )
+
+    async def _add_reference(self, bucket: str, content_hash: str, owner_id: str) -> int:
+        """Count one more reference by owner_id; returns how many it holds now"""
+        row = await database.fetch_one(
+            """
+            INSERT INTO media_references (bucket, content_hash, owner_id, ref_count)
+            VALUES (:bucket, :content_hash, :owner_id, 1)
+            ON CONFLICT (bucket, content_hash, owner_id)
+            DO UPDATE SET ref_count = media_references.ref_count + 1
+            RETURNING ref_count
+            """,
+            {"bucket": bucket, "content_hash": content_hash, "owner_id": owner_id},
+        )
+        return row["ref_count"]
+
+    async def release(self, bucket: str, path: str, owner_id: Optional[str] = None) -> Optional[bool]:
+        """
+        Drop one reference to the upload stored at path (its large path for a processed photo)
+
+        With owner_id, the reference must be one that owner took. The stored
+        object(s) are removed once the last reference is gone; if storage
+        refuses, the count is left as it was.
+
+        Returns:
+            True if the object was removed, False if other references remain,
+            None if path isn't a tracked upload (stored before deduplication)
+
+        Raises:
+            MediaNotOwned: owner_id holds no reference to it
+            StorageError: removing the last copy failed
+        """
+        async with database.transaction():
+            row = await database.fetch_one(
+                """
+                SELECT content_hash, ref_count FROM media_objects
+                WHERE bucket = :bucket AND path = :path
+                FOR UPDATE
+                """,
+                {"bucket": bucket, "path": path},
+            )
+            if row is None:
+                return None
+            key = {"bucket": bucket, "content_hash": row["content_hash"]}
+
+            if owner_id is not None:
+                reference = await database.fetch_one(
+                    """
+                    UPDATE media_references SET ref_count = ref_count - 1
+                    WHERE bucket = :bucket AND content_hash = :content_hash
+                      AND owner_id = :owner_id AND ref_count > 0
+                    RETURNING ref_count
+                    """,
+                    {**key, "owner_id": owner_id},
+                )
+                if reference is None:
+                    raise MediaNotOwned(f"{bucket}/{path} is not yours to delete")
+
+            if row["ref_count"] > 1:
+                await database.execute(
+                    """
+                    UPDATE media_objects SET ref_count = ref_count - 1
+                    WHERE bucket = :bucket AND content_hash = :content_hash
+                    """,
+                    key,
+                )
+                self.released += 1
+                return False
+
+            # Last reference: remove from storage while the row is still locked,
+            # so a concurrent acquire() or reserve() waits and then uploads afresh
+            await media_storage.delete(bucket, object_paths(path))
+            await database.execute(
+                "DELETE FROM media_objects WHERE bucket = :bucket AND content_hash = :content_hash",
+                key,
+            )
+
+        self.released += 1
+        self.removed += 1
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "bytes_saved": self.bytes_saved,
+            "released": self.released,
+            "removed": self.removed,
+        }
+
+
+media_objects = MediaObjects()
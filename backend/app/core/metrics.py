@@ -0,0 +1,247 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format
+
+MetricsMiddleware records, per route template (/api/v1/academies/{user_id},
+never the raw path):
+
+- swim360_http_requests_total{method, route, status}
+- swim360_http_request_duration_seconds{method, route} (histogram)
+- swim360_http_requests_in_progress{method}
+
+and each worker copies its database pool usage and cache hit/miss counters
+into swim360_db_pool_connections{state} and swim360_cache_lookups_total
+every metrics_refresh_seconds (and right before answering a scrape).
+swim360_cache_hit_ratio{cache} is worked out from the summed counters at
+scrape time.
+
+With several uvicorn workers, set metrics_multiproc_dir: every worker then
+writes its samples to memory-mapped files in that directory and whichever
+worker answers the scrape sums them all. The directory must be emptied
+before the server starts, or counters carry over from the previous run.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# prometheus_client picks its storage when it is first imported
+if settings.metrics_multiproc_dir:
+    os.makedirs(settings.metrics_multiproc_dir, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.metrics_multiproc_dir)
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+
+disable_created_metrics()
+
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# Requests that didn't match a route (404s, CORS preflights) share one label
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "swim360_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "swim360_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route"],
+)
+IN_PROGRESS = Gauge(
+    "swim360_http_requests_in_progress",
+    "HTTP requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "swim360_db_pool_connections",
+    "Database pool connections by state (in_use, idle, overflow, waiting)",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+CACHE_LOOKUPS = Counter(
+    "swim360_cache_lookups_total",
+    "In-process cache lookups by cache and result (hit, miss)",
+    ["cache", "result"],
+)
+QUERY_DURATION = Histogram(
+    "swim360_db_query_duration_seconds",
+    "Statement execution time by query fingerprint (see /health for the SQL)",
+    ["fingerprint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SLOW_QUERIES = Counter(
+    "swim360_db_slow_queries_total",
+    "Statements slower than slow_query_ms",
+    ["fingerprint"],
+)
+QUERIES_PER_REQUEST = Histogram(
+    "swim360_db_queries_per_request",
+    "Statements run while handling one HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+N_PLUS_ONE = Counter(
+    "swim360_db_n_plus_one_total",
+    "Requests that ran one fingerprint more than n_plus_one_threshold times",
+    ["route", "fingerprint"],
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request (streamed bodies included)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in METHODS else "other"
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+
+            # The router stores the matched APIRoute in the (shared) scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+
+            REQUESTS.labels(method, path, str(status_code)).inc()
+            REQUEST_DURATION.labels(method, path).observe(duration)
+
+
+class _Scrape:
+    """A registry-like snapshot: collected families plus the derived hit ratios"""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def collect(self):
+        families = list(self.registry.collect())
+        lookups: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+        for family in families:
+            if family.name == "swim360_cache_lookups":
+                for sample in family.samples:
+                    if sample.name.endswith("_total"):
+                        lookups[sample.labels["cache"]][sample.labels["result"]] += sample.value
+
+        ratio = GaugeMetricFamily(
+            "swim360_cache_hit_ratio",
+            "Share of cache lookups that were hits, across all workers",
+            labels=["cache"],
+        )
+        for cache, results in sorted(lookups.items()):
+            total = results["hit"] + results["miss"]
+            if total:
+                ratio.add_metric([cache], results["hit"] / total)
+
+        return families + [ratio]
+
+
+class MetricsCollector:
+    """
+    Copies each worker's pool and cache counters into the shared metrics
+
+    Pool gauges are overwritten and cache counters advanced by the hits and
+    misses seen since the previous refresh, so summing across workers works.
+    """
+
+    def __init__(self):
+        self.caches: Dict[str, object] = {}
+        self._seen: Dict[Tuple[str, str], int] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def track_cache(self, name: str, cache) -> None:
+        """Export a cache's hits/misses attributes as swim360_cache_lookups_total{cache=name}"""
+        self.caches[name] = cache
+
+    async def start(self) -> None:
+        if not settings.metrics_enabled:
+            return
+
+        self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refresh_task = None
+
+        # Drop this worker's live gauges from the shared directory
+        if MULTIPROCESS:
+            multiprocess.mark_process_dead(os.getpid())
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(settings.metrics_refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Metrics refresh failed: {e}")
+
+    def refresh(self) -> None:
+        # Imported here: the database module records its queries in this one
+        from app.core.database import database
+
+        pool = database.pool_stats()
+        for state in ("in_use", "idle", "overflow", "waiting"):
+            DB_POOL_CONNECTIONS.labels(state).set(pool.get(state) or 0)
+
+        for name, cache in self.caches.items():
+            for result, count in (("hit", cache.hits), ("miss", cache.misses)):
+                delta = count - self._seen.get((name, result), 0)
+                if delta > 0:
+                    CACHE_LOOKUPS.labels(name, result).inc(delta)
+                self._seen[(name, result)] = count
+
+    def render(self) -> Tuple[bytes, str]:
+        """The /metrics body (all workers' samples in multiprocess mode) and its content type"""
+        self.refresh()
+
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+
+        return generate_latest(_Scrape(registry)), CONTENT_TYPE_LATEST
+
+
+metrics = MetricsCollector()
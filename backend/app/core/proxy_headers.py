@@ -0,0 +1,90 @@
+"""
+Client address and scheme as seen by the proxy in front of the app
+
+Behind a proxy every connection comes from the proxy. Each proxy appends
+the address it was connected from to X-Forwarded-For, after whatever the
+request already carried, so only the right-hand end of the header is
+trustworthy: with forwarded_hops proxies in a row, the client is the
+forwarded_hops-th entry from the right. Anything further left is what the
+caller claimed and is never used (uvicorn's own proxy_headers with
+forwarded_allow_ips="*" takes the leftmost entry, which any caller can set
+to a new value on every request).
+
+The headers are only read on connections from forwarded_allow_ips (IPs or
+networks, or "*" when the proxy is the only way in, as on Railway).
+Rate limits and access logs key on the client address this yields.
+"""
+import ipaddress
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=8)
+def _trusted_networks(allow: str) -> Optional[Tuple]:
+    """The networks in a comma-separated forwarded_allow_ips, or None for "*" (any peer)"""
+    items = [item.strip() for item in allow.split(",") if item.strip()]
+    if "*" in items:
+        return None
+    return tuple(ipaddress.ip_network(item, strict=False) for item in items)
+
+
+def is_trusted_proxy(host: Optional[str], allow: str) -> bool:
+    networks = _trusted_networks(allow)
+    if networks is None:
+        return True
+    if host is None:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def forwarded_client(forwarded_for: List[str], hops: int) -> Optional[str]:
+    """
+    The address the outermost of hops proxies was connected from
+
+    forwarded_for holds every X-Forwarded-For header value in order. If it
+    has fewer entries than hops, the leftmost one (added by a proxy, since
+    the request came through at least that many) is used.
+    """
+    entries = [entry.strip() for value in forwarded_for for entry in value.split(",") if entry.strip()]
+    if not entries or hops < 1:
+        return None
+    return entries[-hops] if len(entries) >= hops else entries[0]
+
+
+class ProxyHeadersMiddleware:
+    """Pure ASGI middleware setting scope client/scheme from a trusted proxy's headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and settings.forwarded_hops > 0:
+            client = scope.get("client")
+            if is_trusted_proxy(client[0] if client else None, settings.forwarded_allow_ips):
+                forwarded_for = []
+                proto = None
+                for name, value in scope["headers"]:
+                    if name == b"x-forwarded-for":
+                        forwarded_for.append(value.decode("latin-1"))
+                    elif name == b"x-forwarded-proto":
+                        proto = value.decode("latin-1")
+
+                host = forwarded_client(forwarded_for, settings.forwarded_hops)
+                if host:
+                    # The client's port is lost by now
+                    scope["client"] = (host, 0)
+
+                if proto:
+                    proto = proto.split(",")[-1].strip().lower()
+                    if proto in ("http", "https"):
+                        if scope["type"] == "websocket":
+                            proto = "wss" if proto == "https" else "ws"
+                        scope["scheme"] = proto
+
+        await self.app(scope, receive, send)
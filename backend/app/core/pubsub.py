@@ -0,0 +1,125 @@
+"""
+Cross-worker notifications over Postgres LISTEN/NOTIFY
+
+Each uvicorn worker is its own process, so anything that must reach every
+worker (chat events, cache invalidations) is published with pg_notify() and
+picked up by the single LISTEN connection each worker keeps open.
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.database import async_engine, database
+
+
+# NOTIFY payloads are capped at 8000 bytes by Postgres
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+# How often the idle LISTEN connection is probed so a dead socket is noticed
+KEEPALIVE_SECONDS = 30.0
+
+
+async def notify(channel: str, payload: str) -> None:
+    """
+    Publish a payload on a channel
+
+    Runs on the current unit of work, so inside a transaction the
+    notification is only delivered once it commits.
+    """
+    await database.execute(
+        "SELECT pg_notify(:channel, :payload)",
+        {"channel": channel, "payload": payload},
+    )
+
+
+class PgListener:
+    """One dedicated LISTEN connection per worker, shared by every subscriber"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        """
+        Call handler(payload) for every notification on channel
+
+        Subscribe before start(); channels are (re)attached on every connect.
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    @property
+    def listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self) -> None:
+        if not self._handlers or self._task is not None:
+            return
+
+        self._stopping = False
+        self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        self._stopping = True
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+        await self._close()
+
+    def _dispatch(self, conn, pid, channel, payload: str) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"⚠️  Notification handler for '{channel}' failed: {e}")
+
+    async def _listen_forever(self) -> None:
+        """Keep the LISTEN connection open, reconnecting with backoff on failure"""
+        delay = 1.0
+        url = async_engine.url
+        if settings.listen_database_url:
+            url = make_url(settings.listen_database_url).set(drivername="postgresql+asyncpg")
+
+        # Same host/credentials translation the engine uses for its own connections
+        connect_args, connect_kwargs = async_engine.dialect.create_connect_args(url)
+
+        while not self._stopping:
+            try:
+                self._connection = await asyncpg.connect(*connect_args, **connect_kwargs)
+                for channel in self._handlers:
+                    await self._connection.add_listener(channel, self._dispatch)
+                print(f"✅ Listening for notifications on {', '.join(self._handlers)}")
+                delay = 1.0
+
+                while not self._connection.is_closed():
+                    await asyncio.sleep(KEEPALIVE_SECONDS)
+                    await self._connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Notification listener lost: {e}")
+
+            await self._close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def _close(self) -> None:
+        if self.listening:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+        self._connection = None
+
+
+pg_listener = PgListener()
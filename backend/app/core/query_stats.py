@@ -0,0 +1,209 @@
+"""
+Query instrumentation for DatabaseWrapper
+
+Every statement run through database.fetch_one/fetch_all/execute is
+reduced to a fingerprint: the SQL with literals replaced by ? and
+whitespace collapsed, so the same inline query always lands in the same
+bucket whatever it was called with. Per fingerprint we keep:
+
+- swim360_db_query_duration_seconds{fingerprint} on /metrics, and calls,
+  total and max time in the "queries" section of /health
+- a 🐢 log line when one run takes longer than slow_query_ms, showing the
+  bound parameters' types (never their values)
+
+QueryStatsMiddleware counts the statements each request runs
+(swim360_db_queries_per_request{route}) and warns once per request when one
+fingerprint runs more than n_plus_one_threshold times: the usual sign of a
+query issued inside a loop over another query's rows.
+"""
+import hashlib
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import N_PLUS_ONE, QUERIES_PER_REQUEST, QUERY_DURATION, SLOW_QUERIES, UNMATCHED_ROUTE
+
+# Past this many distinct statements new ones share the "other" fingerprint,
+# keeping label cardinality bounded if some caller builds SQL with literals
+MAX_FINGERPRINTS = 1000
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w:$])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize(query: str) -> str:
+    """The query with comments dropped, literals replaced by ? and whitespace collapsed"""
+    sql = _COMMENT.sub(" ", query)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> Tuple[str, str]:
+    """(short id, normalized SQL) for a query string"""
+    sql = normalize(query)
+    return hashlib.sha1(sql.encode()).hexdigest()[:12], sql
+
+
+def parameter_shapes(values: Optional[dict]) -> Dict[str, str]:
+    """Bound parameters as type names (lists with their length), safe to log"""
+    if not values:
+        return {}
+
+    shapes = {}
+    for name, value in values.items():
+        if isinstance(value, (list, tuple)):
+            shapes[name] = f"{type(value).__name__}[{len(value)}]"
+        else:
+            shapes[name] = type(value).__name__
+    return shapes
+
+
+class RequestQueries:
+    """Statements run while handling one request"""
+
+    __slots__ = ("scope", "total", "by_fingerprint", "warned")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.total = 0
+        self.by_fingerprint: Dict[str, int] = {}
+        self.warned = False
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+class QueryStats:
+    """Per-fingerprint counters for the statements this worker has run"""
+
+    def __init__(self):
+        self.fingerprints: Dict[str, dict] = {}
+        self.slow_queries = 0
+        self.n_plus_one_warnings = 0
+
+    def record(self, query: str, values: Optional[dict], duration: float) -> None:
+        """Account for one statement that took duration seconds"""
+        if not settings.query_stats_enabled:
+            return
+
+        fp, sql = fingerprint(query)
+        entry = self.fingerprints.get(fp)
+        if entry is None:
+            if len(self.fingerprints) >= MAX_FINGERPRINTS:
+                fp, sql = "other", "(fingerprint limit reached)"
+                entry = self.fingerprints.get(fp)
+            if entry is None:
+                entry = self.fingerprints[fp] = {"query": sql, "calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+        ms = duration * 1000
+        entry["calls"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        QUERY_DURATION.labels(fp).observe(duration)
+
+        if ms >= settings.slow_query_ms:
+            self.slow_queries += 1
+            SLOW_QUERIES.labels(fp).inc()
+            print(f"🐢 Slow query ({ms:.0f} ms) [{fp}] {sql} params={parameter_shapes(values)}")
+
+        request = _current_request.get()
+        if request is not None:
+            request.total += 1
+            count = request.by_fingerprint.get(fp, 0) + 1
+            request.by_fingerprint[fp] = count
+
+            if count == settings.n_plus_one_threshold + 1:
+                self.n_plus_one_warnings += 1
+                N_PLUS_ONE.labels(request.route, fp).inc()
+                if not request.warned:
+                    request.warned = True
+                    method = request.scope.get("method")
+                    print(
+                        f"⚠️  Possible N+1 in {method} {request.route}: [{fp}] ran more than "
+                        f"{settings.n_plus_one_threshold} times: {sql}"
+                    )
+
+    def timed(self, query: str, values: Optional[dict]) -> "_Timed":
+        """Context manager recording the statement run inside the block, even if it fails"""
+        return _Timed(self, query, values)
+
+    def request_count(self) -> Optional[int]:
+        """Statements run so far by the current request (None outside a request)"""
+        request = _current_request.get()
+        return request.total if request is not None else None
+
+    def stats(self, top: int = 10) -> dict:
+        """Summary for /health: the fingerprints that took the most time in total"""
+        slowest = sorted(self.fingerprints.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+        return {
+            "enabled": settings.query_stats_enabled,
+            "fingerprints": len(self.fingerprints),
+            "slow_queries": self.slow_queries,
+            "n_plus_one_warnings": self.n_plus_one_warnings,
+            "top": [
+                {
+                    "fingerprint": fp,
+                    "query": entry["query"][:300],
+                    "calls": entry["calls"],
+                    "total_ms": round(entry["total_ms"], 2),
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+                    "max_ms": round(entry["max_ms"], 2),
+                }
+                for fp, entry in slowest
+            ],
+        }
+
+
+class _Timed:
+    __slots__ = ("stats", "query", "values", "start")
+
+    def __init__(self, stats: QueryStats, query: str, values: Optional[dict]):
+        self.stats = stats
+        self.query = query
+        self.values = values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.stats.record(self.query, self.values, time.perf_counter() - self.start)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware that counts the statements each HTTP request runs"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.query_stats_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        # Mutated in place, so tasks spawned by the request (which get a copy
+        # of the context) still count towards it
+        request = RequestQueries(scope)
+        token = _current_request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            QUERIES_PER_REQUEST.labels(request.route).observe(request.total)
+
+
+query_stats = QueryStats()
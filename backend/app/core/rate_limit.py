@@ -0,0 +1,260 @@
+"""
+Token-bucket rate limiting shared by every worker on the host
+
+Each client gets a bucket holding up to rate_limit_per_minute tokens that
+refills at rate_limit_per_minute per minute; a request takes one token or
+is answered 429 with a Retry-After header. Clients are identified by:
+
+- the user behind a valid bearer token (claims come from
+  token_claims_cache, so this is a dict lookup for active clients),
+- otherwise the client IP. Behind a proxy that is the X-Forwarded-For
+  entry the proxy appended (app.core.proxy_headers counts forwarded_hops
+  entries from the right), so a caller can't pick a new IP per request by
+  sending the header itself; without forwarded_allow_ips every anonymous
+  client shares the proxy's IP and therefore one bucket.
+
+/auth/login and /auth/signup additionally get a stricter per-IP bucket
+(rate_limit_auth_per_minute), and /auth/login one per account
+(check_account(), called by the endpoint once it has the email), so
+guessing one account's password stays limited however many addresses the
+attempts come from.
+
+Buckets live in a memory-mapped file (in /dev/shm by default) that all
+workers map, laid out like a set-associative cache: a key hashes to one
+set of WAYS slots, guarded by an fcntl byte-range lock, and a new key
+replaces the least recently used slot of its set. Memory is fixed at
+24 bytes per slot whatever the number of clients.
+"""
+import hashlib
+import math
+import mmap
+import os
+import tempfile
+import time
+from functools import lru_cache
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.security import verify_access_token
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+WAYS = 8
+
+# Per set: WAYS keys (u64), then WAYS token counts, then WAYS last-seen times (f64)
+SET_WORDS = WAYS * 3
+SET_BYTES = SET_WORDS * 8
+
+EXEMPT_PREFIXES = ("/health", "/metrics")
+
+
+def _default_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "swim360-rate-limit")
+
+
+@lru_cache(maxsize=65536)
+def key_hash(key: str) -> int:
+    """Stable (across processes) non-zero 64-bit hash of a bucket key"""
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SharedBuckets:
+    """Fixed-size table of token buckets in shared memory"""
+
+    def __init__(self, path: str, max_keys: int):
+        self.path = path
+        self.sets = max(max_keys // WAYS, 1)
+        size = self.sets * SET_BYTES
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock(0, 0)
+        try:
+            # A table sized for another max_keys would hash keys to other
+            # sets: start over from an empty one
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+        finally:
+            self._unlock(0, 0)
+
+        self._map = mmap.mmap(self._fd, size)
+        view = memoryview(self._map)
+        self._keys = view.cast("Q")
+        self._floats = view.cast("d")
+
+    def _lock(self, offset: int, length: int = 1) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+
+    def _unlock(self, offset: int, length: int = 1) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+
+    def take(self, key: int, capacity: float, per_second: float, now: float) -> float:
+        """
+        Take one token from key's bucket
+
+        Returns 0 if the request may go ahead, otherwise the seconds until a
+        token is available.
+        """
+        index = key % self.sets
+        base = index * SET_WORDS
+        keys = self._keys
+        floats = self._floats
+
+        self._lock(index)
+        try:
+            slots = keys[base:base + WAYS].tolist()
+            if key in slots:
+                slot = slots.index(key)
+                tokens = floats[base + WAYS + slot]
+                last_seen = floats[base + 2 * WAYS + slot]
+                # Another worker may have got the lock first with a later clock reading
+                if now > last_seen:
+                    tokens = min(capacity, tokens + (now - last_seen) * per_second)
+                else:
+                    now = last_seen
+            else:
+                # Unknown key: take an empty slot or evict the least recently used
+                stamps = floats[base + 2 * WAYS:base + SET_WORDS].tolist()
+                slot = slots.index(0) if 0 in slots else stamps.index(min(stamps))
+                keys[base + slot] = key
+                tokens = capacity
+
+            floats[base + 2 * WAYS + slot] = now
+            if tokens >= 1.0:
+                floats[base + WAYS + slot] = tokens - 1.0
+                return 0.0
+
+            floats[base + WAYS + slot] = tokens
+            return (1.0 - tokens) / per_second
+        finally:
+            self._unlock(index)
+
+    def close(self) -> None:
+        self._keys.release()
+        self._floats.release()
+        self._map.close()
+        os.close(self._fd)
+
+
+class RateLimiter:
+    """Picks the buckets a request draws from and checks them"""
+
+    def __init__(self, buckets: Optional[SharedBuckets] = None):
+        self._buckets = buckets
+        # Per-route limits (per IP, per minute) applied on top of the client's own
+        prefix = f"/api/{settings.api_version}/auth"
+        self.route_limits = {
+            f"{prefix}/login": settings.rate_limit_auth_per_minute,
+            f"{prefix}/signup": settings.rate_limit_auth_per_minute,
+        }
+        self.limited = 0
+
+    @property
+    def buckets(self) -> SharedBuckets:
+        # Mapped on first use, i.e. in the worker process rather than at import
+        if self._buckets is None:
+            self._buckets = SharedBuckets(
+                settings.rate_limit_shm_path or _default_path(),
+                settings.rate_limit_max_keys,
+            )
+        return self._buckets
+
+    def check(self, scope: dict) -> float:
+        """0 if the request is within its limits, otherwise seconds to wait"""
+        path = scope["path"]
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+        now = time.monotonic()
+
+        limit = self.route_limits.get(path)
+        if limit:
+            wait = self.buckets.take(key_hash(f"{path}|{ip}"), limit, limit / 60.0, now)
+            if wait:
+                return wait
+
+        limit = settings.rate_limit_per_minute
+        return self.buckets.take(key_hash(self.client_key(scope, ip)), limit, limit / 60.0, now)
+
+    def check_account(self, action: str, account: str) -> float:
+        """
+        0 if attempts at action on one account are within rate_limit_auth_per_minute, otherwise seconds to wait
+
+        Counted whichever address they come from, on top of the per-IP limits.
+        """
+        if not settings.rate_limit_enabled:
+            return 0.0
+        limit = settings.rate_limit_auth_per_minute
+        key = key_hash(f"{action}|account:{account.strip().lower()}")
+        return self.buckets.take(key, limit, limit / 60.0, time.monotonic())
+
+    @staticmethod
+    def client_key(scope: dict, ip: str) -> str:
+        """user:<id> for requests with a valid bearer token, ip:<address> otherwise"""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        claims = verify_access_token(token)
+                    except Exception:
+                        break
+                    user_id = claims.get("sub") or claims.get("user_id")
+                    if user_id:
+                        return f"user:{user_id}"
+                break
+        return f"ip:{ip}"
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.rate_limit_enabled,
+            "per_minute": settings.rate_limit_per_minute,
+            "auth_per_minute": settings.rate_limit_auth_per_minute,
+            "max_keys": settings.rate_limit_max_keys,
+            "limited": self.limited,
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware answering 429 once a client's bucket is empty"""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.rate_limit_enabled
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.limiter.check(scope)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        self.limiter.limited += 1
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "success": False,
+                "error": "Too many requests",
+                "detail": "Rate limit exceeded, please retry later",
+            },
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+        await response(scope, receive, send)
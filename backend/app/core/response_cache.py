@@ -0,0 +1,243 @@
+"""
+Rendered-response cache for public, user-independent GET endpoints
+
+Usage:
+    router = APIRouter(prefix="/events", route_class=CachedRoute)
+
+    @router.get("")
+    @cached(tags=["events"])
+    async def list_events(...): ...
+
+    # in the write handlers
+    await invalidate_cache("events")
+
+Entries are keyed by path + sorted query string and tagged so writes can drop
+exactly the pages they affect. Invalidations are broadcast with NOTIFY so
+every worker's copy is dropped, not just the one that handled the write.
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.pubsub import notify
+from app.core.responses import FastJSONRoute
+
+
+# Response headers that aren't replayed on a HIT: recomputed for the new
+# response, hop-by-hop, or never to be shared between callers
+UNCACHED_HEADERS = frozenset({
+    b"content-length", b"content-type", b"connection", b"keep-alive", b"proxy-authenticate",
+    b"proxy-authorization", b"te", b"trailer", b"transfer-encoding", b"upgrade",
+    b"set-cookie", b"x-cache",
+})
+
+
+class CachedResponse:
+    """A stored response body, the headers the handler set and the tags it was filed under"""
+
+    __slots__ = ("body", "media_type", "headers", "tags", "expires_at")
+
+    def __init__(
+        self,
+        body: bytes,
+        media_type: Optional[str],
+        headers: List[Tuple[bytes, bytes]],
+        tags: Set[str],
+        expires_at: float,
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers
+        self.tags = tags
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    LRU cache of response bodies bounded by entry count and total bytes,
+    with per-entry TTL and tag-based invalidation
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._data.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(
+        self,
+        key: Hashable,
+        body: bytes,
+        media_type: Optional[str],
+        tags: Iterable[str],
+        ttl: Optional[float] = None,
+        headers: Iterable[Tuple[bytes, bytes]] = (),
+    ) -> None:
+        if len(body) > self.max_bytes or self.max_entries <= 0:
+            return
+
+        self._remove(key)
+
+        entry = CachedResponse(
+            body, media_type, [(name, value) for name, value in headers if name.lower() not in UNCACHED_HEADERS], set(tags),
+            time.monotonic() + (self.ttl if ttl is None else ttl),
+        )
+        self._data[key] = entry
+        self.bytes += len(body)
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry filed under any of the tags; returns how many were dropped"""
+        dropped = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                dropped += 1
+
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._tags.clear()
+        self.bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+
+        self.bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def on_invalidate(self, payload: str) -> None:
+        """pg_listener handler for invalidations broadcast by other workers"""
+        try:
+            tags = json.loads(payload)
+        except ValueError:
+            return
+        self.invalidate(*tags)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Counters suitable for health and metrics endpoints"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.response_cache_enabled,
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    max_bytes=settings.response_cache_max_bytes,
+    ttl=settings.response_cache_ttl_seconds,
+)
+
+
+async def invalidate_cache(*tags: str) -> None:
+    """
+    Drop cached responses for the given tags in this worker and, once the
+    current transaction commits, in every other worker
+    """
+    response_cache.invalidate(*tags)
+    await notify(settings.cache_invalidation_channel, json.dumps(list(tags)))
+
+
+def cached(tags: List[str], ttl: Optional[float] = None):
+    """
+    Mark an endpoint's 200 responses as cacheable (needs route_class=CachedRoute)
+
+    Tags may reference path parameters, e.g. "academy:{user_id}".
+    Only use on endpoints whose output does not depend on the caller.
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__response_cache__ = {"tags": tags, "ttl": ttl}
+        return endpoint
+
+    return decorator
+
+
+class CachedRoute(FastJSONRoute):
+    """Route class that serves @cached endpoints from response_cache (and encodes @fast_json ones)"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        policy = getattr(self.endpoint, "__response_cache__", None)
+
+        if policy is None:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            if not settings.response_cache_enabled or request.method != "GET":
+                return await handler(request)
+
+            key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+            entry = response_cache.get(key)
+
+            if entry is not None:
+                # Replay what the handler set on the MISS (pagination, Content-Disposition...)
+                hit = Response(entry.body, media_type=entry.media_type)
+                hit.raw_headers.extend(entry.headers)
+                hit.headers["X-Cache"] = "HIT"
+                return hit
+
+            response = await handler(request)
+
+            # Streamed responses have no body to keep, which is also what
+            # keeps whole-table streams out of the cache
+            body = getattr(response, "body", None)
+            if response.status_code == 200 and body is not None and len(body) <= settings.response_cache_max_entry_bytes:
+                tags = [tag.format(**request.path_params).lower() for tag in policy["tags"]]
+                response_cache.set(key, body, response.media_type, tags, policy["ttl"], response.raw_headers)
+
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return cached_handler
@@ -0,0 +1,203 @@
+"""
+Fast JSON encoding for large responses
+
+By default FastAPI validates whatever an endpoint returns against its
+response_model, converts the result to plain Python objects and then encodes
+those with the stdlib json module. With settings.fast_json_enabled:
+
+- ORJSONResponse becomes the app's default response class, and
+- endpoints marked with @fast_json (on routers with route_class=FastJSONRoute
+  or CachedRoute) are encoded straight to bytes instead:
+
+    @router.get("/all", response_model=List[AcademyDetails])
+    @fast_json(trusted=True)
+    async def get_all_academies(...):
+        return await database.fetch_all("SELECT * FROM academy_details ...")
+
+The plain form validates once with a TypeAdapter built at startup and dumps
+JSON directly from it. trusted=True skips validation altogether: each row's
+model fields are picked out and handed to orjson. Only use it for rows that
+come straight from SELECT with the model's column types; models with
+validators are always validated.
+"""
+import asyncio
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, List, Optional, Tuple, Type, get_args, get_origin
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.config import settings
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:
+    orjson = None
+    ORJSONResponse = None
+
+
+def default_response_class() -> Type[JSONResponse]:
+    """ORJSONResponse when the fast path is on and orjson is installed"""
+    if settings.fast_json_enabled and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+def fast_json(trusted: bool = False):
+    """
+    Mark an endpoint's responses for direct JSON encoding (needs
+    route_class=FastJSONRoute or CachedRoute)
+
+    With trusted=True the rows it returns are not validated; see the module
+    docstring for when that is safe.
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__fast_json__ = {"trusted": trusted}
+        return endpoint
+
+    return decorator
+
+
+def _default(value: Any) -> Any:
+    """orjson fallback for the types asyncpg returns that orjson doesn't know"""
+    if isinstance(value, Decimal):
+        # Same text pydantic writes for Decimal fields
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError
+
+
+def _row_fields(model: Any) -> Optional[List[Tuple[str, str, bool, Any]]]:
+    """
+    (column, output key, required, default) for each field of a flat model,
+    or None if the model can't be encoded without validating it
+    """
+    if not (isinstance(model, type) and issubclass(model, BaseModel)):
+        return None
+
+    decorators = model.__pydantic_decorators__
+    if decorators.validators or decorators.field_validators or decorators.root_validators \
+            or decorators.model_validators or decorators.field_serializers or decorators.model_serializers \
+            or decorators.computed_fields or model.model_config.get("json_encoders"):
+        return None
+
+    # Nested models would be passed through unprojected
+    if any(_mentions_model(field.annotation) for field in model.model_fields.values()):
+        return None
+
+    return [
+        (name, field.alias or name, field.is_required(), field.default)
+        for name, field in model.model_fields.items()
+    ]
+
+
+def _mentions_model(annotation: Any) -> bool:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_mentions_model(arg) for arg in get_args(annotation))
+
+
+class _Untrusted(Exception):
+    """A row is missing a required column; validate the response instead"""
+
+
+class ResponseEncoder:
+    """Encodes one endpoint's responses against its response_model, built once per route"""
+
+    def __init__(self, response_model: Any, trusted: bool = False, by_alias: bool = True):
+        self.adapter = TypeAdapter(response_model)
+        self.by_alias = by_alias
+        self.many = get_origin(response_model) in (list, List)
+
+        # Trusted encoding needs orjson and a flat model (or list of them)
+        self.fields = None
+        if trusted and orjson is not None:
+            model = get_args(response_model)[0] if self.many else response_model
+            self.fields = _row_fields(model)
+            if self.fields is None:
+                print(f"⚠️  {getattr(model, '__name__', model)} needs validating to encode; fast_json(trusted=True) ignored")
+
+    def encode(self, content: Any) -> bytes:
+        if self.fields is not None:
+            try:
+                return self._encode_trusted(content)
+            except _Untrusted:
+                pass
+
+        value = self.adapter.validate_python(content, from_attributes=True)
+        return self.adapter.dump_json(value, by_alias=self.by_alias)
+
+    def _encode_trusted(self, content: Any) -> bytes:
+        if self.many:
+            rows = [self._project(row) for row in content]
+        else:
+            rows = self._project(content)
+        return orjson.dumps(rows, default=_default, option=orjson.OPT_UTC_Z)
+
+    def _project(self, row: Any) -> dict:
+        if isinstance(row, BaseModel):
+            raise _Untrusted()
+
+        mapping = getattr(row, "_mapping", row)
+        document = {}
+        for column, alias, required, default in self.fields:
+            key = alias if self.by_alias else column
+            if column in mapping:
+                document[key] = mapping[column]
+            elif required:
+                raise _Untrusted()
+            else:
+                document[key] = default
+        return document
+
+
+class FastJSONRoute(APIRoute):
+    """Route class that encodes @fast_json endpoints' responses with a ResponseEncoder"""
+
+    def get_route_handler(self) -> Callable:
+        policy = getattr(self.endpoint, "__fast_json__", None)
+        call = self.dependant.call
+
+        if (
+            policy is not None
+            and settings.fast_json_enabled
+            and self.response_model is not None
+            and asyncio.iscoroutinefunction(call)
+            and not getattr(call, "__fast_json_wrapped__", False)
+        ):
+            self.dependant.call = self._wrap(call, ResponseEncoder(
+                self.response_model, trusted=policy["trusted"], by_alias=self.response_model_by_alias,
+            ))
+
+        return super().get_route_handler()
+
+    def _wrap(self, call: Callable, encoder: ResponseEncoder) -> Callable:
+        # Returning a Response makes FastAPI skip its own validation and
+        # encoding, so apply the route's status code and anything the endpoint
+        # set on its injected Response here instead
+        status_code = self.status_code or 200
+        response_param = self.dependant.response_param_name
+
+        async def encoded_call(**values):
+            content = await call(**values)
+            if isinstance(content, Response):
+                return content
+
+            response = Response(encoder.encode(content), status_code=status_code, media_type="application/json")
+
+            sub_response: Optional[Response] = values.get(response_param) if response_param else None
+            if sub_response is not None:
+                if sub_response.status_code:
+                    response.status_code = sub_response.status_code
+                response.headers.raw.extend(
+                    (name, value) for name, value in sub_response.headers.raw if name != b"content-length"
+                )
+            return response
+
+        encoded_call.__fast_json_wrapped__ = True
+        return encoded_call
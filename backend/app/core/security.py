@@ -1,12 +1,16 @@
 """
 Security utilities: password hashing, JWT tokens, etc.
 """
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 
@@ -24,6 +28,87 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool
+
+    A bcrypt round takes a few hundred milliseconds of CPU, which would stall
+    every other request on the worker if run on the event loop. bcrypt
+    releases the GIL, so threads hash in parallel. Once max_pending calls are
+    queued or running, new ones are rejected with a 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="bcrypt",
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password off the event loop"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """Queue depth and throughput counters"""
+        return {
+            "workers": self.workers,
+            "running": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token
@@ -134,6 +219,56 @@ def verify_supabase_jwt(token: str) -> Dict[str, Any]:
         )
 
 
+# Claims of already-verified access tokens, keyed by the raw token and kept
+# until the token's own expiry, so repeat requests skip signature checks.
+token_claims_cache = TTLCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+
+
+def verify_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a bearer token issued either by Supabase Auth or by this API
+
+    The unverified claims are read once to pick the right secret: Supabase
+    tokens carry an `iss` claim, ours don't. Verified claims are cached until
+    the token expires.
+
+    Args:
+        token: JWT token string
+
+    Returns:
+        Decoded token payload
+
+    Raises:
+        HTTPException: If token is malformed, invalid or expired
+    """
+    claims = token_claims_cache.get(token)
+    if claims is not None:
+        return claims
+
+    try:
+        unverified = jwt.get_unverified_claims(token)
+    except JWTError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid token: {str(e)}",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if unverified.get("iss"):
+        claims = verify_supabase_jwt(token)
+    else:
+        claims = decode_token(token)
+
+    expires_in = claims.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_claims_cache.set(token, claims, ttl=expires_in)
+
+    return claims
+
+
 def generate_verification_token(user_id: str, email: str) -> str:
     """Generate email verification token"""
     data = {
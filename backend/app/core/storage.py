@@ -0,0 +1,387 @@
+"""
+Non-blocking object storage for uploaded media
+
+The supabase-py storage client is synchronous: every upload held the
+worker's event loop for the whole round trip, stalling chat and every other
+request on that worker. MediaStorage talks to the Storage REST API with an
+httpx.AsyncClient instead, and:
+
+- streams uploads chunk by chunk from the UploadFile (which Starlette has
+  already spooled to a temporary file), so a photo is never held in memory
+  as a whole, and enforces max_file_size_mb while doing so
+- bounds the uploads in flight per worker (storage_max_concurrent_uploads);
+  the rest wait their turn without blocking anything else
+
+STORAGE_PROVIDER=local swaps in LocalStorage, which writes under
+local_storage_path and is served by the app at /storage (development and
+tests, no Supabase project needed).
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from typing import AsyncIterator, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import aiofiles
+import aiofiles.os
+import httpx
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers, UploadFile
+
+from app.core.config import settings
+
+LOCAL_STORAGE_ROUTE = "/storage"
+
+
+class StorageError(Exception):
+    """The storage backend refused or failed an operation"""
+
+
+async def iter_chunks(data: Union[bytes, UploadFile, AsyncIterator[bytes]], chunk_size: int) -> AsyncIterator[bytes]:
+    """The body to upload as a stream of chunks, whatever form it came in"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = memoryview(data)
+        for offset in range(0, len(data), chunk_size):
+            yield bytes(data[offset:offset + chunk_size])
+    elif isinstance(data, UploadFile):
+        await data.seek(0)
+        while True:
+            chunk = await data.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        async for chunk in data:
+            yield chunk
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the {settings.max_file_size_mb} MB limit",
+    )
+
+
+async def content_digest(data: Union[bytes, UploadFile]) -> Tuple[str, int]:
+    """
+    SHA-256 (hex) and size of an upload, read chunk by chunk
+
+    Raises:
+        HTTPException: 413 once more than max_file_size_mb has been read
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in iter_chunks(data, settings.storage_upload_chunk_bytes):
+        size += len(chunk)
+        if size > settings.max_file_size_bytes:
+            raise _too_large()
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+async def spool(chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> UploadFile:
+    """
+    A stream of chunks as an UploadFile, kept in memory up to 1 MB and on disk
+    beyond, so it can be read more than once (hashed, then uploaded)
+    """
+    file = UploadFile(
+        tempfile.SpooledTemporaryFile(max_size=1024 * 1024),
+        size=0,
+        headers=Headers({"content-type": content_type}) if content_type else None,
+    )
+    async for chunk in chunks:
+        # write() keeps file.size up to date
+        await file.write(chunk)
+        if file.size > settings.max_file_size_bytes:
+            await file.close()
+            raise _too_large()
+    await file.seek(0)
+    return file
+
+
+class StorageBackend:
+    """Where uploaded objects end up; see SupabaseStorage and LocalStorage"""
+
+    async def put(
+        self,
+        bucket: str,
+        path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str] = None,
+        size: Optional[int] = None,
+        upsert: bool = False,
+    ) -> None:
+        raise NotImplementedError
+
+    async def remove(self, bucket: str, paths: List[str]) -> None:
+        raise NotImplementedError
+
+    def public_root(self) -> str:
+        """What every public object URL starts with"""
+        raise NotImplementedError
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"{self.public_root()}{bucket}/{quote(path)}"
+
+    async def list_buckets(self) -> List[str]:
+        raise NotImplementedError
+
+    async def create_bucket(self, name: str, public: bool = True) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage REST API over one pooled httpx.AsyncClient per worker"""
+
+    def __init__(self, url: str, service_key: str):
+        self.url = url.rstrip("/")
+        self._service_key = service_key
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use, i.e. in the worker rather than the preloading master
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.url}/storage/v1",
+                headers={
+                    "Authorization": f"Bearer {self._service_key}",
+                    "apikey": self._service_key,
+                },
+                timeout=httpx.Timeout(settings.storage_timeout_seconds, connect=10.0),
+                limits=httpx.Limits(max_connections=settings.storage_max_concurrent_uploads * 2),
+            )
+        return self._client
+
+    @staticmethod
+    def _check(response: httpx.Response, action: str) -> None:
+        if response.is_success:
+            return
+        try:
+            message = response.json().get("message") or response.text
+        except ValueError:
+            message = response.text
+        raise StorageError(f"{action} failed ({response.status_code}): {message}")
+
+    async def put(self, bucket, path, chunks, content_type=None, size=None, upsert=False) -> None:
+        headers = {
+            "content-type": content_type or "application/octet-stream",
+            "cache-control": "max-age=3600",
+            "x-upsert": "true" if upsert else "false",
+        }
+        # Without a known size httpx sends the body chunked
+        if size is not None:
+            headers["content-length"] = str(size)
+
+        response = await self.client.post(f"/object/{bucket}/{quote(path)}", content=chunks, headers=headers)
+        self._check(response, f"Upload of {bucket}/{path}")
+
+    async def remove(self, bucket: str, paths: List[str]) -> None:
+        response = await self.client.request("DELETE", f"/object/{bucket}", json={"prefixes": paths})
+        self._check(response, f"Delete from {bucket}")
+
+    def public_root(self) -> str:
+        return f"{self.url}/storage/v1/object/public/"
+
+    async def list_buckets(self) -> List[str]:
+        response = await self.client.get("/bucket")
+        self._check(response, "Listing buckets")
+        return [bucket["name"] for bucket in response.json()]
+
+    async def create_bucket(self, name: str, public: bool = True) -> None:
+        response = await self.client.post("/bucket", json={"id": name, "name": name, "public": public})
+        # Another worker created it first: as good as done
+        if response.status_code == 409 or "already exists" in response.text:
+            return
+        self._check(response, f"Creating bucket {name}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files under root/<bucket>/<path>, for development and tests"""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _file(self, bucket: str, path: str) -> str:
+        target = os.path.abspath(os.path.join(self.root, bucket, path))
+        if not target.startswith(os.path.join(self.root, bucket) + os.sep):
+            raise StorageError(f"Invalid object path: {bucket}/{path}")
+        return target
+
+    async def put(self, bucket, path, chunks, content_type=None, size=None, upsert=False) -> None:
+        if not await aiofiles.os.path.isdir(os.path.join(self.root, bucket)):
+            raise StorageError(f"Upload of {bucket}/{path} failed: bucket not found")
+
+        target = self._file(bucket, path)
+        if not upsert and await aiofiles.os.path.exists(target):
+            raise StorageError(f"Upload of {bucket}/{path} failed: the resource already exists")
+
+        await aiofiles.os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Written aside and renamed, so readers never see half a file
+        partial = f"{target}.{uuid.uuid4().hex}.part"
+        try:
+            async with aiofiles.open(partial, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            await aiofiles.os.replace(partial, target)
+        except BaseException:
+            try:
+                await aiofiles.os.remove(partial)
+            except OSError:
+                pass
+            raise
+
+    async def remove(self, bucket: str, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                await aiofiles.os.remove(self._file(bucket, path))
+            except FileNotFoundError:
+                pass
+
+    def public_root(self) -> str:
+        return f"{self.base_url}{LOCAL_STORAGE_ROUTE}/"
+
+    async def list_buckets(self) -> List[str]:
+        if not await aiofiles.os.path.isdir(self.root):
+            return []
+        return sorted(entry.name for entry in await aiofiles.os.scandir(self.root) if entry.is_dir())
+
+    async def create_bucket(self, name: str, public: bool = True) -> None:
+        await aiofiles.os.makedirs(os.path.join(self.root, name), exist_ok=True)
+
+
+def create_backend() -> StorageBackend:
+    """The backend named by settings.storage_provider"""
+    provider = settings.storage_provider.lower()
+    if provider == "supabase":
+        return SupabaseStorage(settings.supabase_url, settings.supabase_service_key)
+    if provider == "local":
+        return LocalStorage(settings.local_storage_path, settings.local_storage_base_url)
+    raise ValueError(f"Unsupported STORAGE_PROVIDER: {settings.storage_provider!r} (use 'supabase' or 'local')")
+
+
+class MediaStorage:
+    """Uploads and deletes through the configured backend, a bounded number at a time"""
+
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.uploads = 0
+        self.failures = 0
+        self.bytes_uploaded = 0
+        self.upload_seconds = 0.0
+
+    @property
+    def backend(self) -> StorageBackend:
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.storage_max_concurrent_uploads)
+        return self._semaphore
+
+    async def upload(
+        self,
+        bucket: str,
+        path: str,
+        data: Union[bytes, UploadFile, AsyncIterator[bytes]],
+        content_type: Optional[str] = None,
+        upsert: bool = False,
+    ) -> str:
+        """
+        Stream data to bucket/path and return its public URL
+
+        Raises:
+            HTTPException: 413 if the body is larger than max_file_size_mb
+            StorageError: if the backend refuses the upload
+        """
+        if isinstance(data, UploadFile):
+            size = data.size
+            content_type = content_type or data.content_type
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            size = len(data)
+        else:
+            size = None
+
+        limit = settings.max_file_size_bytes
+        if size is not None and size > limit:
+            raise _too_large()
+
+        sent = 0
+
+        async def counted() -> AsyncIterator[bytes]:
+            nonlocal sent
+            async for chunk in iter_chunks(data, settings.storage_upload_chunk_bytes):
+                sent += len(chunk)
+                if sent > limit:
+                    raise _too_large()
+                yield chunk
+
+        # Counted down however the wait ends (a client disconnect cancels it)
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.backend.put(bucket, path, counted(), content_type, size, upsert)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.upload_seconds += time.perf_counter() - start
+            self.semaphore.release()
+
+        self.uploads += 1
+        self.bytes_uploaded += sent
+        return self.backend.public_url(bucket, path)
+
+    async def delete(self, bucket: str, paths: List[str]) -> None:
+        await self.backend.remove(bucket, paths)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return self.backend.public_url(bucket, path)
+
+    def public_root(self) -> str:
+        return self.backend.public_root()
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "provider": settings.storage_provider,
+            "max_concurrent_uploads": settings.storage_max_concurrent_uploads,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "uploads": self.uploads,
+            "failures": self.failures,
+            "bytes_uploaded": self.bytes_uploaded,
+            "avg_upload_ms": round(self.upload_seconds / (self.uploads + self.failures) * 1000, 2)
+            if self.uploads + self.failures else None,
+        }
+
+
+media_storage = MediaStorage()
@@ -1,9 +1,20 @@
 """
 Supabase client initialization and utilities
 """
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import AsyncIterator, List, Optional, Union
+
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
 from supabase import create_client, Client
 from gotrue import SyncGoTrueClient
 from app.core.config import settings
+from app.core.media_objects import dedupe_key, media_objects
+from app.core.storage import content_digest, media_storage, spool
 
 
 # Initialize Supabase client
@@ -26,39 +37,81 @@ def get_storage_client():
     return supabase.storage
 
 
-async def upload_file(bucket: str, path: str, file_data: bytes, content_type: str = None) -> str:
+async def upload_file(
+    bucket: str,
+    path: str,
+    file_data: Union[bytes, UploadFile, AsyncIterator[bytes]],
+    content_type: str = None,
+) -> str:
     """
     Upload file to Supabase Storage
 
+    Streams through media_storage (async HTTP, bounded concurrency), so the
+    event loop keeps serving other requests while the upload runs.
+
+    The file is stored as <SHA-256 of its content><extension of path> (a keyed
+    hash of it in private buckets): if the same content is already in the
+    bucket, nothing is uploaded and the URL of the stored copy is returned
+    (see app.core.media_objects).
+
     Args:
         bucket: Storage bucket name
-        path: File path within bucket
-        file_data: File bytes
+        path: File path within bucket (only its extension is kept)
+        file_data: File bytes, an UploadFile (read in chunks) or an async
+            iterator of chunks (spooled to a temporary file to be hashed)
         content_type: MIME type
 
     Returns:
         Public URL of uploaded file
     """
+    spooled = None
     try:
-        # Upload file
-        result = supabase.storage.from_(bucket).upload(
-            path,
-            file_data,
-            file_options={"content-type": content_type} if content_type else None
+        if not isinstance(file_data, (bytes, bytearray, memoryview, UploadFile)):
+            file_data = spooled = await spool(file_data, content_type)
+        if isinstance(file_data, UploadFile):
+            content_type = content_type or file_data.content_type
+
+        content_hash, size = await content_digest(file_data)
+        content_hash = dedupe_key(bucket, content_hash)
+        row = await media_objects.acquire(bucket, content_hash)
+        if row is not None:
+            return media_storage.public_url(bucket, row["path"])
+
+        # Reserve the row first: if the upload (or recording it) fails, releasing
+        # the reference removes the object unless another upload holds it too
+        row = await media_objects.reserve(
+            bucket, content_hash, f"{content_hash}{os.path.splitext(path)[1]}",
+            content_type or "application/octet-stream", size,
         )
-
-        # Get public URL
-        public_url = supabase.storage.from_(bucket).get_public_url(path)
-
-        return public_url
+        if row["stored"]:
+            return media_storage.public_url(bucket, row["path"])
+        try:
+            url = await media_storage.upload(bucket, row["path"], file_data, content_type, upsert=True)
+            await media_objects.mark_stored(bucket, content_hash)
+        except Exception:
+            try:
+                await media_objects.release(bucket, row["path"])
+            except Exception as e:
+                print(f"⚠️  Could not release {bucket}/{row['path']}: {e}")
+            raise
+        return url
+    except HTTPException:
+        raise
     except Exception as e:
         raise Exception(f"Failed to upload file: {str(e)}")
+    finally:
+        if spooled is not None:
+            await spooled.close()
 
 
 async def delete_file(bucket: str, path: str) -> bool:
     """
     Delete file from Supabase Storage
 
+    Drops one reference to the file; it is only removed from storage when
+    that was the last one. Files stored before deduplication are removed
+    directly.
+
     Args:
         bucket: Storage bucket name
         path: File path within bucket
@@ -67,49 +120,113 @@ async def delete_file(bucket: str, path: str) -> bool:
         True if successful
     """
     try:
-        supabase.storage.from_(bucket).remove([path])
+        if await media_objects.release(bucket, path) is None:
+            await media_storage.delete(bucket, [path])
         return True
     except Exception as e:
         raise Exception(f"Failed to delete file: {str(e)}")
 
 
-async def create_bucket_if_not_exists(bucket_name: str, public: bool = True):
+STORAGE_BUCKETS = [
+    "profile-photos",
+    "product-photos",
+    "event-photos",
+    "used-item-photos",
+    "review-photos",
+    "message-attachments",
+    "branch-photos",
+]
+
+
+async def create_bucket_if_not_exists(bucket_name: str, public: bool = True, existing: Optional[List[str]] = None) -> bool:
     """
     Create storage bucket if it doesn't exist
 
     Args:
         bucket_name: Name of bucket to create
         public: Whether bucket should be publicly accessible
+        existing: Bucket names already listed by the caller (listed here if omitted)
+
+    Returns:
+        True if the bucket exists now
     """
     try:
-        # Try to get bucket
-        buckets = supabase.storage.list_buckets()
-        bucket_names = [b.name for b in buckets]
-
-        if bucket_name not in bucket_names:
-            # Create bucket
-            supabase.storage.create_bucket(
-                bucket_name,
-                options={"public": public}
-            )
+        if existing is None:
+            existing = await media_storage.backend.list_buckets()
+
+        if bucket_name not in existing:
+            await media_storage.backend.create_bucket(bucket_name, public=public)
             print(f"✅ Created storage bucket: {bucket_name}")
-        else:
-            print(f"✓ Storage bucket already exists: {bucket_name}")
+        return True
     except Exception as e:
         print(f"❌ Failed to create bucket {bucket_name}: {str(e)}")
+        return False
+
+
+def _buckets_fingerprint() -> dict:
+    """What a bucket check covered: the same storage and the same buckets"""
+    if settings.storage_provider.lower() == "local":
+        location = os.path.abspath(settings.local_storage_path)
+    else:
+        location = settings.supabase_url
+    return {"provider": settings.storage_provider.lower(), "location": location, "buckets": sorted(STORAGE_BUCKETS)}
+
+
+def _buckets_verified() -> Optional[float]:
+    """When the marker file says these buckets were last verified, if recently enough to trust"""
+    path = settings.storage_buckets_marker_path
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    verified_at = marker.get("verified_at")
+    if marker.get("fingerprint") != _buckets_fingerprint() or not isinstance(verified_at, (int, float)):
+        return None
+    if time.time() - verified_at > settings.storage_buckets_marker_ttl_hours * 3600:
+        return None
+    return verified_at
+
+
+def _mark_buckets_verified() -> None:
+    path = settings.storage_buckets_marker_path
+    if not path:
+        return
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Written aside and renamed: workers starting together never read half a file
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+            json.dump({"fingerprint": _buckets_fingerprint(), "verified_at": time.time()}, f)
+        os.replace(f.name, path)
+    except OSError as e:
+        print(f"⚠️  Could not write storage buckets marker {path}: {e}")
 
 
 async def initialize_storage_buckets():
-    """Initialize all required storage buckets"""
-    buckets = [
-        "profile-photos",
-        "product-photos",
-        "event-photos",
-        "used-item-photos",
-        "review-photos",
-        "message-attachments",
-        "branch-photos",
-    ]
-
-    for bucket in buckets:
-        await create_bucket_if_not_exists(bucket, public=True)
+    """
+    Initialize all required storage buckets
+
+    Lists the buckets once and creates the missing ones concurrently. With
+    storage_buckets_marker_path set, a successful check is recorded there
+    and later starts skip it (no storage calls at all) until the marker is
+    storage_buckets_marker_ttl_hours old or the provider, location or bucket
+    list changes.
+    """
+    verified_at = _buckets_verified()
+    if verified_at is not None:
+        age = (time.time() - verified_at) / 3600
+        print(f"✓ Storage buckets verified {age:.1f} h ago, skipping the check")
+        return
+
+    existing = await media_storage.backend.list_buckets()
+    results = await asyncio.gather(
+        *(create_bucket_if_not_exists(bucket, public=True, existing=existing) for bucket in STORAGE_BUCKETS)
+    )
+
+    if all(results):
+        print(f"✓ Storage buckets ready ({len(STORAGE_BUCKETS)})")
+        _mark_buckets_verified()
@@ -3,9 +3,12 @@ Main FastAPI application
 """
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from contextlib import asynccontextmanager
+import hmac
 import time
 
 from app.core.config import (
@@ -16,8 +19,25 @@ from app.core.config import (
     API_CONTACT,
     API_LICENSE,
 )
-from app.core.database import connect_db, disconnect_db, check_db_connection
+from app.core.database import connect_db, disconnect_db, database
+from app.core.health import health_monitor
 from app.core.supabase import initialize_storage_buckets
+from app.core.security import token_claims_cache, password_hasher
+from app.core.pubsub import pg_listener
+from app.core.response_cache import response_cache
+from app.core.responses import default_response_class
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.query_stats import QueryStatsMiddleware, query_stats
+from app.core.rate_limit import RateLimitMiddleware, rate_limiter
+from app.core.proxy_headers import ProxyHeadersMiddleware
+from app.core.media_objects import media_objects
+from app.core.storage import LOCAL_STORAGE_ROUTE, media_storage
+from app.api.dependencies.auth import on_principal_invalidated, principal_cache
+from app.serve import read_worker_status
+from app.services.chat_realtime import chat_hub
+from app.services.search_suggest import suggest_index
+from app.services.geo_index import geo_index
+from app.services.image_pipeline import image_pipeline
 
 # Import routers
 from app.api.endpoints import auth
@@ -33,6 +53,9 @@ from app.api.endpoints import reviews
 from app.api.endpoints import academies
 from app.api.endpoints import clinics
 from app.api.endpoints import stores
+from app.api.endpoints import search
+from app.api.endpoints import nearby
+from app.api.endpoints import media
 
 
 @asynccontextmanager
@@ -50,6 +73,16 @@ async def lifespan(app: FastAPI):
         print(f"⚠️  Database connection failed: {e}")
         print("⚠️  API will start without database connection")
 
+    # Cross-worker notifications (retries in the background until Postgres is reachable)
+    await chat_hub.start()
+    await suggest_index.start()
+    await geo_index.start()
+    pg_listener.subscribe(settings.cache_invalidation_channel, response_cache.on_invalidate)
+    pg_listener.subscribe(settings.principal_invalidation_channel, on_principal_invalidated)
+    await pg_listener.start()
+    await metrics.start()
+    await health_monitor.start()
+
     # Try to initialize storage buckets
     try:
         await initialize_storage_buckets()
@@ -62,10 +95,19 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("⏳ Shutting down Swim360 API...")
+    await chat_hub.stop()
+    await suggest_index.stop()
+    await geo_index.stop()
+    await pg_listener.stop()
+    await metrics.stop()
+    await health_monitor.stop()
+    await media_storage.close()
     try:
         await disconnect_db()
     except Exception:
         pass
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
     print("👋 Swim360 API stopped")
 
 
@@ -80,11 +122,20 @@ app = FastAPI(
     redoc_url=f"/api/{settings.api_version}/redoc",
     openapi_url=f"/api/{settings.api_version}/openapi.json",
     lifespan=lifespan,
+    default_response_class=default_response_class(),
 )
 
 
 # ==================== MIDDLEWARE ====================
 
+# Rate limiting (added first so it sits inside CORS: 429s keep their CORS
+# headers and preflight requests aren't counted)
+app.add_middleware(RateLimitMiddleware)
+
+# Client address and scheme from the proxy's X-Forwarded-For/-Proto (wraps the
+# rate limiter, which keys anonymous clients on that address)
+app.add_middleware(ProxyHeadersMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -109,11 +160,26 @@ async def log_requests(request: Request, call_next):
     response.headers["X-Process-Time"] = str(process_time)
 
     if settings.debug:
-        print(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.3f}s")
+        queries = query_stats.request_count()
+        print(
+            f"{request.method} {request.url.path} - {response.status_code} - {process_time:.3f}s"
+            + (f" - {queries} queries" if queries is not None else "")
+        )
 
     return response
 
 
+# Per-request query counting (wraps log_requests so it can report the count)
+app.add_middleware(QueryStatsMiddleware)
+
+# Request metrics (outermost, so the timing covers every other middleware)
+app.add_middleware(MetricsMiddleware)
+
+metrics.track_cache("principals", principal_cache)
+metrics.track_cache("tokens", token_claims_cache)
+metrics.track_cache("responses", response_cache)
+
+
 # ==================== EXCEPTION HANDLERS ====================
 
 @app.exception_handler(RequestValidationError)
@@ -137,6 +203,20 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_exception_handler(request: Request, exc: PoolTimeoutError):
+    """Handle database pool exhaustion"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "success": False,
+            "error": "Service temporarily unavailable",
+            "detail": "Database is busy, please retry shortly",
+        },
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions"""
@@ -167,19 +247,88 @@ async def root():
     }
 
 
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    """Liveness probe: the worker's event loop is answering (no I/O)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    """Readiness probe, served from the last background check (503 when not ready)"""
+    report = health_monitor.readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=report,
+    )
+
+
+def _has_metrics_token(request: Request) -> bool:
+    """Whether the caller sent METRICS_TOKEN as a bearer token (never true while it is unset)"""
+    if not settings.metrics_token:
+        return False
+    supplied = request.headers.get("authorization", "")
+    return hmac.compare_digest(supplied.encode(), f"Bearer {settings.metrics_token}".encode())
+
+
 @app.get("/health", tags=["Health"])
-async def health_check():
-    """Health check endpoint"""
-    db_healthy = await check_db_connection()
+async def health_check(request: Request):
+    """
+    Status summary (database state comes from the background health check)
 
-    return {
+    Pool, cache, worker and per-query details (which include SQL text) are
+    only added for callers that send METRICS_TOKEN as a bearer token.
+    """
+    readiness_report = health_monitor.readiness()
+    db_healthy = readiness_report["checks"]["database"] == "ok"
+
+    report = {
         "status": "healthy" if db_healthy else "unhealthy",
         "version": API_VERSION_INFO,
         "environment": settings.environment,
         "database": "connected" if db_healthy else "disconnected",
+        "readiness": readiness_report,
+    }
+    if not _has_metrics_token(request):
+        return report
+
+    return {
+        **report,
+        "pool": database.pool_stats(),
+        "password_hashing": password_hasher.stats(),
+        "image_processing": image_pipeline.stats(),
+        "chat": chat_hub.stats(),
+        "search_suggest": suggest_index.stats(),
+        "geo_index": geo_index.stats(),
+        "queries": query_stats.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "storage": media_storage.stats(),
+        "media_dedupe": media_objects.stats(),
+        "workers": read_worker_status(),
+        "caches": {
+            "principals": principal_cache.stats(),
+            "tokens": token_claims_cache.stats(),
+            "responses": response_cache.stats(),
+        },
     }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus metrics for every worker (scrape with METRICS_TOKEN as a bearer token)"""
+    if not settings.metrics_token:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Not Found"})
+    if not _has_metrics_token(request):
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content={"detail": "Not authenticated"},
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 # ==================== API ROUTES ====================
 
 API_PREFIX = f"/api/{settings.api_version}"
@@ -198,15 +347,28 @@ app.include_router(reviews.router, prefix=API_PREFIX)
 app.include_router(academies.router, prefix=API_PREFIX)
 app.include_router(clinics.router, prefix=API_PREFIX)
 app.include_router(stores.router, prefix=API_PREFIX)
+app.include_router(search.router, prefix=API_PREFIX)
+app.include_router(nearby.router, prefix=API_PREFIX)
+app.include_router(media.router, prefix=API_PREFIX)
+
+# Files stored by the local storage backend (Supabase serves its own)
+if settings.storage_provider.lower() == "local":
+    app.mount(LOCAL_STORAGE_ROUTE, StaticFiles(directory=settings.local_storage_path, check_dir=False), name="storage")
 
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level=settings.log_level.lower(),
-    )
+    if settings.debug:
+        import uvicorn
+
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=True,
+            log_level=settings.log_level.lower(),
+        )
+    else:
+        # settings.workers processes, see app/serve.py
+        from app.serve import main
+
+        main()
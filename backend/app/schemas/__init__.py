@@ -11,4 +11,6 @@ from app.schemas.order import *
 from app.schemas.event import *
 from app.schemas.chat import *
 from app.schemas.review import *
+from app.schemas.search import *
+from app.schemas.media import *
 from app.schemas.common import *
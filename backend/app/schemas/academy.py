@@ -3,9 +3,11 @@ Academy-related Pydantic schemas
 """
 from typing import Optional, List
 from datetime import datetime, date
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, UUID4, Field
 from decimal import Decimal
 
+from app.schemas.review import RatingSummary
+
 
 # ============================================
 # ACADEMY DETAILS SCHEMAS
@@ -58,6 +60,8 @@ class AcademyBranchBase(BaseModel):
     city: Optional[str] = None
     governorate: Optional[str] = None
     location_url: Optional[str] = None
+    latitude: Optional[Decimal] = Field(None, ge=-90, le=90)
+    longitude: Optional[Decimal] = Field(None, ge=-180, le=180)
     opening_time: Optional[str] = None
     closing_time: Optional[str] = None
     operating_days: Optional[List[str]] = None
@@ -74,6 +78,8 @@ class AcademyBranchUpdate(BaseModel):
     city: Optional[str] = None
     governorate: Optional[str] = None
     location_url: Optional[str] = None
+    latitude: Optional[Decimal] = Field(None, ge=-90, le=90)
+    longitude: Optional[Decimal] = Field(None, ge=-180, le=180)
     opening_time: Optional[str] = None
     closing_time: Optional[str] = None
     operating_days: Optional[List[str]] = None
@@ -245,3 +251,21 @@ class AcademyCoach(AcademyCoachBase):
 
     class Config:
         from_attributes = True
+
+
+# ============================================
+# ACADEMY PROFILE SCHEMAS
+# ============================================
+
+class AcademyBranchWithPools(AcademyBranch):
+    """Academy branch with its pools"""
+    pools: List[AcademyPool] = []
+
+
+class AcademyProfile(BaseModel):
+    """Everything the public academy page shows, in one response"""
+    details: AcademyDetails
+    branches: List[AcademyBranchWithPools] = []
+    coaches: List[AcademyCoach] = []
+    programs: List[AcademyProgram] = []
+    rating: RatingSummary
@@ -60,9 +60,13 @@ class ConversationListResponse(BaseModel):
 
 
 class MessageListResponse(BaseModel):
-    """List of messages"""
-    total: int
+    """List of messages, newest first"""
+    total: Optional[int] = None
     messages: List[MessageResponse]
+    # Pass as `before` to load older messages; null when there are none
+    next_cursor: Optional[str] = None
+    # Pass as `after` to load messages newer than this page
+    prev_cursor: Optional[str] = None
 
 
 class MarkMessageReadRequest(BaseModel):
@@ -3,9 +3,11 @@ Clinic-related Pydantic schemas
 """
 from typing import Optional, List
 from datetime import datetime, date
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, UUID4, Field
 from decimal import Decimal
 
+from app.schemas.review import RatingSummary
+
 
 # ============================================
 # CLINIC DETAILS SCHEMAS
@@ -56,6 +58,8 @@ class ClinicBranchBase(BaseModel):
     governorate: Optional[str] = None
     city: Optional[str] = None
     location_url: Optional[str] = None
+    latitude: Optional[Decimal] = Field(None, ge=-90, le=90)
+    longitude: Optional[Decimal] = Field(None, ge=-180, le=180)
     number_of_beds: Optional[int] = 1
     opening_hour: Optional[str] = None
     opening_minute: Optional[str] = None
@@ -77,6 +81,8 @@ class ClinicBranchUpdate(BaseModel):
     governorate: Optional[str] = None
     city: Optional[str] = None
     location_url: Optional[str] = None
+    latitude: Optional[Decimal] = Field(None, ge=-90, le=90)
+    longitude: Optional[Decimal] = Field(None, ge=-180, le=180)
     number_of_beds: Optional[int] = None
     opening_hour: Optional[str] = None
     opening_minute: Optional[str] = None
@@ -181,3 +187,15 @@ class ClinicBooking(ClinicBookingBase):
 
     class Config:
         from_attributes = True
+
+
+# ============================================
+# CLINIC PROFILE SCHEMAS
+# ============================================
+
+class ClinicProfile(BaseModel):
+    """Everything the public clinic page shows, in one response"""
+    details: ClinicDetails
+    branches: List[ClinicBranch] = []
+    services: List[ClinicService] = []
+    rating: RatingSummary
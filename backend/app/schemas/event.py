@@ -2,7 +2,7 @@
 Event-related schemas
 """
 from typing import Optional, List
-from datetime import date, time
+from datetime import date, datetime, time
 from decimal import Decimal
 from pydantic import BaseModel, UUID4, Field
 from app.schemas.common import EventType, PaymentStatus, TimestampMixin
@@ -104,13 +104,13 @@ class EventRegistrationResponse(TimestampMixin):
     id: UUID4
     event_id: UUID4
     user_id: UUID4
-    registration_date: str
+    registration_date: datetime
     payment_status: PaymentStatus
     amount_paid: Optional[Decimal] = None
     checked_in: bool
-    checked_in_at: Optional[str] = None
+    checked_in_at: Optional[datetime] = None
     is_cancelled: bool
-    cancelled_at: Optional[str] = None
+    cancelled_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,43 @@
+"""
+Media upload schemas
+"""
+from enum import Enum
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+
+class MediaBucket(str, Enum):
+    PROFILE_PHOTOS = "profile-photos"
+    PRODUCT_PHOTOS = "product-photos"
+    EVENT_PHOTOS = "event-photos"
+    USED_ITEM_PHOTOS = "used-item-photos"
+    REVIEW_PHOTOS = "review-photos"
+    MESSAGE_ATTACHMENTS = "message-attachments"
+    BRANCH_PHOTOS = "branch-photos"
+
+
+# {photo URL: {"thumb"|"medium"|"large": {"url": ..., "webp": ...}}}, as stored
+# in a row's photo_variants column
+PhotoVariants = Dict[str, Dict[str, Dict[str, str]]]
+
+
+class ImageVariant(BaseModel):
+    """One size of a processed photo, as JPEG (PNG with transparency) and WebP"""
+    url: str
+    webp: str
+    width: int
+    height: int
+
+
+class UploadedMedia(BaseModel):
+    """A file stored by POST /media/{bucket}"""
+    bucket: MediaBucket
+    path: str
+    # The large variant for processed photos
+    url: str
+    content_type: str
+    size: int
+    # thumb, medium and large; null for buckets stored as uploaded
+    variants: Optional[Dict[str, ImageVariant]] = None
+    # You had already uploaded an identical file: this upload shares it
+    deduplicated: bool = False
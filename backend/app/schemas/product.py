@@ -5,6 +5,7 @@ from typing import Optional, List
 from decimal import Decimal
 from pydantic import BaseModel, UUID4, Field, field_validator
 from app.schemas.common import ProductCategory, ProductCondition, TimestampMixin
+from app.schemas.media import PhotoVariants
 
 
 class ProductBase(BaseModel):
@@ -50,6 +51,7 @@ class ProductResponse(ProductBase, TimestampMixin):
     id: UUID4
     store_id: UUID4
     photos: List[str] = []
+    photo_variants: PhotoVariants = {}
     intro_video_url: Optional[str] = None
     available_colors: List[str] = []
     available_sizes: List[str] = []
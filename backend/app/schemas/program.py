@@ -1,6 +1,7 @@
 """
 Program-related schemas (academies and coaches)
 """
+from datetime import date, datetime
 from typing import Optional, List
 from decimal import Decimal
 from pydantic import BaseModel, UUID4, Field
@@ -78,15 +79,15 @@ class ProgramEnrollmentResponse(BaseModel):
     id: UUID4
     swimmer_id: UUID4
     program_id: UUID4
-    start_date: str
-    end_date: Optional[str] = None
+    start_date: date
+    end_date: Optional[date] = None
     is_active: bool
     amount_paid: Decimal
     payment_status: str
     sessions_attended: int
     sessions_total: Optional[int] = None
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
 
     class Config:
         from_attributes = True
@@ -1,7 +1,7 @@
 """
 Review and rating schemas
 """
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from pydantic import BaseModel, UUID4, Field, field_validator
 from app.schemas.common import TimestampMixin
@@ -59,6 +59,14 @@ class ReviewListResponse(BaseModel):
     reviews: List[ReviewResponse]
 
 
+class RatingSummary(BaseModel):
+    """Active review count, average and per-star counts for one target"""
+    count: int = 0
+    average: float = 0.0
+    # Number of reviews per star rating, 1 to 5
+    distribution: Dict[int, int] = {}
+
+
 class ReviewFilterParams(BaseModel):
     """Review filter parameters"""
     target_id: Optional[UUID4] = None
@@ -0,0 +1,50 @@
+"""
+Search and typeahead schemas
+"""
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class BranchType(str, Enum):
+    ACADEMY = "academy"
+    CLINIC = "clinic"
+    STORE = "store"
+
+
+class SuggestionType(str, Enum):
+    ACADEMY = "academy"
+    CLINIC = "clinic"
+    STORE = "store"
+    BRAND = "brand"
+    CITY = "city"
+
+
+class SearchSuggestion(BaseModel):
+    """One typeahead suggestion"""
+    type: SuggestionType
+    label: str
+    # Profile id for academies, clinics and stores; null for brands and cities
+    id: Optional[str] = None
+
+
+class SuggestResponse(BaseModel):
+    """Typeahead suggestions for a partially typed query"""
+    query: str
+    suggestions: List[SearchSuggestion]
+
+
+class NearbyBranch(BaseModel):
+    """A branch near the requested point"""
+    type: BranchType
+    id: str
+    # The academy, clinic or store the branch belongs to
+    owner_id: str
+    name: Optional[str] = None
+    city: Optional[str] = None
+    governorate: Optional[str] = None
+    latitude: float
+    longitude: float
+    distance_km: float
+    # Null when the branch has no opening hours on file
+    is_open: Optional[bool] = None
@@ -6,6 +6,9 @@ from datetime import datetime, date
 from pydantic import BaseModel, UUID4, Field
 from decimal import Decimal
 
+from app.schemas.media import PhotoVariants
+from app.schemas.review import RatingSummary
+
 
 # ============================================
 # STORE DETAILS SCHEMAS
@@ -61,6 +64,8 @@ class StoreBranchBase(BaseModel):
     governorate: Optional[str] = None
     city: Optional[str] = None
     location_url: Optional[str] = None
+    latitude: Optional[Decimal] = Field(None, ge=-90, le=90)
+    longitude: Optional[Decimal] = Field(None, ge=-180, le=180)
     branch_phone: Optional[str] = None
     opening_hour: Optional[str] = None
     opening_minute: Optional[str] = None
@@ -82,6 +87,8 @@ class StoreBranchUpdate(BaseModel):
     governorate: Optional[str] = None
     city: Optional[str] = None
     location_url: Optional[str] = None
+    latitude: Optional[Decimal] = Field(None, ge=-90, le=90)
+    longitude: Optional[Decimal] = Field(None, ge=-180, le=180)
     branch_phone: Optional[str] = None
     opening_hour: Optional[str] = None
     opening_minute: Optional[str] = None
@@ -147,6 +154,18 @@ class StoreProduct(StoreProductBase):
         from_attributes = True
 
 
+# ============================================
+# STORE PROFILE SCHEMAS
+# ============================================
+
+class StoreProfile(BaseModel):
+    """Everything the public store page shows, in one response"""
+    details: StoreDetails
+    branches: List[StoreBranch] = []
+    products: List[StoreProduct] = []
+    rating: RatingSummary
+
+
 # ============================================
 # ORDER ITEM SCHEMAS
 # ============================================
@@ -279,6 +298,7 @@ class UsedItem(UsedItemBase):
     """Used item response"""
     id: UUID4
     seller_id: UUID4 = Field(alias="sellerId")
+    photo_variants: PhotoVariants = Field({}, alias="photoVariants")
     is_sold: bool = Field(alias="isSold")
     is_active: bool = Field(alias="isActive")
     view_count: int = Field(alias="viewCount")
@@ -6,6 +6,7 @@ from datetime import datetime, date
 from decimal import Decimal
 from pydantic import BaseModel, EmailStr, Field, UUID4
 from app.schemas.common import UserRole, TimestampMixin
+from app.schemas.media import PhotoVariants
 
 
 # ==================== PROFILE SCHEMAS ====================
@@ -55,6 +56,7 @@ class ProfileResponse(ProfileBase, TimestampMixin):
     role: UserRole
     email: EmailStr
     profile_photo_url: Optional[str] = None
+    photo_variants: PhotoVariants = {}
     language: str
     notifications_enabled: bool
     email_notifications_enabled: bool
@@ -269,6 +271,7 @@ class BranchResponse(BranchBase, TimestampMixin):
     owner_type: UserRole
     is_active: bool
     branch_photo_url: Optional[str] = None
+    photo_variants: PhotoVariants = {}
 
     class Config:
         from_attributes = True
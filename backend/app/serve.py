@@ -0,0 +1,466 @@
+"""
+Production launcher: a pre-forking master running settings.workers uvicorn workers
+
+    python -m app.serve [--workers 8] [--host 0.0.0.0] [--port 8000] [--no-preload]
+                        [--forwarded-allow-ips '*'] [--forwarded-hops 1]
+
+The master binds the listening socket once and forks the workers, which all
+accept from it. With serve_preload the app is imported before forking, so
+workers share its memory copy-on-write and an import error stops the
+launcher instead of crash-looping workers.
+
+The master then supervises the workers:
+
+- each worker reports requests served and open connections every second
+  through a pipe; one silent for serve_worker_timeout_seconds is killed
+- a worker past serve_max_requests (plus up to 10% jitter) or
+  serve_max_rss_mb is recycled: a replacement is started first and the old
+  worker is only told to drain once the new one is serving
+- SIGHUP recycles every worker that way, one at a time (rolling restart)
+- SIGTERM / SIGINT drain every worker and exit
+
+Draining is uvicorn's graceful shutdown: the worker stops accepting (the
+others keep accepting from the shared socket), finishes in-flight
+requests within serve_graceful_timeout_seconds and closes WebSockets with
+1012 (service restart), so chat clients reconnect to another worker.
+
+Workers take the client address from X-Forwarded-For/-Proto sent by the
+proxies in forwarded_allow_ips, counting forwarded_hops entries from the
+right (app.core.proxy_headers), so rate limits and access logs see the
+real client. uvicorn's own proxy_headers is off: it would trust the
+caller-supplied leftmost entry under "*".
+
+Per-worker state is written to serve_status_path and shown under
+"workers" in /health (to callers with METRICS_TOKEN).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import select
+import shutil
+import signal
+import socket
+import tempfile
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+HEARTBEAT_SECONDS = 1.0
+
+# Consecutive workers dying before they start serving before the master gives up
+MAX_BOOT_FAILURES = 5
+
+
+def status_path() -> str:
+    if settings.serve_status_path:
+        return settings.serve_status_path
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "swim360-workers.json")
+
+
+def read_worker_status() -> Optional[dict]:
+    """The launcher's latest per-worker report (None when not run by the launcher)"""
+    try:
+        with open(status_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in MB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Worker:
+    """The master's view of one worker process"""
+
+    def __init__(self, pid: int, fd: int):
+        self.pid = pid
+        self.fd = fd
+        self.started_at = time.time()
+        self.last_heartbeat = time.monotonic()
+        self.ready = False
+        self.requests = 0
+        self.connections = 0
+        self.rss_mb: Optional[float] = None
+        self.draining_since: Optional[float] = None
+        self.max_requests = 0
+        if settings.serve_max_requests > 0:
+            self.max_requests = settings.serve_max_requests + random.randint(0, settings.serve_max_requests // 10)
+        self._buffer = b""
+
+    @property
+    def state(self) -> str:
+        if self.draining_since is not None:
+            return "draining"
+        return "ready" if self.ready else "starting"
+
+    def read_heartbeats(self) -> None:
+        try:
+            self._buffer += os.read(self.fd, 65536)
+        except (BlockingIOError, OSError):
+            return
+
+        *lines, self._buffer = self._buffer.split(b"\n")
+        if not lines:
+            return
+
+        report = json.loads(lines[-1])
+        self.last_heartbeat = time.monotonic()
+        self.ready = report["started"]
+        self.requests = report["requests"]
+        self.connections = report["connections"]
+
+    def report(self) -> dict:
+        return {
+            "pid": self.pid,
+            "state": self.state,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "connections": self.connections,
+            "rss_mb": round(self.rss_mb, 1) if self.rss_mb is not None else None,
+            "last_heartbeat_seconds": round(time.monotonic() - self.last_heartbeat, 1),
+        }
+
+
+class Master:
+    """Forks, supervises and recycles the workers"""
+
+    def __init__(self, host: str, port: int, workers: int, preload: bool):
+        self.host = host
+        self.port = port
+        self.count = max(workers, 1)
+        self.preload = preload
+        self.app = None
+        self.sock: Optional[socket.socket] = None
+        self.workers: Dict[int, Worker] = {}
+        self.retire_queue: List[int] = []
+        self.rotating: Optional[tuple] = None
+        self.stopping = False
+        self.exit_code = 0
+        self.restarts = 0
+        self.boot_failures = 0
+        self._status_written = 0.0
+
+    # ---------- master ----------
+
+    def run(self) -> int:
+        self._prepare_metrics_dir()
+        self.sock = socket.create_server((self.host, self.port), backlog=2048)
+
+        if self.preload:
+            from app.main import app
+            self.app = app
+
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+        signal.set_wakeup_fd(self._wake_w)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+        print(f"🚀 Swim360 master {os.getpid()} on {self.host}:{self.port} with {self.count} workers"
+              f" ({'preloaded' if self.preload else 'no preload'})")
+        for _ in range(self.count):
+            self._spawn()
+
+        while not self.stopping:
+            self._wait()
+            self._reap()
+            self._supervise()
+            self._rotate()
+            self._maintain()
+            self._write_status()
+
+        self._shutdown()
+        return self.exit_code
+
+    def _on_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _on_reload(self, signum, frame) -> None:
+        print(f"🔄 Rolling restart of {len(self.workers)} workers")
+        self.retire_queue.extend(pid for pid, w in self.workers.items() if w.draining_since is None)
+
+    def _prepare_metrics_dir(self) -> None:
+        """Give the workers an empty shared metrics directory (see app.core.metrics)"""
+        directory = settings.metrics_multiproc_dir or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        if directory is None:
+            if self.count == 1:
+                return
+            directory = tempfile.mkdtemp(prefix="swim360-metrics-")
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+    def _wait(self) -> None:
+        fds = [self._wake_r] + [w.fd for w in self.workers.values()]
+        try:
+            readable, _, _ = select.select(fds, [], [], HEARTBEAT_SECONDS)
+        except InterruptedError:
+            return
+
+        for fd in readable:
+            if fd == self._wake_r:
+                try:
+                    os.read(self._wake_r, 4096)
+                except BlockingIOError:
+                    pass
+                continue
+            for worker in self.workers.values():
+                if worker.fd == fd:
+                    worker.read_heartbeats()
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.fd)
+            self._forget_metrics(pid)
+
+            if worker.draining_since is not None:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            print(f"⚠️  Worker {pid} exited unexpectedly ({code})")
+            if not worker.ready:
+                self.boot_failures += 1
+                if self.boot_failures >= MAX_BOOT_FAILURES:
+                    print(f"❌ {self.boot_failures} workers in a row failed to start; stopping")
+                    self.exit_code = 1
+                    self.stopping = True
+
+    def _forget_metrics(self, pid: int) -> None:
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid)
+
+    def _supervise(self) -> None:
+        now = time.monotonic()
+
+        for pid, worker in list(self.workers.items()):
+            worker.rss_mb = rss_mb(pid)
+
+            if worker.draining_since is not None:
+                if now - worker.draining_since > settings.serve_graceful_timeout_seconds + 5:
+                    print(f"⚠️  Worker {pid} still draining; killing it")
+                    self._signal(pid, signal.SIGKILL)
+                continue
+
+            if now - worker.last_heartbeat > settings.serve_worker_timeout_seconds:
+                print(f"⚠️  Worker {pid} missed heartbeats for {now - worker.last_heartbeat:.0f}s; killing it")
+                self._signal(pid, signal.SIGKILL)
+                continue
+
+            if not worker.ready or pid in self.retire_queue or (self.rotating and self.rotating[0] == pid):
+                continue
+
+            self.boot_failures = 0
+            if worker.max_requests and worker.requests >= worker.max_requests:
+                print(f"♻️  Recycling worker {pid} after {worker.requests} requests")
+                self.retire_queue.append(pid)
+            elif settings.serve_max_rss_mb and worker.rss_mb and worker.rss_mb > settings.serve_max_rss_mb:
+                print(f"♻️  Recycling worker {pid} at {worker.rss_mb:.0f} MB resident")
+                self.retire_queue.append(pid)
+
+    def _rotate(self) -> None:
+        """Replace retiring workers one at a time: start the new one, then drain the old"""
+        if self.rotating is None:
+            while self.retire_queue:
+                old = self.retire_queue.pop(0)
+                if old in self.workers and self.workers[old].draining_since is None:
+                    self.rotating = (old, self._spawn())
+                    break
+            return
+
+        old, new = self.rotating
+        if new not in self.workers:
+            # Replacement died while starting; try again later
+            self.rotating = None
+            self.retire_queue.insert(0, old)
+        elif self.workers[new].ready:
+            self.rotating = None
+            self.restarts += 1
+            self._drain(old)
+
+    def _maintain(self) -> None:
+        """Start workers until the configured number are running (crashed ones are replaced)"""
+        target = self.count + (1 if self.rotating else 0)
+        active = sum(1 for w in self.workers.values() if w.draining_since is None)
+        for _ in range(target - active):
+            if self.boot_failures:
+                time.sleep(min(2 ** self.boot_failures / 10, 5))
+            self._spawn()
+
+    def _drain(self, pid: int) -> None:
+        worker = self.workers.get(pid)
+        if worker is not None and worker.draining_since is None:
+            worker.draining_since = time.monotonic()
+            self._signal(pid, signal.SIGTERM)
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _write_status(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self._status_written < HEARTBEAT_SECONDS:
+            return
+        self._status_written = time.monotonic()
+
+        status = {
+            "master_pid": os.getpid(),
+            "target": self.count,
+            "restarts": self.restarts,
+            "updated_at": time.time(),
+            "workers": [w.report() for w in sorted(self.workers.values(), key=lambda w: w.started_at)],
+        }
+        path = status_path()
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(status, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"⚠️  Could not write worker status: {e}")
+
+    def _shutdown(self) -> None:
+        print(f"⏳ Draining {len(self.workers)} workers...")
+        for pid in list(self.workers):
+            self._drain(pid)
+
+        deadline = time.monotonic() + settings.serve_graceful_timeout_seconds + 5
+        while self.workers and time.monotonic() < deadline:
+            self._wait()
+            self._reap()
+        for pid in self.workers:
+            self._signal(pid, signal.SIGKILL)
+
+        self.sock.close()
+        try:
+            os.remove(status_path())
+        except OSError:
+            pass
+        print("👋 Swim360 master stopped")
+
+    # ---------- workers ----------
+
+    def _spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            code = 0
+            try:
+                os.close(read_fd)
+                self._run_worker(write_fd)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        self.workers[pid] = Worker(pid, read_fd)
+        return pid
+
+    def _run_worker(self, heartbeat_fd: int) -> None:
+        import uvicorn
+
+        # Undo the master's signal setup; uvicorn installs its own handlers
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        for fd in [self._wake_r, self._wake_w] + [w.fd for w in self.workers.values()]:
+            os.close(fd)
+        random.seed()
+
+        config = uvicorn.Config(
+            self.app or "app.main:app",
+            log_level=settings.log_level.lower(),
+            timeout_graceful_shutdown=settings.serve_graceful_timeout_seconds,
+            proxy_headers=False,
+        )
+        server = uvicorn.Server(config)
+        os.set_blocking(heartbeat_fd, False)
+        asyncio.run(self._serve(server, heartbeat_fd))
+
+    async def _serve(self, server, heartbeat_fd: int) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(server, heartbeat_fd))
+        try:
+            await server.serve(sockets=[self.sock])
+        finally:
+            heartbeat.cancel()
+
+    @staticmethod
+    async def _heartbeat(server, fd: int) -> None:
+        master = os.getppid()
+        while True:
+            state = server.server_state
+            report = {
+                "started": server.started,
+                "requests": state.total_requests,
+                "connections": len(state.connections),
+            }
+            try:
+                os.write(fd, (json.dumps(report) + "\n").encode())
+            except BlockingIOError:
+                pass
+            except BrokenPipeError:
+                server.should_exit = True
+
+            # Don't outlive the master
+            if os.getppid() != master:
+                server.should_exit = True
+
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Swim360 API with several worker processes")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=settings.serve_preload)
+    parser.add_argument(
+        "--forwarded-allow-ips",
+        default=settings.forwarded_allow_ips,
+        help="Proxies (IPs or networks) trusted to set X-Forwarded-For ('*' for any)",
+    )
+    parser.add_argument(
+        "--forwarded-hops",
+        type=int,
+        default=settings.forwarded_hops,
+        help="Proxies in a row in front of the app (X-Forwarded-For entries counted from the right)",
+    )
+    args = parser.parse_args()
+
+    # Read by ProxyHeadersMiddleware in the (forked) workers
+    settings.forwarded_allow_ips = args.forwarded_allow_ips
+    settings.forwarded_hops = args.forwarded_hops
+
+    raise SystemExit(Master(args.host, args.port, args.workers, args.preload).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Real-time chat delivery over WebSocket
+
+Every worker keeps its own open sockets, so events are fanned out through
+Postgres LISTEN/NOTIFY: handlers publish with pg_notify() inside their
+transaction (nothing is sent if it rolls back), and each worker's hub receives
+the event from pg_listener and pushes it to the recipients connected to it.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from starlette.websockets import WebSocketState
+
+from app.core.config import settings
+from app.core.pubsub import MAX_NOTIFY_PAYLOAD_BYTES, notify, pg_listener
+
+
+async def publish_event(event_type: str, recipients: Iterable, data: dict) -> None:
+    """
+    Queue a chat event for delivery to the given user ids
+
+    Runs on the current unit of work, so the notification is only sent once
+    the surrounding transaction commits. Nothing is sent while chat_ws_enabled
+    is off: no worker is listening.
+    """
+    if not settings.chat_ws_enabled:
+        return
+
+    event = {
+        "type": event_type,
+        "recipients": sorted({str(r) for r in recipients if r}),
+        "data": jsonable_encoder(data),
+    }
+    payload = json.dumps(event, separators=(",", ":"))
+
+    # Too big to NOTIFY: send the ids only, clients refetch the full record
+    if len(payload.encode()) > MAX_NOTIFY_PAYLOAD_BYTES:
+        event["data"] = {
+            key: event["data"].get(key)
+            for key in ("id", "conversation_id")
+            if key in event["data"]
+        }
+        event["truncated"] = True
+        payload = json.dumps(event, separators=(",", ":"))
+
+    await notify(settings.chat_notify_channel, payload)
+
+
+def _log_failure(task: asyncio.Task, what: str) -> None:
+    """Report a background task's exception instead of leaving it unretrieved"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️  {what} failed: {task.exception()!r}")
+
+
+def _frame_type(text: str) -> Optional[str]:
+    """The "type" of a JSON client frame, if it is one"""
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        return None
+    return frame.get("type") if isinstance(frame, dict) else None
+
+
+class ChatConnection:
+    """One open WebSocket and its bounded outgoing queue"""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.chat_ws_send_queue_size)
+        self.last_seen = time.monotonic()
+        self.closed = False
+
+    def offer(self, message: str) -> bool:
+        """Queue a message without waiting; False if the buffer is full"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def send_loop(self) -> None:
+        """Drain the queue onto the socket until the connection is closed"""
+        try:
+            while True:
+                message = await self.queue.get()
+                if message is None:
+                    return
+                await self.websocket.send_text(message)
+        except Exception as e:
+            # Expected once the socket is gone; otherwise close it, which also
+            # ends the receive loop in ChatHub.serve()
+            if not self.closed:
+                print(f"⚠️  Chat send to {self.user_id} failed: {e!r}")
+                await self.close(1011, "Send failed")
+
+    async def close(self, code: int, reason: str = "") -> None:
+        if self.closed:
+            return
+        self.closed = True
+
+        # Wake the sender so it exits instead of waiting forever
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+        if self.websocket.application_state == WebSocketState.CONNECTED:
+            try:
+                await self.websocket.close(code=code, reason=reason)
+            except Exception:
+                pass
+
+
+class ChatHub:
+    """Per-worker registry of chat sockets fed by pg_listener"""
+
+    def __init__(self):
+        self._connections: Dict[str, Set[ChatConnection]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+        self.delivered = 0
+        self.evicted_slow = 0
+        self.evicted_idle = 0
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        """Subscribe to chat events and start sending heartbeats (before pg_listener.start())"""
+        if not settings.chat_ws_enabled:
+            return
+
+        pg_listener.subscribe(settings.chat_notify_channel, self._on_notify)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_forever())
+        self._heartbeat_task.add_done_callback(lambda task: _log_failure(task, "Chat heartbeat"))
+
+    async def stop(self) -> None:
+        """Stop heartbeats and close every open socket"""
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        for connection in [c for conns in self._connections.values() for c in conns]:
+            await connection.close(1001, "Server shutting down")
+        self._connections.clear()
+
+    # ---------- connections ----------
+
+    def register(self, connection: ChatConnection) -> None:
+        self._connections.setdefault(connection.user_id, set()).add(connection)
+
+    def unregister(self, connection: ChatConnection) -> None:
+        connections = self._connections.get(connection.user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[connection.user_id]
+
+    def connection_count(self, user_id: str) -> int:
+        return len(self._connections.get(user_id, ()))
+
+    async def serve(self, websocket: WebSocket, user_id: str) -> None:
+        """
+        Run an accepted socket until either side closes it
+
+        Any frame from the client counts as activity; a "ping" text frame (or
+        {"type": "ping"}) is answered with {"type": "pong"}.
+        """
+        connection = ChatConnection(websocket, user_id)
+        self.register(connection)
+        sender = asyncio.create_task(connection.send_loop())
+        sender.add_done_callback(lambda task: _log_failure(task, f"Chat sender for {user_id}"))
+        pong = json.dumps({"type": "pong"})
+
+        try:
+            while True:
+                text = await websocket.receive_text()
+                connection.last_seen = time.monotonic()
+
+                if text == "ping" or _frame_type(text) == "ping":
+                    connection.offer(pong)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.unregister(connection)
+            sender.cancel()
+            await connection.close(1000)
+            await asyncio.gather(sender, return_exceptions=True)
+
+    # ---------- delivery ----------
+
+    def _on_notify(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+
+        recipients = event.pop("recipients", [])
+        self.dispatch(recipients, json.dumps(event, separators=(",", ":")))
+
+    def dispatch(self, recipients: Iterable[str], message: str) -> None:
+        """Queue a message for every local socket of the given users"""
+        for user_id in recipients:
+            for connection in list(self._connections.get(user_id, ())):
+                if connection.offer(message):
+                    self.delivered += 1
+                else:
+                    # A client that can't keep up is dropped rather than
+                    # letting its backlog grow without bound
+                    self.evicted_slow += 1
+                    self.unregister(connection)
+                    task = asyncio.create_task(connection.close(1013, "Client too slow"))
+                    self._closing.add(task)
+                    task.add_done_callback(self._closing_done)
+
+    def _closing_done(self, task: asyncio.Task) -> None:
+        self._closing.discard(task)
+        _log_failure(task, "Closing a slow chat socket")
+
+    async def _heartbeat_forever(self) -> None:
+        """Ping every socket and drop the ones that went quiet"""
+        ping = json.dumps({"type": "ping"})
+
+        while True:
+            await asyncio.sleep(settings.chat_ws_heartbeat_seconds)
+            now = time.monotonic()
+
+            for connection in [c for conns in self._connections.values() for c in conns]:
+                if now - connection.last_seen > settings.chat_ws_idle_timeout_seconds:
+                    self.evicted_idle += 1
+                    self.unregister(connection)
+                    await connection.close(1001, "Idle timeout")
+                elif not connection.offer(ping):
+                    self.evicted_slow += 1
+                    self.unregister(connection)
+                    await connection.close(1013, "Client too slow")
+
+    def stats(self) -> dict:
+        """Counters suitable for health and metrics endpoints"""
+        return {
+            "enabled": settings.chat_ws_enabled,
+            "listening": pg_listener.listening,
+            "users": len(self._connections),
+            "connections": sum(len(c) for c in self._connections.values()),
+            "delivered": self.delivered,
+            "evicted_slow": self.evicted_slow,
+            "evicted_idle": self.evicted_idle,
+        }
+
+
+chat_hub = ChatHub()
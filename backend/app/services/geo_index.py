@@ -0,0 +1,445 @@
+"""
+In-memory spatial index of academy, clinic and store branches for /nearby
+
+Every worker keeps each branch that has coordinates in a uniform grid of
+CELL_DEGREES-sized cells. A nearest-K query walks rings of cells outward
+from the caller and stops as soon as no unvisited cell can hold anything
+closer than the K-th result, so it looks at a handful of cells instead of
+every branch. Opening hours are checked in memory too.
+
+Like the typeahead index, it is loaded at startup and patched by the branch
+write handlers:
+
+    await index_branch("academy", branch_row)
+    await unindex_branch("academy", branch_id)
+
+Changes are applied locally and broadcast with NOTIFY to the other workers;
+a periodic full reload repairs anything that was missed.
+"""
+import asyncio
+import heapq
+import json
+import math
+import re
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.core.database import database
+from app.core.pubsub import notify, pg_listener
+
+
+BRANCH_KINDS = ("academy", "clinic", "store")
+
+_CLOCK_COLUMNS = "opening_hour, opening_minute, opening_ampm, closing_hour, closing_minute, closing_ampm"
+
+BRANCH_SOURCES = {
+    "academy": """
+        SELECT id, user_id, name, city, governorate, latitude, longitude,
+               opening_time, closing_time, operating_days
+        FROM academy_branches
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+    "clinic": f"""
+        SELECT id, user_id, location_name, city, governorate, latitude, longitude, {_CLOCK_COLUMNS}
+        FROM clinic_branches
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+    "store": f"""
+        SELECT id, user_id, location_name, city, governorate, latitude, longitude, {_CLOCK_COLUMNS}
+        FROM store_branches
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+}
+
+# Every column any source selects; write handlers broadcast just these
+BRANCH_COLUMNS = (
+    "id", "user_id", "name", "location_name", "city", "governorate", "latitude", "longitude",
+    "opening_time", "closing_time", "operating_days",
+    "opening_hour", "opening_minute", "opening_ampm", "closing_hour", "closing_minute", "closing_ampm",
+)
+
+# ~1.1 km north-south. Small enough that a dense city-centre cell holds tens
+# of branches, not thousands; sparse areas just walk more (empty) cells.
+CELL_DEGREES = 0.01
+
+KM_PER_DEGREE = 111.195
+
+EARTH_RADIUS_KM = 6371.0088
+
+_CLOCK = re.compile(r"^\s*(\d{1,2})(?:[:.](\d{1,2}))?\s*([ap])?\.?\s*m?\.?\s*$", re.IGNORECASE)
+
+_WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+
+def parse_clock(text: Optional[str]) -> Optional[int]:
+    """
+    Minutes past midnight for "8:30 PM", "08:30", "20:30" or "8 pm"
+
+    Returns None if the text can't be read as a time of day.
+    """
+    match = _CLOCK.match(text or "")
+    if not match:
+        return None
+
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").lower()
+
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+
+    if hour > 23 or minute > 59:
+        return None
+
+    return hour * 60 + minute
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    return _haversine(phi1, math.radians(lng1), math.cos(phi1), phi2, math.radians(lng2), math.cos(phi2))
+
+
+def _haversine(phi1: float, lambda1: float, cos1: float, phi2: float, lambda2: float, cos2: float) -> float:
+    """haversine_km on coordinates already in radians, with their latitude cosines"""
+    a = math.sin((phi2 - phi1) / 2) ** 2 + cos1 * cos2 * math.sin((lambda2 - lambda1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / CELL_DEGREES), math.floor(lng / CELL_DEGREES)
+
+
+class BranchPoint:
+    """A branch's position and the fields /nearby returns or filters on"""
+
+    __slots__ = ("kind", "id", "owner_id", "name", "city", "governorate",
+                 "lat", "lng", "phi", "lambda_", "cos_phi", "opens", "closes", "days", "cell")
+
+    def __init__(self, kind: str, row: dict):
+        self.kind = kind
+        self.id = str(row["id"])
+        self.owner_id = str(row["user_id"])
+        self.name = row.get("name") or row.get("location_name")
+        self.city = row.get("city")
+        self.governorate = row.get("governorate")
+        self.lat = float(row["latitude"])
+        self.lng = float(row["longitude"])
+        self.cell = _cell(self.lat, self.lng)
+        # Precomputed for the distance calculation
+        self.phi = math.radians(self.lat)
+        self.lambda_ = math.radians(self.lng)
+        self.cos_phi = math.cos(self.phi)
+
+        if kind == "academy":
+            self.opens = parse_clock(row.get("opening_time"))
+            self.closes = parse_clock(row.get("closing_time"))
+            days = {_WEEKDAYS.get(str(d).strip().lower()[:3]) for d in row.get("operating_days") or ()}
+            days.discard(None)
+            self.days = frozenset(days) or None
+        else:
+            self.opens = parse_clock(self._clock(row, "opening"))
+            self.closes = parse_clock(self._clock(row, "closing"))
+            self.days = None
+
+    @staticmethod
+    def _clock(row: dict, prefix: str) -> Optional[str]:
+        hour = row.get(f"{prefix}_hour")
+        if not hour:
+            return None
+        return f"{hour}:{row.get(f'{prefix}_minute') or '00'} {row.get(f'{prefix}_ampm') or ''}"
+
+    @classmethod
+    def from_row(cls, kind: str, row: dict) -> Optional["BranchPoint"]:
+        """None when the branch has no usable coordinates"""
+        try:
+            lat, lng = float(row["latitude"]), float(row["longitude"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return None
+        return cls(kind, row)
+
+    def is_open(self, now: datetime) -> Optional[bool]:
+        """Whether the branch is open at now (local time); None if its hours are unknown"""
+        if self.opens is None or self.closes is None:
+            return None
+
+        if self.days is not None and now.weekday() not in self.days:
+            return False
+
+        minute = now.hour * 60 + now.minute
+        if self.opens == self.closes:
+            return True
+        if self.opens < self.closes:
+            return self.opens <= minute < self.closes
+        # Past midnight, e.g. 16:00-01:00
+        return minute >= self.opens or minute < self.closes
+
+    def to_dict(self, distance_km: float, is_open: Optional[bool]) -> dict:
+        return {
+            "type": self.kind,
+            "id": self.id,
+            "owner_id": self.owner_id,
+            "name": self.name,
+            "city": self.city,
+            "governorate": self.governorate,
+            "latitude": self.lat,
+            "longitude": self.lng,
+            "distance_km": round(distance_km, 3),
+            "is_open": is_open,
+        }
+
+
+class GeoIndex:
+    """Uniform grid of branch points, rebuilt in bulk on load and patched in place on writes"""
+
+    def __init__(self):
+        self._cells: Dict[Tuple[int, int], Dict[Tuple[str, str], BranchPoint]] = {}
+        self._points: Dict[Tuple[str, str], BranchPoint] = {}
+        # Changes that arrive while a reload is reading the tables
+        self._pending: Optional[List[dict]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.queries = 0
+        self.updates = 0
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        """Subscribe to branch changes, load the index and schedule reloads (before pg_listener.start())"""
+        if not settings.geo_index_enabled:
+            return
+
+        pg_listener.subscribe(settings.geo_index_channel, self.on_notify)
+        await self.load()
+        self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refresh_task = None
+
+    async def load(self) -> None:
+        """Read every branch table and swap in a freshly built grid"""
+        self._pending = []
+        started = time.perf_counter()
+        points: List[BranchPoint] = []
+
+        for kind, query in BRANCH_SOURCES.items():
+            try:
+                rows = await database.fetch_all(query)
+            except Exception as e:
+                print(f"⚠️  Branch geo index: skipped {kind} branches: {e}")
+                continue
+
+            for row in rows:
+                point = BranchPoint.from_row(kind, dict(row))
+                if point is not None:
+                    points.append(point)
+
+        self.rebuild(points)
+
+        pending, self._pending = self._pending, None
+        for change in pending:
+            self.apply(change)
+
+        self.loaded_at = time.time()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"✅ Branch geo index loaded: {len(self._points)} branches in {len(self._cells)} cells in {elapsed:.0f}ms")
+
+    async def _refresh_forever(self) -> None:
+        interval = settings.geo_index_refresh_seconds
+        if interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"⚠️  Branch geo index reload failed: {e}")
+
+    def rebuild(self, points: Iterable[BranchPoint]) -> None:
+        cells: Dict[Tuple[int, int], Dict[Tuple[str, str], BranchPoint]] = {}
+        by_key: Dict[Tuple[str, str], BranchPoint] = {}
+
+        for point in points:
+            key = (point.kind, point.id)
+            by_key[key] = point
+            cells.setdefault(point.cell, {})[key] = point
+
+        self._cells = cells
+        self._points = by_key
+
+    # ---------- updates ----------
+
+    def put(self, point: BranchPoint) -> None:
+        """Add a branch or move it to its new position"""
+        self.drop(point.kind, point.id)
+        key = (point.kind, point.id)
+        self._points[key] = point
+        self._cells.setdefault(point.cell, {})[key] = point
+        self.updates += 1
+
+    def drop(self, kind: str, branch_id: str) -> None:
+        point = self._points.pop((kind, branch_id), None)
+        if point is None:
+            return
+
+        cell = self._cells.get(point.cell)
+        if cell is not None:
+            cell.pop((kind, branch_id), None)
+            if not cell:
+                del self._cells[point.cell]
+        self.updates += 1
+
+    def apply(self, change: dict) -> None:
+        """Apply a change published by index_branch/unindex_branch"""
+        if self._pending is not None:
+            self._pending.append(change)
+
+        kind = change.get("kind")
+        if change.get("op") == "put":
+            point = BranchPoint.from_row(kind, change["branch"])
+            if point is None:
+                self.drop(kind, str(change["branch"]["id"]))
+            else:
+                self.put(point)
+        elif change.get("op") == "drop":
+            self.drop(kind, change["id"])
+
+    def on_notify(self, payload: str) -> None:
+        """pg_listener handler for changes made by any worker (including this one)"""
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+
+        self.apply(change)
+
+    # ---------- queries ----------
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limit: int,
+        kinds: Optional[Iterable[str]] = None,
+        now: Optional[datetime] = None,
+        open_only: bool = False,
+    ) -> List[dict]:
+        """
+        Up to limit branches within radius_km, closest first
+
+        Each result's is_open is worked out for now (local time) if it is
+        given; with open_only, only branches known to be open then are
+        returned.
+        """
+        self.queries += 1
+        wanted = set(kinds) if kinds else None
+
+        # Narrowest cell dimension anywhere in the search area, so ring r is
+        # never closer than r cells' worth of this
+        far_lat = min(89.9, abs(lat) + radius_km / KM_PER_DEGREE)
+        cell_km = CELL_DEGREES * KM_PER_DEGREE * max(math.cos(math.radians(far_lat)), 0.01)
+        max_ring = math.ceil(radius_km / cell_km) + 1
+        center_i, center_j = _cell(lat, lng)
+        phi, lambda_ = math.radians(lat), math.radians(lng)
+        cos_phi = math.cos(phi)
+
+        # Max-heap (by negated distance) of the best candidates so far
+        best: List[Tuple[float, int, BranchPoint, Optional[bool]]] = []
+        tie = 0
+
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(center_i, center_j, ring):
+                for point in self._cells.get(cell, {}).values():
+                    if wanted is not None and point.kind not in wanted:
+                        continue
+
+                    distance = _haversine(phi, lambda_, cos_phi, point.phi, point.lambda_, point.cos_phi)
+                    if distance > radius_km:
+                        continue
+                    if len(best) == limit and distance >= -best[0][0]:
+                        continue
+
+                    is_open = point.is_open(now) if now is not None else None
+                    if open_only and not is_open:
+                        continue
+
+                    tie += 1
+                    entry = (-distance, tie, point, is_open)
+                    if len(best) < limit:
+                        heapq.heappush(best, entry)
+                    else:
+                        heapq.heapreplace(best, entry)
+
+            # Everything in later rings is at least ring * cell_km away
+            if len(best) == limit and -best[0][0] <= ring * cell_km:
+                break
+
+        ordered = sorted(best, key=lambda entry: (-entry[0], entry[1]))
+        return [point.to_dict(-neg_distance, is_open) for neg_distance, _, point, is_open in ordered]
+
+    @staticmethod
+    def _ring_cells(center_i: int, center_j: int, ring: int) -> Iterable[Tuple[int, int]]:
+        if ring == 0:
+            yield center_i, center_j
+            return
+
+        for dj in range(-ring, ring + 1):
+            yield center_i - ring, center_j + dj
+            yield center_i + ring, center_j + dj
+        for di in range(-ring + 1, ring):
+            yield center_i + di, center_j - ring
+            yield center_i + di, center_j + ring
+
+    def stats(self) -> dict:
+        """Counters suitable for health and metrics endpoints"""
+        return {
+            "enabled": settings.geo_index_enabled,
+            "branches": len(self._points),
+            "cells": len(self._cells),
+            "queries": self.queries,
+            "updates": self.updates,
+            "loaded_at": self.loaded_at,
+        }
+
+
+geo_index = GeoIndex()
+
+
+def local_now() -> datetime:
+    """Current wall-clock time where the branches are, for opening hours"""
+    return datetime.now(pytz.timezone(settings.branch_timezone))
+
+
+async def _broadcast(change: dict) -> None:
+    if not settings.geo_index_enabled:
+        return
+
+    geo_index.apply(change)
+    await notify(settings.geo_index_channel, json.dumps(change, separators=(",", ":")))
+
+
+async def index_branch(kind: str, row) -> None:
+    """Add or move a created/updated branch in every worker's index"""
+    row = dict(row)
+    branch = jsonable_encoder({column: row.get(column) for column in BRANCH_COLUMNS if column in row})
+    await _broadcast({"op": "put", "kind": kind, "branch": branch})
+
+
+async def unindex_branch(kind: str, branch_id) -> None:
+    """Remove a deleted branch from every worker's index"""
+    await _broadcast({"op": "drop", "kind": kind, "id": str(branch_id)})
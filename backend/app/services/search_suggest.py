@@ -0,0 +1,363 @@
+"""
+In-memory typeahead index for academy, clinic and store names, product
+brands and branch cities
+
+Every worker keeps the whole index in RAM as one sorted array of search keys
+and answers prefix lookups with bisect, so /search/suggest never touches
+Postgres. The index is loaded at startup and kept current by write handlers:
+
+    await index_suggestion("academy", user_id, details["academy_name"], ref_id=user_id)
+    await unindex_suggestion("city", f"academy_branches:{branch_id}")
+
+Each change is applied to the local index immediately and broadcast with
+NOTIFY so the other workers apply it too. A periodic full reload repairs
+anything a dropped LISTEN connection or a rolled-back write left behind.
+"""
+import asyncio
+import heapq
+import json
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import database
+from app.core.pubsub import notify, pg_listener
+
+
+SUGGESTION_KINDS = ("academy", "clinic", "store", "brand", "city")
+
+# Where each kind is loaded from. "source" identifies the row that contributes
+# the label (write handlers use the same ids); "ref_id" is what clients get
+# back to open the entity, and is null for shared labels like brands.
+SUGGESTION_SOURCES = (
+    ("academy", "SELECT user_id AS source, academy_name AS label, user_id AS ref_id FROM academy_details"),
+    ("clinic", "SELECT user_id AS source, clinic_name AS label, user_id AS ref_id FROM clinic_details"),
+    ("store", "SELECT user_id AS source, store_name AS label, user_id AS ref_id FROM store_details"),
+    ("brand", "SELECT 'products:' || id AS source, brand AS label, NULL AS ref_id FROM products"),
+    ("brand", "SELECT 'store_products:' || id AS source, brand AS label, NULL AS ref_id FROM store_products"),
+    ("city", "SELECT 'academy_branches:' || id AS source, city AS label, NULL AS ref_id FROM academy_branches"),
+    ("city", "SELECT 'clinic_branches:' || id AS source, city AS label, NULL AS ref_id FROM clinic_branches"),
+    ("city", "SELECT 'store_branches:' || id AS source, city AS label, NULL AS ref_id FROM store_branches"),
+)
+
+# A label is findable from each of its first few words ("swim" finds
+# "Cairo Swim Academy"), not just from its start
+MAX_INDEXED_WORDS = 6
+
+# Upper bound on keys examined per lookup, so one-letter queries stay cheap.
+# Keys are kept per kind and only the requested kinds are scanned, so every
+# key examined is a candidate (the bound only skips duplicates).
+MAX_SCANNED_KEYS = 512
+
+
+def normalize(text: str) -> str:
+    """Case-fold, strip accents/diacritics and collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.split())
+
+
+class Suggestion:
+    """One distinct suggestion and how many source rows currently contribute it"""
+
+    __slots__ = ("kind", "label", "ref_id", "refs")
+
+    def __init__(self, kind: str, label: str, ref_id: Optional[str]):
+        self.kind = kind
+        self.label = label
+        self.ref_id = ref_id
+        self.refs = 0
+
+    def to_dict(self) -> dict:
+        return {"type": self.kind, "label": self.label, "id": self.ref_id}
+
+
+def _word_keys(normalized: str) -> List[str]:
+    """Keys that start at the label's 2nd, 3rd, ... word"""
+    words = normalized.split()
+    return [" ".join(words[i:]) for i in range(1, min(len(words), MAX_INDEXED_WORDS))]
+
+
+class SortedKeys:
+    """Search keys kept sorted in one list, with the suggestion for each key in a parallel list"""
+
+    __slots__ = ("keys", "suggestions")
+
+    def __init__(self, pairs: Iterable[Tuple[str, Suggestion]] = ()):
+        pairs = sorted(pairs, key=lambda pair: pair[0])
+        self.keys: List[str] = [key for key, _ in pairs]
+        self.suggestions: List[Suggestion] = [suggestion for _, suggestion in pairs]
+
+    def insert(self, key: str, suggestion: Suggestion) -> None:
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.suggestions.insert(position, suggestion)
+
+    def remove(self, key: str, suggestion: Suggestion) -> None:
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.suggestions[position] is suggestion:
+                del self.keys[position]
+                del self.suggestions[position]
+                return
+            position += 1
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, Suggestion]]:
+        """(key, suggestion) pairs whose key starts with prefix, in key order"""
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            yield self.keys[position], self.suggestions[position]
+            position += 1
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class SuggestIndex:
+    """Sorted-array prefix index, rebuilt in bulk on load and patched in place on writes"""
+
+    def __init__(self):
+        # Whole labels, so prefix matches on the first word come out first and
+        # in alphabetical order without any sorting at lookup time; one array
+        # per kind, so a lookup for some kinds never wades through the others
+        self._labels: Dict[str, SortedKeys] = {kind: SortedKeys() for kind in SUGGESTION_KINDS}
+        # The same labels again from each later word
+        self._words: Dict[str, SortedKeys] = {kind: SortedKeys() for kind in SUGGESTION_KINDS}
+        self._suggestions: Dict[Tuple[str, str, Optional[str]], Suggestion] = {}
+        self._sources: Dict[Tuple[str, str], Suggestion] = {}
+        # Changes that arrive while a reload is reading the tables
+        self._pending: Optional[List[dict]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.lookups = 0
+        self.updates = 0
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        """Subscribe to index changes, load the index and schedule reloads (before pg_listener.start())"""
+        if not settings.search_suggest_enabled:
+            return
+
+        pg_listener.subscribe(settings.search_suggest_channel, self.on_notify)
+        await self.load()
+        self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refresh_task = None
+
+    async def load(self) -> None:
+        """Read every source table and swap in a freshly built index"""
+        self._pending = []
+        started = time.perf_counter()
+        sources: Dict[Tuple[str, str], Tuple[str, str, Optional[str]]] = {}
+
+        for kind, query in SUGGESTION_SOURCES:
+            try:
+                rows = await database.fetch_all(query)
+            except Exception as e:
+                print(f"⚠️  Search suggestions: skipped {kind} source: {e}")
+                continue
+
+            for row in rows:
+                if row["label"] and row["label"].strip():
+                    ref_id = str(row["ref_id"]) if row["ref_id"] is not None else None
+                    sources[(kind, str(row["source"]))] = (kind, row["label"].strip(), ref_id)
+
+        self._rebuild(sources)
+
+        pending, self._pending = self._pending, None
+        for change in pending:
+            self.apply(change)
+
+        self.loaded_at = time.time()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"✅ Search suggestions loaded: {len(self._suggestions)} labels, {self._key_count()} keys in {elapsed:.0f}ms")
+
+    async def _refresh_forever(self) -> None:
+        interval = settings.search_suggest_refresh_seconds
+        if interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"⚠️  Search suggestions reload failed: {e}")
+
+    def _rebuild(self, sources: Dict[Tuple[str, str], Tuple[str, str, Optional[str]]]) -> None:
+        suggestions: Dict[Tuple[str, str, Optional[str]], Suggestion] = {}
+        by_source: Dict[Tuple[str, str], Suggestion] = {}
+
+        for source_key, (kind, label, ref_id) in sources.items():
+            identity = (kind, normalize(label), ref_id)
+            suggestion = suggestions.get(identity)
+            if suggestion is None:
+                suggestion = suggestions[identity] = Suggestion(kind, label, ref_id)
+            suggestion.refs += 1
+            by_source[source_key] = suggestion
+
+        self._labels = {
+            kind: SortedKeys(
+                (normalized, suggestion)
+                for (suggestion_kind, normalized, _), suggestion in suggestions.items()
+                if suggestion_kind == kind
+            )
+            for kind in SUGGESTION_KINDS
+        }
+        self._words = {
+            kind: SortedKeys(
+                (key, suggestion)
+                for (suggestion_kind, normalized, _), suggestion in suggestions.items()
+                if suggestion_kind == kind
+                for key in _word_keys(normalized)
+            )
+            for kind in SUGGESTION_KINDS
+        }
+        self._suggestions = suggestions
+        self._sources = by_source
+
+    # ---------- updates ----------
+
+    def put(self, kind: str, source: str, label: Optional[str], ref_id: Optional[str] = None) -> None:
+        """Make source contribute label (replacing what it contributed before)"""
+        label = (label or "").strip()
+        if not label:
+            self.drop(kind, source)
+            return
+
+        identity = (kind, normalize(label), ref_id)
+        current = self._sources.get((kind, source))
+        if current is not None and (current.kind, normalize(current.label), current.ref_id) == identity:
+            return
+
+        self.drop(kind, source)
+
+        suggestion = self._suggestions.get(identity)
+        if suggestion is None:
+            suggestion = self._suggestions[identity] = Suggestion(kind, label, ref_id)
+            self._labels.setdefault(kind, SortedKeys()).insert(identity[1], suggestion)
+            for key in _word_keys(identity[1]):
+                self._words.setdefault(kind, SortedKeys()).insert(key, suggestion)
+
+        suggestion.refs += 1
+        self._sources[(kind, source)] = suggestion
+        self.updates += 1
+
+    def drop(self, kind: str, source: str) -> None:
+        """Withdraw whatever source contributed; the label goes once nothing else has it"""
+        suggestion = self._sources.pop((kind, source), None)
+        if suggestion is None:
+            return
+
+        self.updates += 1
+        suggestion.refs -= 1
+        if suggestion.refs > 0:
+            return
+
+        normalized = normalize(suggestion.label)
+        del self._suggestions[(suggestion.kind, normalized, suggestion.ref_id)]
+
+        self._labels[suggestion.kind].remove(normalized, suggestion)
+        for key in _word_keys(normalized):
+            self._words[suggestion.kind].remove(key, suggestion)
+
+    def apply(self, change: dict) -> None:
+        """Apply a change published by index_suggestion/unindex_suggestion"""
+        if self._pending is not None:
+            self._pending.append(change)
+
+        if change.get("op") == "put":
+            self.put(change["kind"], change["source"], change.get("label"), change.get("ref_id"))
+        elif change.get("op") == "drop":
+            self.drop(change["kind"], change["source"])
+
+    def on_notify(self, payload: str) -> None:
+        """pg_listener handler for changes made by any worker (including this one)"""
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+
+        self.apply(change)
+
+    # ---------- lookups ----------
+
+    def suggest(self, query: str, limit: int = 8, kinds: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Labels with a word starting with query
+
+        Labels that start with the query come first, then labels where a later
+        word matches; each group in alphabetical order.
+        """
+        self.lookups += 1
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        kinds = set(kinds or ())
+        wanted = [kind for kind in SUGGESTION_KINDS if not kinds or kind in kinds]
+        found: Dict[int, Suggestion] = {}
+        scanned = 0
+
+        for arrays in (self._labels, self._words):
+            # The wanted kinds' arrays merged back into one key order
+            matches = heapq.merge(*(arrays[kind].scan(prefix) for kind in wanted), key=lambda pair: pair[0])
+            for _, suggestion in matches:
+                found.setdefault(id(suggestion), suggestion)
+                scanned += 1
+                if len(found) == limit or scanned >= MAX_SCANNED_KEYS:
+                    return [s.to_dict() for s in found.values()]
+
+        return [s.to_dict() for s in found.values()]
+
+    def _key_count(self) -> int:
+        return sum(len(keys) for arrays in (self._labels, self._words) for keys in arrays.values())
+
+    def stats(self) -> dict:
+        """Counters suitable for health and metrics endpoints"""
+        return {
+            "enabled": settings.search_suggest_enabled,
+            "labels": len(self._suggestions),
+            "keys": self._key_count(),
+            "sources": len(self._sources),
+            "lookups": self.lookups,
+            "updates": self.updates,
+            "loaded_at": self.loaded_at,
+        }
+
+
+suggest_index = SuggestIndex()
+
+
+async def _broadcast(change: dict) -> None:
+    if not settings.search_suggest_enabled:
+        return
+
+    suggest_index.apply(change)
+    await notify(settings.search_suggest_channel, json.dumps(change, separators=(",", ":")))
+
+
+async def index_suggestion(kind: str, source, label: Optional[str], ref_id=None) -> None:
+    """Add or update the label a row contributes, in every worker's index"""
+    await _broadcast({
+        "op": "put",
+        "kind": kind,
+        "source": str(source),
+        "label": label,
+        "ref_id": str(ref_id) if ref_id is not None else None,
+    })
+
+
+async def unindex_suggestion(kind: str, source) -> None:
+    """Withdraw a deleted row's label from every worker's index"""
+    await _broadcast({"op": "drop", "kind": kind, "source": str(source)})
@@ -0,0 +1,84 @@
+"""
+Cursor (keyset) pagination helpers
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort-key values of a row into an opaque, URL-safe cursor"""
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Unpack a cursor produced by encode_cursor
+
+    Raises:
+        HTTPException: If the cursor is malformed or has the wrong arity
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+    return values
+
+
+def decode_timestamp_cursor(cursor: str) -> tuple:
+    """
+    Unpack a (created_at, id) cursor into values ready to bind in SQL
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    created_at, row_id = decode_cursor(cursor, 2)
+
+    try:
+        return datetime.fromisoformat(created_at), str(UUID(row_id))
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def decode_rank_cursor(cursor: str) -> tuple:
+    """
+    Unpack a (rank, id) cursor from a relevance-ordered search
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    rank, row_id = decode_cursor(cursor, 2)
+
+    try:
+        if isinstance(rank, bool):
+            raise TypeError
+        return float(rank), str(UUID(row_id))
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
@@ -0,0 +1,61 @@
+"""
+Composite provider profiles assembled by Postgres in one query
+
+A profile endpoint runs a single statement that nests the provider's
+details, branches, catalogue and rating summary into one JSON document
+with json_agg, instead of one request and one round trip per section:
+
+    query = f'''
+        SELECT json_build_object(
+            'details', to_json(d),
+            'branches', {json_list("SELECT json_agg(b ORDER BY b.created_at DESC) FROM ... b")},
+            'rating', {rating_summary("clinic", "d.user_id")}
+        )::text AS profile
+        FROM clinic_details d
+        WHERE d.user_id = :user_id
+    '''
+    return await fetch_profile(query, user_id, "Clinic details not found")
+
+The document is still validated against the endpoint's response model, so
+it serializes exactly like the per-section endpoints do.
+"""
+import json
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+
+from app.core.database import database
+
+
+def json_list(aggregate: str) -> str:
+    """SQL expression for a json_agg subquery that yields [] instead of null when there are no rows"""
+    return f"COALESCE(({aggregate}), '[]'::json)"
+
+
+def rating_summary(target_type: str, target_column: str) -> str:
+    """SQL expression for the active-review count, average and per-star counts of target_column"""
+    stars = ", ".join(f"'{star}', COUNT(*) FILTER (WHERE r.rating = {star})" for star in range(1, 6))
+
+    return f"""(
+        SELECT json_build_object(
+            'count', COUNT(*),
+            'average', COALESCE(ROUND(AVG(r.rating), 2), 0),
+            'distribution', json_build_object({stars})
+        )
+        FROM reviews r
+        WHERE r.target_type = '{target_type}' AND r.target_id = {target_column} AND r.is_active = true
+    )"""
+
+
+async def fetch_profile(query: str, user_id, not_found: str) -> dict:
+    """Run a profile query (one row with a "profile" JSON text column) and decode it"""
+    row = await database.fetch_one(query, {"user_id": str(user_id)})
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found
+        )
+
+    # Decimal keeps NUMERIC columns exactly as the per-section endpoints return them
+    return json.loads(row["profile"], parse_float=Decimal)
@@ -0,0 +1,108 @@
+"""
+Paginated and streamed responses for list-everything endpoints
+"""
+from typing import AsyncIterator, Type
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.core.database import database
+
+
+# Rows fetched (and written to the socket) per query while streaming
+STREAM_BATCH_SIZE = 500
+
+# Page size when the client doesn't pass limit
+DEFAULT_PAGE_SIZE = 100
+
+
+class ListAllParams:
+    """
+    Query parameters shared by the public /all endpoints
+
+    A regular JSON page (skip/limit, DEFAULT_PAGE_SIZE rows by default), or
+    with stream=true every row, as a JSON array or as newline-delimited JSON
+    with format=ndjson.
+    """
+
+    def __init__(
+        self,
+        skip: int = Query(0, ge=0, description="Return a page starting at this offset"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500, description="Return a page of this size"),
+        stream: bool = Query(False, description="Stream every row instead of one page (skip/limit are ignored)"),
+        format: str = Query("json", pattern="^(json|ndjson)$", description="Streamed output format"),
+    ):
+        self.skip = skip
+        self.limit = limit
+        self.stream = stream
+        self.format = format
+
+
+def _newest_first(table: str, key: str, after: bool) -> str:
+    where = f"WHERE (created_at, {key}) < (:last_created_at, :last_key) " if after else ""
+    return f"SELECT * FROM {table} {where}ORDER BY created_at DESC, {key} DESC"
+
+
+async def _encode_rows(table: str, key: str, model: Type[BaseModel], ndjson: bool) -> AsyncIterator[bytes]:
+    if not ndjson:
+        yield b"["
+
+    # One short keyset query per batch, continuing after the last row sent:
+    # no connection or transaction is held while the client reads, each
+    # batch is an index range scan, and rows written meanwhile don't shift
+    # the batches after them
+    last = None
+    while True:
+        values = {"stream_limit": STREAM_BATCH_SIZE}
+        if last is not None:
+            values.update(last_created_at=last["created_at"], last_key=last[key])
+        batch = await database.fetch_all(
+            f"{_newest_first(table, key, last is not None)} LIMIT :stream_limit", values
+        )
+        if not batch:
+            break
+        rows = [model.model_validate(dict(row)).model_dump_json().encode() for row in batch]
+
+        if ndjson:
+            yield b"\n".join(rows) + b"\n"
+        else:
+            chunk = b",".join(rows)
+            yield chunk if last is None else b"," + chunk
+
+        if len(batch) < STREAM_BATCH_SIZE:
+            break
+        last = batch[-1]
+
+    if not ndjson:
+        yield b"]"
+
+
+def stream_rows(table: str, model: Type[BaseModel], key: str = "id", ndjson: bool = False) -> StreamingResponse:
+    """
+    Stream every row of a table, newest first, validated one batch at a time against model
+
+    Memory stays bounded by STREAM_BATCH_SIZE regardless of the table size.
+    Batches continue from the (created_at, key) of the last row sent, so
+    the table needs a non-null created_at and a unique key column; rows
+    inserted or deleted during the stream never cause others to be skipped
+    or repeated.
+    """
+    return StreamingResponse(
+        _encode_rows(table, key, model, ndjson),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+    )
+
+
+async def list_all(table: str, model: Type[BaseModel], params: ListAllParams, key: str = "id"):
+    """
+    Serve a table newest first (created_at, then key) as a LIMIT/OFFSET page,
+    or as a stream if asked for
+    """
+    if params.stream:
+        return stream_rows(table, model, key=key, ndjson=params.format == "ndjson")
+
+    return await database.fetch_all(
+        f"{_newest_first(table, key, False)} LIMIT :limit OFFSET :skip",
+        {"skip": params.skip, "limit": params.limit},
+    )
@@ -0,0 +1,3 @@
+"""
+Performance benchmarks (run from the backend directory, e.g. `python -m benchmarks.order_placement`)
+"""
@@ -0,0 +1,158 @@
+"""
+Benchmark the composite academy profile against the per-section endpoints
+
+Creates an academy with --branches branches (each with a few pools), coaches,
+programs and reviews, then times what the academy page used to do (details,
+branches, pools per branch, coaches, programs and reviews, one call each)
+against the single /academies/{id}/profile query, and checks both return
+the same data.
+
+Creates its own fixtures and deletes them afterwards. Needs a database with
+the db.sql schema:
+
+    python -m benchmarks.academy_profile --branches 5 --iterations 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.database import database
+from app.api.endpoints.academies import (
+    get_academy_details, get_academy_branches, get_branch_pools,
+    get_academy_coaches, get_academy_programs, get_academy_profile,
+)
+from app.api.endpoints.reviews import list_reviews
+from app.schemas.academy import AcademyProfile
+from benchmarks.enrollment_load import create_users, delete_users
+
+
+async def seed(academy_id: str, reviewer_ids: list, branches: int) -> None:
+    await database.execute(
+        "INSERT INTO academy_details (user_id, academy_name, description) VALUES (:id, 'Benchmark Academy', 'Fixture')",
+        {"id": academy_id}
+    )
+    await database.execute(
+        """
+        INSERT INTO academy_branches (user_id, name, city, governorate, opening_time, closing_time, operating_days)
+        SELECT :id, 'Branch ' || g, 'Cairo', 'Cairo', '7:00 AM', '10:00 PM', ARRAY['Sat', 'Sun', 'Mon']
+        FROM generate_series(1, :branches) g
+        """,
+        {"id": academy_id, "branches": branches}
+    )
+    await database.execute(
+        """
+        INSERT INTO academy_pools (branch_id, name, lanes, capacity)
+        SELECT b.id, 'Pool ' || g, 6, 30
+        FROM academy_branches b, generate_series(1, 3) g
+        WHERE b.user_id = :id
+        """,
+        {"id": academy_id}
+    )
+    await database.execute(
+        """
+        INSERT INTO academy_coaches (academy_id, full_name, specialization, experience_years, certifications)
+        SELECT :id, 'Coach ' || g, 'Freestyle', g % 15, ARRAY['Level 1']
+        FROM generate_series(1, 12) g
+        """,
+        {"id": academy_id}
+    )
+    await database.execute(
+        """
+        INSERT INTO academy_programs (user_id, name, description, price, duration, capacity)
+        SELECT :id, 'Program ' || g, 'Fixture', 500 + g * 50, '3 Months', 20
+        FROM generate_series(1, 8) g
+        """,
+        {"id": academy_id}
+    )
+    await database.execute(
+        """
+        INSERT INTO reviews (reviewer_id, target_id, target_type, rating, comment)
+        SELECT reviewer, :id, 'academy', 1 + (row_number() OVER () % 5)::int, 'Fixture'
+        FROM unnest(CAST(:reviewers AS uuid[])) AS reviewer
+        """,
+        {"id": academy_id, "reviewers": reviewer_ids}
+    )
+
+
+async def separate_calls(academy_id: str) -> dict:
+    """The sections the way the app fetched them before: one endpoint call each"""
+    details = await get_academy_details(academy_id)
+    branches = [dict(b) for b in await get_academy_branches(academy_id)]
+    for branch in branches:
+        branch["pools"] = await get_branch_pools(branch["id"])
+    coaches = await get_academy_coaches(academy_id)
+    programs = await get_academy_programs(academy_id)
+    reviews = await list_reviews(
+        target_id=academy_id, target_type="academy", min_rating=None,
+        verified_only=False, skip=0, limit=20,
+    )
+    return {
+        "details": details, "branches": branches, "coaches": coaches,
+        "programs": programs, "reviews": reviews,
+    }
+
+
+async def measure(run, iterations: int) -> tuple:
+    timings = []
+    result = None
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = await run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))], result
+
+
+async def run(branches: int, reviews: int, iterations: int):
+    await database.connect()
+
+    academy_ids = await create_users(1, "academy")
+    reviewer_ids = await create_users(reviews, "swimmer")
+    academy_id = academy_ids[0]
+
+    try:
+        await seed(academy_id, reviewer_ids, branches)
+        print(f"\n🏊 Academy with {branches} branches, {branches * 3} pools, 12 coaches, 8 programs, {reviews} reviews")
+        print(f"{'impl':>10} {'queries':>8} {'median ms':>10} {'p95 ms':>8}")
+
+        median, p95, before = await measure(lambda: separate_calls(academy_id), iterations)
+        print(f"{'separate':>10} {7 + branches:>8} {median:>10.2f} {p95:>8.2f}")
+
+        median, p95, profile = await measure(lambda: get_academy_profile(academy_id), iterations)
+        print(f"{'profile':>10} {1:>8} {median:>10.2f} {p95:>8.2f}")
+
+        # Same sections, same serialization as the endpoints they replace
+        profile = jsonable_encoder(AcademyProfile.model_validate(profile))
+        expected = jsonable_encoder({
+            "details": before["details"],
+            "coaches": before["coaches"],
+            "programs": before["programs"],
+        })
+        same = (
+            len(profile["branches"]) == len(before["branches"])
+            and all(len(b["pools"]) == 3 for b in profile["branches"])
+            and [c["id"] for c in profile["coaches"]] == [str(c["id"]) for c in expected["coaches"]]
+            and [p["id"] for p in profile["programs"]] == [str(p["id"]) for p in expected["programs"]]
+            and profile["details"]["academy_name"] == expected["details"]["academy_name"]
+            and profile["rating"]["count"] == before["reviews"].total
+            and abs(profile["rating"]["average"] - before["reviews"].average_rating) < 0.01
+        )
+        print("✅ Same data" if same else "❌ Profile differs from the separate endpoints")
+    finally:
+        await delete_users(reviewer_ids + academy_ids)
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=5)
+    parser.add_argument("--reviews", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.branches, args.reviews, args.iterations))
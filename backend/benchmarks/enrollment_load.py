@@ -0,0 +1,166 @@
+"""
+Load test for capacity-aware enrollment
+
+Fires N concurrent enrollments (default 500) at a program with S seats
+(default 20), each in its own unit of work like a real request, then checks
+that exactly S succeeded, everyone else got "full", and the program's
+current_participants matches the enrollment rows. With --target event the
+same is done against event registration.
+
+Creates its own fixtures and deletes them afterwards. Needs a database with
+the db.sql schema:
+
+    python -m benchmarks.enrollment_load --requests 500 --seats 20
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from fastapi import HTTPException
+
+from app.core.database import database
+from app.api.endpoints.programs import enroll_in_program
+from app.api.endpoints.events import register_for_event
+from app.schemas.program import ProgramEnrollmentCreate
+
+
+async def create_users(count: int, role: str) -> list:
+    """Insert throwaway profiles (and auth.users rows where that table exists)"""
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+
+    async with database.transaction():
+        has_auth_users = await database.fetch_one("SELECT to_regclass('auth.users') IS NOT NULL AS present")
+        if has_auth_users["present"]:
+            await database.execute(
+                "INSERT INTO auth.users (id) SELECT unnest(CAST(:ids AS uuid[]))",
+                {"ids": ids}
+            )
+        await database.execute(
+            """
+            INSERT INTO profiles (id, email, full_name, role)
+            SELECT id, 'load-' || id || '@example.com', 'Load Test', CAST(:role AS user_role_type)
+            FROM unnest(CAST(:ids AS uuid[])) AS id
+            """,
+            {"ids": ids, "role": role}
+        )
+
+    return ids
+
+
+async def delete_users(ids: list):
+    async with database.transaction():
+        await database.execute("DELETE FROM profiles WHERE id = ANY(CAST(:ids AS uuid[]))", {"ids": ids})
+        has_auth_users = await database.fetch_one("SELECT to_regclass('auth.users') IS NOT NULL AS present")
+        if has_auth_users["present"]:
+            await database.execute("DELETE FROM auth.users WHERE id = ANY(CAST(:ids AS uuid[]))", {"ids": ids})
+
+
+async def create_target(target: str, owner_id: str, seats: int) -> str:
+    if target == "program":
+        row = await database.fetch_one(
+            """
+            INSERT INTO programs (
+                provider_id, provider_type, program_name, category, description,
+                duration_weeks, sessions_per_week, session_duration_minutes, price,
+                max_participants
+            ) VALUES (
+                :owner_id, 'academy', 'Load test program', 'beginner', 'Load test fixture',
+                4, 2, 60, 100, :seats
+            ) RETURNING id
+            """,
+            {"owner_id": owner_id, "seats": seats}
+        )
+    else:
+        row = await database.fetch_one(
+            """
+            INSERT INTO events (
+                organizer_id, event_name, event_type, description, event_date,
+                max_participants, registration_fee
+            ) VALUES (
+                :owner_id, 'Load test event', 'competition', 'Load test fixture',
+                CURRENT_DATE + 30, :seats, 10
+            ) RETURNING id
+            """,
+            {"owner_id": owner_id, "seats": seats}
+        )
+
+    return str(row["id"])
+
+
+async def attempt(target: str, target_id: str, swimmer_id: str) -> str:
+    """One request's worth of work; returns the outcome"""
+    user = {"id": swimmer_id, "role": "swimmer"}
+
+    try:
+        async with database.transaction():
+            if target == "program":
+                await enroll_in_program(
+                    target_id,
+                    ProgramEnrollmentCreate(program_id=target_id, start_date="2030-01-01"),
+                    user,
+                )
+            else:
+                await register_for_event(target_id, user)
+        return "enrolled"
+    except HTTPException as e:
+        return {409: "full", 400: "duplicate", 404: "not found"}.get(e.status_code, str(e.status_code))
+    except Exception as e:
+        return type(e).__name__
+
+
+async def run(target: str, requests: int, seats: int):
+    await database.connect()
+
+    owner_ids = await create_users(1, "academy" if target == "program" else "event_organizer")
+    swimmer_ids = await create_users(requests, "swimmer")
+
+    try:
+        target_id = await create_target(target, owner_ids[0], seats)
+
+        print(f"\n🏊 {requests} concurrent {target} enrollments for {seats} seats")
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(attempt(target, target_id, sid) for sid in swimmer_ids))
+        elapsed = time.perf_counter() - start
+
+        counts = Counter(outcomes)
+        for outcome, count in counts.most_common():
+            print(f"  {outcome:>12}: {count}")
+        print(f"  {'elapsed':>12}: {elapsed:.2f}s")
+
+        if target == "program":
+            check = await database.fetch_one(
+                """
+                SELECT p.current_participants AS counter,
+                       (SELECT COUNT(*) FROM program_enrollments WHERE program_id = p.id) AS rows
+                FROM programs p WHERE p.id = :id
+                """,
+                {"id": target_id}
+            )
+        else:
+            check = await database.fetch_one(
+                """
+                SELECT e.current_participants AS counter,
+                       (SELECT COUNT(*) FROM event_registrations WHERE event_id = e.id) AS rows
+                FROM events e WHERE e.id = :id
+                """,
+                {"id": target_id}
+            )
+
+        exact = counts["enrolled"] == seats == check["counter"] == check["rows"]
+        print(f"  counter={check['counter']} rows={check['rows']}")
+        print("✅ Exact" if exact else "❌ Counts drifted")
+    finally:
+        await delete_users(swimmer_ids + owner_ids)
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["program", "event"], default="program")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seats", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.target, args.requests, args.seats))
@@ -0,0 +1,143 @@
+"""
+Benchmark the upload image pipeline in images per second per core
+
+Renders every variant (thumb/medium/large as JPEG and WebP) of synthetic
+camera photos (--megapixels, JPEG with an EXIF orientation tag):
+
+- on one core, calling render_variants directly
+- through ImagePipeline with --workers pool processes, while a ticker on the
+  event loop records how late its 10 ms timer fires (the loop should stay
+  free whatever the pool is doing)
+- on one core again without JPEG draft decoding, to show what decoding at
+  reduced scale saves
+
+Needs no database or storage:
+
+    python -m benchmarks.image_pipeline --images 40 --megapixels 12 --workers 4
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import time
+
+from PIL import Image, ImageDraw, JpegImagePlugin
+
+from app.core.config import settings
+from app.services.image_pipeline import ImagePipeline, render_variants
+
+TICK_SECONDS = 0.01
+
+
+def camera_photo(megapixels: float, seed: int) -> bytes:
+    """
+    Gradients, shapes and sensor-like grain (compresses roughly like a
+    photo, unlike flat colour or pure noise) saved as a quality 92 JPEG
+    """
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rnd = random.Random(seed)
+
+    blotches = Image.effect_noise((width // 4, height // 4), 30).resize((width, height), Image.BICUBIC)
+    image = Image.merge("RGB", (
+        Image.radial_gradient("L").resize((width, height)),
+        Image.linear_gradient("L").resize((width, height)).rotate(90),
+        blotches,
+    ))
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y, size = rnd.randrange(width), rnd.randrange(height), rnd.randrange(50, 600)
+        draw.ellipse((x, y, x + size, y + size), fill=tuple(rnd.randrange(256) for _ in range(3)))
+    grain = Image.effect_noise((width, height), 12)
+    image = Image.blend(image, Image.merge("RGB", (grain, grain, grain)), 0.15)
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90
+    exif[0x010F] = "Benchmark Camera"
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=92, exif=exif.tobytes())
+    return out.getvalue()
+
+
+def render(data: bytes) -> dict:
+    return render_variants(data, settings.image_jpeg_quality, settings.image_webp_quality, settings.image_max_pixels)
+
+
+def single_core(photos: list) -> float:
+    start = time.perf_counter()
+    for data in photos:
+        render(data)
+    return len(photos) / (time.perf_counter() - start)
+
+
+async def pooled(photos: list, workers: int) -> tuple:
+    """(images/s, worst event loop lag in ms) through ImagePipeline"""
+    pipeline = ImagePipeline(workers=workers, max_pending=len(photos))
+    # Start the pool processes before timing
+    await asyncio.gather(*(pipeline.process(photos[0]) for _ in range(workers)))
+
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            expected = loop.time() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            worst = max(worst, loop.time() - expected)
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(pipeline.process(data) for data in photos))
+    rate = len(photos) / (time.perf_counter() - start)
+    done = True
+    await task
+    pipeline.shutdown()
+    return rate, worst * 1000
+
+
+def run(images: int, megapixels: float, workers: int):
+    print(f"\n🖼️  Generating {images} photos of {megapixels:g} MP...")
+    photos = [camera_photo(megapixels, i) for i in range(images)]
+    sample = render(photos[0])
+    average_kb = sum(len(p) for p in photos) / len(photos) / 1024
+    stored_kb = sum(len(v["main"]) + len(v["webp"]) for v in sample["variants"].values()) / 1024
+
+    print(f"   upload {average_kb:.0f} KB -> 6 variants, {stored_kb:.0f} KB in total:")
+    for name, variant in sample["variants"].items():
+        print(
+            f"   {name:>7} {variant['width']:>4}x{variant['height']:<4} "
+            f"jpeg {len(variant['main']) / 1024:6.1f} KB  webp {len(variant['webp']) / 1024:6.1f} KB"
+        )
+
+    cores = os.cpu_count() or 1
+    print(f"\n{'case':>38} {'images/s':>9} {'per core':>9}")
+
+    rate = single_core(photos)
+    print(f"{'render_variants, 1 process':>38} {rate:>9.2f} {rate:>9.2f}")
+
+    rate, lag = asyncio.run(pooled(photos, workers))
+    used = min(workers, cores)
+    print(f"{f'ImagePipeline, {workers} workers ({cores} cores)':>38} {rate:>9.2f} {rate / used:>9.2f}")
+    print(f"   worst event loop lag meanwhile: {lag:.1f} ms")
+
+    # Same work with full-resolution JPEG decoding
+    original = JpegImagePlugin.JpegImageFile.draft
+    JpegImagePlugin.JpegImageFile.draft = lambda self, mode, size: None
+    try:
+        rate = single_core(photos)
+    finally:
+        JpegImagePlugin.JpegImageFile.draft = original
+    print(f"{'without draft decoding, 1 process':>38} {rate:>9.2f} {rate:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--megapixels", type=float, default=12.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    run(args.images, args.megapixels, args.workers)
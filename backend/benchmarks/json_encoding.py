@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of response encoding for list endpoints
+
+Encodes --sizes synthetic academy branch rows (shaped like asyncpg rows:
+UUIDs, Decimals, tz-aware datetimes, arrays, plus a column the model
+doesn't have) the way FastAPI does by default (validate against
+response_model, convert to Python, json.dumps), with ORJSONResponse as the
+response class, and through @fast_json's encoder with and without
+trusted=True. Every path must produce the same JSON.
+
+Runs entirely in memory; no database is needed:
+
+    python -m benchmarks.json_encoding --sizes 10 100 1000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.utils import create_response_field
+
+from app.core.responses import ResponseEncoder
+from app.schemas.academy import AcademyBranch
+
+
+RESPONSE_MODEL = List[AcademyBranch]
+
+
+def synthetic_rows(count: int, rng: random.Random) -> list:
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "user_id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "name": f"Branch {i} – Nasr City",
+            "city": "Cairo",
+            "governorate": "Cairo",
+            "location_url": f"https://maps.example.com/?q={i}",
+            "latitude": Decimal(f"{30 + rng.random():.8f}"),
+            "longitude": Decimal(f"{31 + rng.random():.8f}"),
+            "opening_time": "7:00 AM",
+            "closing_time": "10:00 PM",
+            "operating_days": ["Sat", "Sun", "Mon", "Tue", "Wed"],
+            "created_at": created + timedelta(seconds=i, microseconds=rng.randrange(1_000_000)),
+            "updated_at": created + timedelta(days=1, seconds=i),
+            "internal_notes": "not part of the response model",
+        }
+        for i in range(count)
+    ]
+
+
+def fastapi_default(response_class):
+    """FastAPI's own path: validate, serialize to Python, render with response_class"""
+    field = create_response_field(name="response", type_=RESPONSE_MODEL, mode="serialization")
+
+    def encode(rows) -> bytes:
+        value, errors = field.validate(rows, {}, loc=("response",))
+        assert not errors
+        return response_class(field.serialize(value, by_alias=True)).body
+
+    return encode
+
+
+def timed(encode, rows, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(rows)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def run(sizes: list, repeat: int, seed: int):
+    rng = random.Random(seed)
+    paths = [
+        ("json (default)", fastapi_default(JSONResponse)),
+        ("orjson class", fastapi_default(ORJSONResponse)),
+        ("fast_json", ResponseEncoder(RESPONSE_MODEL).encode),
+        ("fast_json trusted", ResponseEncoder(RESPONSE_MODEL, trusted=True).encode),
+    ]
+
+    print(f"\n{'rows':>6} {'path':>18} {'median ms':>10} {'p95 ms':>8} {'speedup':>8}")
+    for size in sizes:
+        rows = synthetic_rows(size, rng)
+        expected = json.loads(paths[0][1](rows))
+        baseline = None
+
+        for name, encode in paths:
+            assert json.loads(encode(rows)) == expected, f"{name} output differs"
+            median, p95 = timed(encode, rows, max(repeat // size, 20))
+            baseline = baseline or median
+            print(f"{size:>6} {name:>18} {median:>10.3f} {p95:>8.3f} {baseline / median:>7.1f}x")
+
+    print("\n✅ All paths produce the same JSON")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20_000, help="Total rows encoded per path and size")
+    parser.add_argument("--seed", type=int, default=16)
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat, args.seed)
@@ -0,0 +1,133 @@
+"""
+Benchmark /nearby over synthetic branches
+
+Loads --branches synthetic academy/clinic/store branches (default 100k),
+clustered around Egyptian cities the way real ones are, into a GeoIndex and
+compares its nearest-K lookup with what the app does today: take every
+branch, compute each distance, filter by radius and sort. Both must return
+the same branches. Also reports rebuild and single-write update cost.
+
+Runs entirely in memory; no database is needed:
+
+    python -m benchmarks.nearby_branches --branches 100000 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from app.services.geo_index import BranchPoint, GeoIndex, haversine_km
+
+
+CITIES = [
+    ("Cairo", 30.0444, 31.2357, 0.12, 0.40),
+    ("Giza", 30.0131, 31.2089, 0.08, 0.15),
+    ("Alexandria", 31.2001, 29.9187, 0.08, 0.15),
+    ("Mansoura", 31.0409, 31.3785, 0.05, 0.06),
+    ("Tanta", 30.7865, 31.0004, 0.05, 0.05),
+    ("Port Said", 31.2653, 32.3019, 0.04, 0.05),
+    ("Hurghada", 27.2579, 33.8116, 0.06, 0.05),
+    ("Aswan", 24.0889, 32.8998, 0.04, 0.04),
+    ("Assiut", 27.1783, 31.1859, 0.04, 0.05),
+]
+
+
+def synthetic_branch(rng: random.Random) -> BranchPoint:
+    name, lat, lng, spread, _ = rng.choices(CITIES, weights=[c[4] for c in CITIES])[0]
+    kind = rng.choice(("academy", "clinic", "store"))
+    opens = rng.choice((6, 7, 8, 9, 10))
+    closes = rng.choice((18, 20, 22, 23))
+
+    row = {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "name": f"{name} branch",
+        "location_name": f"{name} branch",
+        "city": name,
+        "latitude": rng.gauss(lat, spread),
+        "longitude": rng.gauss(lng, spread),
+        "opening_time": f"{opens}:00 AM",
+        "closing_time": f"{closes - 12}:00 PM",
+        "operating_days": rng.sample(["Sat", "Sun", "Mon", "Tue", "Wed", "Thu", "Fri"], 6),
+        "opening_hour": str(opens), "opening_minute": "00", "opening_ampm": "AM",
+        "closing_hour": str(closes - 12), "closing_minute": "00", "closing_ampm": "PM",
+    }
+    return BranchPoint(kind, row)
+
+
+def linear_nearest(points, lat, lng, radius_km, limit, open_at=None) -> list:
+    """Every branch, every distance, then sort: the download-everything approach"""
+    found = []
+    for point in points:
+        distance = haversine_km(lat, lng, point.lat, point.lng)
+        if distance <= radius_km and (open_at is None or point.is_open(open_at)):
+            found.append((distance, point.id))
+    found.sort()
+    return [branch_id for _, branch_id in found[:limit]]
+
+
+def timed(fn, args_list) -> tuple:
+    timings, results = [], []
+    for args in args_list:
+        start = time.perf_counter()
+        results.append(fn(*args))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1], results
+
+
+def run(branches: int, queries: int, limit: int, seed: int):
+    rng = random.Random(seed)
+    points = [synthetic_branch(rng) for _ in range(branches)]
+
+    index = GeoIndex()
+    start = time.perf_counter()
+    index.rebuild(points)
+    print(f"\n📍 {branches:,} branches in {index.stats()['cells']:,} cells, rebuilt in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    start = time.perf_counter()
+    for point in points[:1000]:
+        index.put(point)
+    print(f"✏️  Branch write applied in {(time.perf_counter() - start) * 1e6 / 1000:.1f}us per update\n")
+
+    evening = datetime(2026, 10, 14, 21, 30)
+    print(f"{'radius km':>9} {'open now':>8} {'impl':>8} {'median ms':>10} {'p99 ms':>8}")
+
+    for radius_km in (5, 10, 50):
+        for open_at in (None, evening):
+            centers = []
+            for _ in range(queries):
+                _, lat, lng, spread, _ = rng.choice(CITIES)
+                centers.append((rng.gauss(lat, spread), rng.gauss(lng, spread)))
+
+            # The linear scan is slow, so it gets a sample of the same queries
+            sample = centers[:max(1, queries // 20)]
+            linear_median, linear_p99, expected = timed(
+                lambda lat, lng: linear_nearest(points, lat, lng, radius_km, limit, open_at), sample
+            )
+            grid_median, grid_p99, results = timed(
+                lambda lat, lng: index.nearest(lat, lng, radius_km, limit, now=open_at, open_only=open_at is not None),
+                centers,
+            )
+
+            for want, got in zip(expected, results):
+                assert want == [r["id"] for r in got], "grid and linear scan disagree"
+
+            label = "yes" if open_at else "no"
+            print(f"{radius_km:>9} {label:>8} {'linear':>8} {linear_median:>10.3f} {linear_p99:>8.3f}")
+            print(f"{radius_km:>9} {label:>8} {'grid':>8} {grid_median:>10.3f} {grid_p99:>8.3f}")
+
+    print("\n✅ Grid results match the linear scan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=14)
+    args = parser.parse_args()
+
+    run(args.branches, args.queries, args.limit, args.seed)
@@ -0,0 +1,207 @@
+"""
+Benchmark order placement for 1/10/50-line carts
+
+Compares orders.create_order with the per-item implementation it replaced
+(one product lookup per line for pricing, another per line for the snapshot,
+one INSERT per line). Reports latency and SQL statements per order.
+
+Everything runs inside one transaction that is rolled back at the end, so
+the fixture users, products and orders never persist. Needs a database with
+the db.sql schema:
+
+    python -m benchmarks.order_placement --iterations 30 --sizes 1 10 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import event
+
+from app.core.database import async_engine, database
+from app.api.endpoints.orders import create_order
+from app.schemas.order import OrderCreate
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark fixtures"""
+
+
+statement_count = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+async def seed(product_count: int) -> tuple:
+    """Create a swimmer, a store and its products; returns (swimmer, store_id, product_ids)"""
+    swimmer_id, store_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+    has_auth_users = await database.fetch_one("SELECT to_regclass('auth.users') IS NOT NULL AS present")
+
+    for user_id, role in ((swimmer_id, "swimmer"), (store_id, "store")):
+        if has_auth_users["present"]:
+            await database.execute("INSERT INTO auth.users (id) VALUES (:id)", {"id": user_id})
+        await database.execute(
+            """
+            INSERT INTO profiles (id, email, full_name, role)
+            VALUES (:id, :email, 'Benchmark User', :role)
+            """,
+            {"id": user_id, "email": f"bench-{user_id}@example.com", "role": role}
+        )
+
+    rows = await database.fetch_all(
+        """
+        INSERT INTO products (store_id, product_name, category, brand, description, price, total_stock)
+        SELECT :store_id, 'Benchmark product ' || g, 'goggles', 'Swim360', 'Benchmark fixture', 10 + g, 100
+        FROM generate_series(1, :count) g
+        RETURNING id
+        """,
+        {"store_id": store_id, "count": product_count}
+    )
+
+    return {"id": swimmer_id, "role": "swimmer"}, store_id, [str(r["id"]) for r in rows]
+
+
+async def legacy_create_order(order_data: OrderCreate, current_user: dict):
+    """The per-item query pattern create_order used before batching"""
+    subtotal = 0
+    for item in order_data.items:
+        product = await database.fetch_one(
+            "SELECT price FROM products WHERE id = :product_id",
+            {"product_id": item.product_id}
+        )
+        subtotal += float(product["price"]) * item.quantity
+
+    service_fee = subtotal * 0.05
+    delivery_fee = 50.0
+    total_amount = subtotal + service_fee + delivery_fee
+
+    new_order = await database.fetch_one(
+        """
+        INSERT INTO orders (
+            order_number, swimmer_id, store_id, delivery_governorate, delivery_city,
+            delivery_address, delivery_phone, subtotal, delivery_fee, service_fee,
+            discount_amount, total_amount, currency, payment_method
+        ) VALUES (
+            :order_number, :swimmer_id, :store_id, :delivery_governorate, :delivery_city,
+            :delivery_address, :delivery_phone, :subtotal, :delivery_fee, :service_fee,
+            0, :total_amount, 'USD', :payment_method
+        ) RETURNING *
+        """,
+        {
+            "order_number": f"ORD-{uuid.uuid4().hex[:8].upper()}",
+            "swimmer_id": current_user["id"],
+            "store_id": order_data.store_id,
+            "delivery_governorate": order_data.delivery_governorate,
+            "delivery_city": order_data.delivery_city,
+            "delivery_address": order_data.delivery_address,
+            "delivery_phone": order_data.delivery_phone,
+            "subtotal": subtotal,
+            "delivery_fee": delivery_fee,
+            "service_fee": service_fee,
+            "total_amount": total_amount,
+            "payment_method": order_data.payment_method.value,
+        }
+    )
+
+    for item in order_data.items:
+        product = await database.fetch_one(
+            "SELECT * FROM products WHERE id = :product_id",
+            {"product_id": item.product_id}
+        )
+        await database.execute(
+            """
+            INSERT INTO order_items (
+                order_id, product_id, product_name, product_brand,
+                selected_size, selected_color, unit_price, quantity, subtotal
+            ) VALUES (
+                :order_id, :product_id, :product_name, :product_brand,
+                :selected_size, :selected_color, :unit_price, :quantity, :subtotal
+            )
+            """,
+            {
+                "order_id": new_order["id"],
+                "product_id": product["id"],
+                "product_name": product["product_name"],
+                "product_brand": product["brand"],
+                "selected_size": item.selected_size,
+                "selected_color": item.selected_color,
+                "unit_price": product["price"],
+                "quantity": item.quantity,
+                "subtotal": float(product["price"]) * item.quantity,
+            }
+        )
+
+    await database.execute(
+        "DELETE FROM cart_items WHERE swimmer_id = :swimmer_id",
+        {"swimmer_id": current_user["id"]}
+    )
+
+    return new_order
+
+
+async def measure(place_order, order_data: OrderCreate, swimmer: dict, iterations: int) -> dict:
+    global statement_count
+    timings = []
+    statement_count = 0
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await place_order(order_data, swimmer)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "statements": statement_count / iterations,
+    }
+
+
+async def run(iterations: int, sizes: list):
+    await database.connect()
+
+    try:
+        async with database.transaction():
+            swimmer, store_id, product_ids = await seed(max(sizes))
+
+            print(f"\n🛒 Order placement, {iterations} orders per cart size\n")
+            print(f"{'lines':>6} {'impl':>8} {'median ms':>10} {'p95 ms':>8} {'stmts/order':>12}")
+
+            for size in sizes:
+                order_data = OrderCreate(
+                    store_id=store_id,
+                    items=[{"product_id": pid, "quantity": 2} for pid in product_ids[:size]],
+                    delivery_governorate="Cairo",
+                    delivery_city="Nasr City",
+                    delivery_address="1 Benchmark St",
+                    delivery_phone="0100000000",
+                    payment_method="cash_on_delivery",
+                )
+
+                for name, place_order in (("legacy", legacy_create_order), ("batched", create_order)):
+                    result = await measure(place_order, order_data, swimmer, iterations)
+                    print(
+                        f"{size:>6} {name:>8} {result['median']:>10.2f} "
+                        f"{result['p95']:>8.2f} {result['statements']:>12.1f}"
+                    )
+
+            raise _Rollback()
+    except _Rollback:
+        print("\n🧹 Fixtures rolled back")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    asyncio.run(run(args.iterations, args.sizes))
@@ -0,0 +1,175 @@
+"""
+Benchmark the rate limiter's per-request overhead and cross-worker accuracy
+
+Times RateLimiter.check() for anonymous clients (spread over --clients IPs),
+a signed-in user (token claims already cached) and /auth/login (two
+buckets), plus the whole RateLimitMiddleware in front of an empty ASGI app.
+Checks that a client sending a different X-Forwarded-For on every login
+(through ProxyHeadersMiddleware, trusting any proxy) stays in one per-IP
+bucket, and that login attempts on one account from rotating addresses
+share its per-account bucket. Then starts --processes processes that
+hammer one bucket for --seconds and checks that together they were
+allowed what one bucket allows (capacity + refill over the run), not that
+much per process.
+
+Uses a throwaway bucket file; no database is needed:
+
+    python -m benchmarks.rate_limit --calls 200000 --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from app.core.config import settings
+from app.core.proxy_headers import ProxyHeadersMiddleware
+from app.core.rate_limit import RateLimiter, RateLimitMiddleware, SharedBuckets, key_hash
+from app.core.security import create_access_token, verify_access_token
+
+
+def scope_for(path: str, ip: str, token: str = None) -> dict:
+    headers = [(b"host", b"api.swim360.test"), (b"user-agent", b"swim360-app/2.4")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": "GET", "path": path, "client": (ip, 50000), "headers": headers}
+
+
+def per_call_us(run, calls: int, rounds: int = 5) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for i in range(calls):
+            run(i)
+        timings.append((time.perf_counter() - start) / calls * 1e6)
+    return statistics.median(timings)
+
+
+async def middleware_us(limiter: RateLimiter, scope: dict, calls: int) -> tuple:
+    async def app(scope, receive, send):
+        pass
+
+    async def timed(handler) -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            await handler(scope, None, None)
+        return (time.perf_counter() - start) / calls * 1e6
+
+    bare = await timed(app)
+    limited = await timed(RateLimitMiddleware(app, limiter))
+    return bare, limited
+
+
+async def spoofed_logins(limiter: RateLimiter, attempts: int) -> tuple:
+    """(requests let through, account attempts allowed) out of attempts each"""
+    passed = []
+
+    async def app(scope, receive, send):
+        passed.append(scope["client"][0])
+
+    async def send(message):
+        pass
+
+    chain = ProxyHeadersMiddleware(RateLimitMiddleware(app, limiter))
+    path = f"/api/{settings.api_version}/auth/login"
+    for i in range(attempts):
+        # The caller forges the left part; the proxy appends the address it saw
+        scope = scope_for(path, "10.0.0.9")
+        scope["headers"].append((b"x-forwarded-for", f"198.51.{i >> 8 & 255}.{i & 255}, 203.0.113.50".encode()))
+        await chain(scope, None, send)
+
+    accounts = sum(1 for _ in range(attempts) if not limiter.check_account("login", "Victim@example.com"))
+    return len(set(passed)), len(passed), accounts
+
+
+def hammer(path: str, max_keys: int, capacity: int, seconds: float, start_at: float, allowed) -> None:
+    buckets = SharedBuckets(path, max_keys)
+    key = key_hash("ip:203.0.113.7")
+    while time.monotonic() < start_at:
+        pass
+
+    count = 0
+    first = time.monotonic()
+    while time.monotonic() < start_at + seconds:
+        if not buckets.take(key, capacity, capacity / 60.0, time.monotonic()):
+            count += 1
+    allowed.put((count, first))
+
+
+def run(calls: int, clients: int, processes: int, seconds: float):
+    path = os.path.join(tempfile.mkdtemp(), "rate-limit")
+    buckets = SharedBuckets(path, settings.rate_limit_max_keys)
+    limiter = RateLimiter(buckets)
+
+    # Large enough that nothing gets limited: we're timing the bookkeeping
+    settings.rate_limit_per_minute = settings.rate_limit_auth_per_minute = 10 ** 9
+    limiter.route_limits = dict.fromkeys(limiter.route_limits, 10 ** 9)
+
+    token = create_access_token({"sub": "5a4b9a9e-8f4c-4c1e-9d1e-3b1f2a6c7d80"})
+    verify_access_token(token)
+
+    anonymous = [scope_for("/api/v1/academies/all", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}") for i in range(clients)]
+    signed_in = scope_for("/api/v1/chat/conversations", "10.0.0.1", token)
+    login = scope_for(f"/api/{settings.api_version}/auth/login", "10.0.0.2")
+
+    print(f"\n⏱️  RateLimiter.check() over {calls} calls, table of {settings.rate_limit_max_keys} keys")
+    print(f"{'case':>34} {'us/call':>8}")
+    print(f"{'anonymous, ' + str(clients) + ' IPs':>34} {per_call_us(lambda i: limiter.check(anonymous[i % clients]), calls):>8.2f}")
+    print(f"{'signed in (cached claims)':>34} {per_call_us(lambda i: limiter.check(signed_in), calls):>8.2f}")
+    print(f"{'/auth/login (two buckets)':>34} {per_call_us(lambda i: limiter.check(login), calls):>8.2f}")
+    print(f"{'SharedBuckets.take() alone':>34} {per_call_us(lambda i: buckets.take(i % clients + 1, 1e9, 1e9, time.monotonic()), calls):>8.2f}")
+
+    bare, limited = asyncio.run(middleware_us(limiter, signed_in, calls))
+    print(f"{'middleware, signed in':>34} {limited - bare:>8.2f}  (empty app {bare:.2f}, with limiter {limited:.2f})")
+
+    # Forged X-Forwarded-For must not buy more than one client's login limit
+    auth_limit = 10
+    settings.rate_limit_auth_per_minute = auth_limit
+    settings.forwarded_allow_ips, settings.forwarded_hops = "*", 1
+    clients_seen, passed, accounts = asyncio.run(spoofed_logins(RateLimiter(buckets), 5 * auth_limit))
+    print(f"\n🕵️  {5 * auth_limit} logins with a new forged X-Forwarded-For each ({auth_limit}/min per IP and account)")
+    print(f"   seen as {clients_seen} client(s), let through {passed}; one account from rotating IPs allowed {accounts}")
+    print(
+        "✅ Forged addresses share one bucket" if (clients_seen, passed, accounts) == (1, auth_limit, auth_limit)
+        else "❌ Forged addresses get around the login limit"
+    )
+
+    # Several processes sharing one bucket must get what a single bucket allows
+    capacity = 600
+    context = multiprocessing.get_context("spawn")
+    allowed = context.Queue()
+    start_at = time.monotonic() + 3.0
+    workers = [
+        context.Process(target=hammer, args=(path, settings.rate_limit_max_keys, capacity, seconds, start_at, allowed))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    results = [allowed.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    # The bucket starts full at its first take (late if a process was slow to start)
+    counts = [count for count, _ in results]
+    started = min(first for _, first in results)
+    expected = capacity + capacity / 60.0 * (start_at + seconds - started)
+    total = sum(counts)
+    print(f"\n🔀 {processes} processes on one bucket ({capacity}/min) for {seconds:.0f}s")
+    print(f"   allowed {total} (per process {counts}); one bucket allows {expected:.0f}")
+    print("✅ Limit shared across processes" if abs(total - expected) <= 2 else "❌ Processes don't share the bucket")
+
+    buckets.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    run(args.calls, args.clients, args.processes, args.seconds)
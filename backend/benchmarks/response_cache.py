@@ -0,0 +1,86 @@
+"""
+Check and time the response cache on the public catalog endpoints
+
+Calls each @cached list endpoint the way the app does (no query parameters)
+through the ASGI app in-process, and checks that the second call is served
+from the cache (X-Cache: HIT) and that stream=true is never cached. Then
+times --iterations uncached calls (cache cleared before each) against
+cached ones. Exits non-zero if a check fails.
+
+Needs a database with the db.sql schema (an empty one will do):
+
+    python -m benchmarks.response_cache --iterations 200
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.response_cache import response_cache
+
+# (path, whether it takes stream=true)
+ENDPOINTS = [
+    ("/api/v1/academies/all", True),
+    ("/api/v1/clinics/services/all", True),
+    ("/api/v1/products", False),
+    ("/api/v1/events", False),
+]
+
+
+async def timed(client: httpx.AsyncClient, path: str, iterations: int, clear: bool) -> float:
+    """Median ms per GET"""
+    samples = []
+    for _ in range(iterations):
+        if clear:
+            response_cache.clear()
+        start = time.perf_counter()
+        response = await client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return statistics.median(samples)
+
+
+async def run(iterations: int) -> bool:
+    # Measure the cache, not the per-IP limit all these calls would run into
+    settings.rate_limit_enabled = False
+    from app.main import app
+
+    ok = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"\n🗄️  Response cache, {iterations} calls per case")
+        print(f"{'endpoint':>32} {'1st':>5} {'2nd':>5} {'stream':>7} {'miss ms':>8} {'hit ms':>7}")
+
+        for path, streams in ENDPOINTS:
+            response_cache.clear()
+            first = (await client.get(path)).headers.get("X-Cache")
+            second = (await client.get(path)).headers.get("X-Cache")
+            streamed = None
+            if streams:
+                await client.get(path, params={"stream": "true"})
+                streamed = (await client.get(path, params={"stream": "true"})).headers.get("X-Cache")
+
+            miss = await timed(client, path, iterations, clear=True)
+            hit = await timed(client, path, iterations, clear=False)
+            print(f"{path.removeprefix('/api/v1'):>32} {first:>5} {second:>5} {streamed or '-':>7} {miss:>8.2f} {hit:>7.2f}")
+
+            if (first, second) != ("MISS", "HIT"):
+                print(f"   ❌ {path}: expected MISS then HIT")
+                ok = False
+            if streamed == "HIT":
+                print(f"   ❌ {path}?stream=true was served from the cache")
+                ok = False
+
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run(args.iterations)) else 1)
@@ -0,0 +1,150 @@
+"""
+Benchmark the storage bucket check every worker runs at startup
+
+Starts a stand-in for the Supabase Storage bucket API in a separate process
+(GET/POST /storage/v1/bucket, answering after --latency-ms) and times:
+
+- the old check: supabase-py's synchronous client, listing the buckets once
+  per bucket and creating the missing ones one after another
+- initialize_storage_buckets(): one listing, missing buckets created
+  concurrently
+- initialize_storage_buckets() with a fresh storage_buckets_marker_path file
+
+each on a cold storage project (no buckets yet) and a warm one (all there),
+with the number of storage requests it took.
+
+No Supabase project or database is needed:
+
+    python -m benchmarks.storage_startup --latency-ms 80
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.storage_uploads import free_port, wait_for_server
+
+
+def serve_buckets(port: int, latency_ms: float) -> None:
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    buckets = {}
+    requests = {"count": 0}
+
+    async def bucket_api(request):
+        requests["count"] += 1
+        await asyncio.sleep(latency_ms / 1000)
+        if request.method == "GET":
+            return JSONResponse(list(buckets.values()))
+        body = await request.json()
+        if body["id"] in buckets:
+            return JSONResponse({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}, 400)
+        buckets[body["id"]] = {
+            "id": body["id"],
+            "name": body["name"],
+            "owner": "",
+            "public": body.get("public", False),
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "file_size_limit": None,
+            "allowed_mime_types": None,
+        }
+        return JSONResponse({"name": body["id"]})
+
+    async def control(request):
+        # GET: requests served so far; DELETE: drop every bucket and reset the count
+        if request.method == "DELETE":
+            buckets.clear()
+            requests["count"] = 0
+        return JSONResponse(requests)
+
+    app = Starlette(routes=[
+        Route("/storage/v1/bucket", bucket_api, methods=["GET", "POST"]),
+        Route("/bench/requests", control, methods=["GET", "DELETE"]),
+    ])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def run(latency_ms: float):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    os.environ["SUPABASE_URL"] = url
+    os.environ["STORAGE_PROVIDER"] = "supabase"
+
+    import httpx
+    from supabase import create_client
+    from app.core.config import settings
+    from app.core.storage import media_storage
+    from app.core.supabase import STORAGE_BUCKETS, initialize_storage_buckets
+
+    server = multiprocessing.get_context("spawn").Process(target=serve_buckets, args=(port, latency_ms), daemon=True)
+    server.start()
+    marker_dir = tempfile.mkdtemp()
+    try:
+        await wait_for_server(port)
+        control = httpx.AsyncClient(base_url=url)
+        sync_storage = create_client(url, settings.supabase_service_key).storage
+        # Built once per worker either way (loading CA certificates takes tens of ms)
+        media_storage.backend.client
+
+        async def sequential():
+            # As initialize_storage_buckets did before
+            for bucket in STORAGE_BUCKETS:
+                if bucket not in [b.name for b in sync_storage.list_buckets()]:
+                    sync_storage.create_bucket(bucket, options={"public": True})
+
+        async def quietly():
+            with contextlib.redirect_stdout(io.StringIO()):
+                await initialize_storage_buckets()
+
+        async def measure(check, cold: bool) -> tuple:
+            """(ms taken, storage requests made) by one startup check"""
+            if cold:
+                await control.delete("/bench/requests")
+            else:
+                await quietly()
+            before = (await control.get("/bench/requests")).json()["count"]
+            start = time.perf_counter()
+            await check()
+            elapsed = (time.perf_counter() - start) * 1000
+            after = (await control.get("/bench/requests")).json()["count"]
+            return elapsed, after - before
+
+        print(f"\n🪣 {len(STORAGE_BUCKETS)} buckets, storage answering after {latency_ms:.0f} ms")
+        print(f"{'startup check':>36} {'project':>8} {'ms':>8} {'requests':>9}")
+
+        settings.storage_buckets_marker_path = None
+        for cold in (True, False):
+            elapsed, count = await measure(sequential, cold)
+            print(f"{'supabase-py, sequential (before)':>36} {'cold' if cold else 'warm':>8} {elapsed:>8.1f} {count:>9}")
+        for cold in (True, False):
+            elapsed, count = await measure(quietly, cold)
+            print(f"{'initialize_storage_buckets':>36} {'cold' if cold else 'warm':>8} {elapsed:>8.1f} {count:>9}")
+
+        settings.storage_buckets_marker_path = os.path.join(marker_dir, "buckets-verified.json")
+        elapsed, count = await measure(quietly, False)
+        print(f"{'  + verified marker':>36} {'warm':>8} {elapsed:>8.1f} {count:>9}")
+
+        await control.aclose()
+        await media_storage.close()
+    finally:
+        server.terminate()
+        server.join()
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(marker_dir, "buckets-verified.json"))
+            os.rmdir(marker_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.latency_ms))
@@ -0,0 +1,137 @@
+"""
+Benchmark how much uploading photos stalls the rest of a worker
+
+Starts a stand-in for the Supabase Storage API in a separate process
+(accepts POST /storage/v1/object/<bucket>/<path>, answers after
+--latency-ms) and uploads --files photos of --size-kb each, once with the
+synchronous supabase-py storage client (what upload_file used to call) and
+once through media_storage. Meanwhile a ticker on the same event loop stands
+in for chat traffic: we report how late its 10 ms timer fired at worst.
+
+No Supabase project or database is needed:
+
+    python -m benchmarks.storage_uploads --files 10 --size-kb 500 --latency-ms 150
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+
+TICK_SECONDS = 0.01
+
+
+def serve_storage(port: int, latency_ms: float) -> None:
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def put_object(request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        await asyncio.sleep(latency_ms / 1000)
+        return JSONResponse({"Key": f"{request.path_params['bucket']}/{request.path_params['path']}", "size": size})
+
+    app = Starlette(routes=[Route("/storage/v1/object/{bucket}/{path:path}", put_object, methods=["POST"])])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(port: int) -> None:
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("Stand-in storage server did not start")
+
+
+async def measure(upload_all) -> tuple:
+    """(seconds taken, worst ticker lag in ms) while upload_all() runs"""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            expected = loop.time() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            worst = max(worst, loop.time() - expected)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS * 2)
+    start = time.perf_counter()
+    await upload_all()
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return elapsed, worst * 1000
+
+
+async def run(files: int, size_kb: int, latency_ms: float):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    os.environ["SUPABASE_URL"] = url
+
+    from supabase import create_client
+    from app.core.config import settings
+    from app.core.storage import MediaStorage, SupabaseStorage
+
+    server = multiprocessing.get_context("spawn").Process(target=serve_storage, args=(port, latency_ms), daemon=True)
+    server.start()
+    try:
+        await wait_for_server(port)
+        photos = [os.urandom(size_kb * 1024) for _ in range(files)]
+        settings.max_file_size_mb = max(settings.max_file_size_mb, size_kb // 1024 + 1)
+
+        sync_client = create_client(url, settings.supabase_service_key)
+
+        async def blocking():
+            # As upload_file did before: the sync client called inside async def
+            for i, photo in enumerate(photos):
+                sync_client.storage.from_("product-photos").upload(
+                    f"bench/sync-{i}.jpg", photo, file_options={"content-type": "image/jpeg"}
+                )
+
+        storage = MediaStorage(SupabaseStorage(url, settings.supabase_service_key))
+        # Built once per worker (loading CA certificates takes tens of ms): not part of an upload
+        storage.backend.client
+
+        async def streaming():
+            await asyncio.gather(*(
+                storage.upload("product-photos", f"bench/async-{i}.jpg", photo, "image/jpeg")
+                for i, photo in enumerate(photos)
+            ))
+
+        print(f"\n📤 {files} photos of {size_kb} KB, storage answering after {latency_ms:.0f} ms")
+        print(f"   (at most {settings.storage_max_concurrent_uploads} uploads in flight per worker)")
+        print(f"{'client':>26} {'total s':>8} {'worst loop lag ms':>18}")
+        for name, upload_all in (("supabase-py (sync)", blocking), ("media_storage (async)", streaming)):
+            elapsed, lag = await measure(upload_all)
+            print(f"{name:>26} {elapsed:>8.2f} {lag:>18.1f}")
+
+        await storage.close()
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--size-kb", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.files, args.size_kb, args.latency_ms))
@@ -0,0 +1,189 @@
+"""
+Benchmark marketplace search over a synthetic used_items table
+
+Fills a temporary copy of used_items (same columns, generated search_vector
+and indexes as the real table) with --rows synthetic listings (default 1M),
+then compares the ILIKE '%term%' query stores.get_used_items used to run
+with the ranked full-text/trigram search and the newest-first browse page
+it runs now. Reports latency per search term, including a typo and a
+half-typed word.
+
+The temporary table shadows public.used_items for this session only and is
+dropped when the transaction is rolled back, so real listings are never
+touched. Needs a database with the db.sql schema (including pg_trgm):
+
+    python -m benchmarks.used_items_search --rows 1000000 --iterations 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import Response
+
+from app.core.database import database
+from app.api.endpoints.stores import get_used_items
+
+
+# Plain search, multi-word, prefix (search-as-you-type) and a typo
+SEARCH_TERMS = ["goggles", "speedo fins", "arena sui", "gogles"]
+
+BRANDS = ["Speedo", "Arena", "TYR", "Finis", "Zoggs", "Aqua Sphere", "Mad Wave", "Head", "Nike", "Funkita"]
+ITEMS = ["goggles", "swim cap", "racing suit", "kickboard", "hand paddles", "drag parachute",
+         "training fins", "center snorkel", "jammer", "tech suit", "pull buoy", "backpack"]
+COLORS = ["black", "blue", "red", "white", "green", "pink", "silver", "orange", "navy", "yellow"]
+CONDITIONS = ["new", "like_new", "excellent", "good", "fair"]
+CATEGORIES = ["goggles", "cap", "suit", "kickboard", "paddles", "parachute", "fins", "snorkels", "suit", "apparel", "other", "other"]
+GOVERNORATES = ["Cairo", "Giza", "Alexandria", "Dakahlia", "Sharqia", "Red Sea"]
+
+
+class _Rollback(Exception):
+    """Raised to discard the benchmark fixtures"""
+
+
+async def seed(rows: int) -> None:
+    """Create the shadowing temp table, fill it and build its indexes"""
+    await database.execute(
+        "CREATE TEMP TABLE used_items (LIKE public.used_items INCLUDING ALL EXCLUDING INDEXES) ON COMMIT DROP"
+    )
+    await database.execute("SELECT setseed(0.36)")
+
+    # Brand, colour and place are drawn independently of the item so titles share
+    # words across listings the way real ones do
+    await database.execute(
+        """
+        INSERT INTO used_items (
+            seller_id, title, description, category, brand, condition, price,
+            contact_phone, governorate, is_sold, created_at
+        )
+        SELECT gen_random_uuid(),
+               brand || ' ' || item || ' ' || color,
+               'Used ' || item || ' by ' || brand || ', ' || color || '. Worn for '
+                   || (1 + g % 24) || ' months, pickup in ' || governorate || '.',
+               CAST(category AS product_category_type), brand,
+               CAST(condition AS product_condition_type),
+               round((5 + random() * 300)::numeric, 2), '0100000000', governorate,
+               random() < 0.1, NOW() - g * interval '1 minute'
+        FROM (
+            SELECT g, brand, color, condition, governorate,
+                   (CAST(:items AS text[]))[idx] AS item,
+                   (CAST(:categories AS text[]))[idx] AS category
+            FROM (
+                SELECT g,
+                       1 + floor(random() * cardinality(CAST(:items AS text[])))::int AS idx,
+                       (CAST(:brands AS text[]))[1 + floor(random() * cardinality(CAST(:brands AS text[])))::int] AS brand,
+                       (CAST(:colors AS text[]))[1 + floor(random() * cardinality(CAST(:colors AS text[])))::int] AS color,
+                       (CAST(:conditions AS text[]))[1 + floor(random() * cardinality(CAST(:conditions AS text[])))::int] AS condition,
+                       (CAST(:governorates AS text[]))[1 + floor(random() * cardinality(CAST(:governorates AS text[])))::int] AS governorate
+                FROM generate_series(1, :rows) g
+            ) draws
+        ) synthetic
+        """,
+        {
+            "rows": rows, "brands": BRANDS, "items": ITEMS, "categories": CATEGORIES,
+            "colors": COLORS, "conditions": CONDITIONS, "governorates": GOVERNORATES,
+        }
+    )
+
+    # Build whatever indexes the real table has, after the bulk load
+    indexes = await database.fetch_all(
+        """
+        SELECT indexdef FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename = 'used_items'
+        """
+    )
+    for index in indexes:
+        await database.execute(index["indexdef"].replace(" ON public.used_items ", " ON pg_temp.used_items "))
+
+    # Temp tables are invisible to autovacuum
+    await database.execute("ANALYZE pg_temp.used_items")
+    print(f"📦 {rows:,} synthetic listings, {len(indexes)} indexes")
+
+
+async def legacy_search(search: str) -> list:
+    """The ILIKE query get_used_items ran before search was indexed (no LIMIT)"""
+    return await database.fetch_all(
+        """
+        SELECT * FROM used_items
+        WHERE is_active = true AND is_sold = false
+        AND (title ILIKE :search OR description ILIKE :search)
+        ORDER BY created_at DESC
+        """,
+        {"search": f"%{search}%"}
+    )
+
+
+async def current_search(search, cursor=None) -> tuple:
+    response = Response()
+    items = await get_used_items(
+        response, category=None, condition=None, min_price=None, max_price=None,
+        governorate=None, search=search, limit=20, cursor=cursor,
+    )
+    return items, response.headers.get("X-Next-Cursor")
+
+
+async def measure(run, iterations: int) -> dict:
+    timings = []
+    result = None
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = await run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "result": result,
+    }
+
+
+def _row(label: str, impl: str, stats: dict, rows: int) -> None:
+    print(f"{label:>14} {impl:>10} {stats['median']:>10.2f} {stats['p95']:>8.2f} {rows:>9,}")
+
+
+async def run(rows: int, iterations: int, legacy_iterations: int):
+    await database.connect()
+
+    try:
+        async with database.transaction():
+            start = time.perf_counter()
+            await seed(rows)
+            print(f"⏱️  Seeded in {time.perf_counter() - start:.1f}s\n")
+
+            print(f"{'search':>14} {'impl':>10} {'median ms':>10} {'p95 ms':>8} {'rows':>9}")
+
+            for term in SEARCH_TERMS:
+                legacy = await measure(lambda: legacy_search(term), legacy_iterations)
+                _row(term, "ilike", legacy, len(legacy["result"]))
+
+                ranked = await measure(lambda: current_search(term), iterations)
+                items, next_cursor = ranked["result"]
+                _row(term, "ranked", ranked, len(items))
+
+                if next_cursor:
+                    page = await measure(lambda: current_search(term, next_cursor), iterations)
+                    _row(term, "page 2", page, len(page["result"][0]))
+
+                if items:
+                    print(f"{'':>14} top hit: {items[0]['title']}")
+
+            browse = await measure(lambda: current_search(None), iterations)
+            _row("(browse)", "newest", browse, len(browse["result"][0]))
+
+            raise _Rollback()
+    except _Rollback:
+        print("\n🧹 Synthetic listings dropped")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--legacy-iterations", type=int, default=3, help="The ILIKE scan is slow; fewer runs")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.rows, args.iterations, args.legacy_iterations))
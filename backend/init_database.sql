@@ -324,6 +324,30 @@ CREATE TABLE IF NOT EXISTS notifications (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Uploaded media, stored once per content hash and reference counted
+CREATE TABLE IF NOT EXISTS media_objects (
+    bucket TEXT NOT NULL,
+    content_hash CHAR(64) NOT NULL, -- SHA-256 of the uploaded bytes
+    path TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    size BIGINT NOT NULL,
+    variants JSONB,
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    stored BOOLEAN NOT NULL DEFAULT TRUE, -- False while the first upload is still in flight
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (bucket, content_hash),
+    UNIQUE (bucket, path)
+);
+
+CREATE TABLE IF NOT EXISTS media_references (
+    bucket TEXT NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    owner_id UUID NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    PRIMARY KEY (bucket, content_hash, owner_id),
+    FOREIGN KEY (bucket, content_hash) REFERENCES media_objects(bucket, content_hash) ON DELETE CASCADE
+);
+
 -- ============================================
 -- INDEXES FOR PERFORMANCE
 -- ============================================
@@ -360,6 +384,16 @@ CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
 CREATE INDEX IF NOT EXISTS idx_used_items_user ON used_items(user_id);
 CREATE INDEX IF NOT EXISTS idx_used_items_status ON used_items(status);
 
+-- Used items search: full-text vector maintained by Postgres, plus trigrams for typos
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE used_items ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(brand, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_used_items_search ON used_items USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_used_items_title_trgm ON used_items USING GIN (title gin_trgm_ops);
+
 -- Shared indexes
 CREATE INDEX IF NOT EXISTS idx_reviews_user ON reviews(user_id);
 CREATE INDEX IF NOT EXISTS idx_reviews_target ON reviews(target_type, target_id);
@@ -367,6 +401,35 @@ CREATE INDEX IF NOT EXISTS idx_chat_sender ON chat_messages(sender_id);
 CREATE INDEX IF NOT EXISTS idx_chat_receiver ON chat_messages(receiver_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id);
 
+-- Branch coordinates, for /nearby (served from an in-memory grid, so no spatial index)
+ALTER TABLE academy_branches ADD COLUMN IF NOT EXISTS latitude DECIMAL(10, 8);
+ALTER TABLE academy_branches ADD COLUMN IF NOT EXISTS longitude DECIMAL(11, 8);
+ALTER TABLE clinic_branches ADD COLUMN IF NOT EXISTS latitude DECIMAL(10, 8);
+ALTER TABLE clinic_branches ADD COLUMN IF NOT EXISTS longitude DECIMAL(11, 8);
+ALTER TABLE store_branches ADD COLUMN IF NOT EXISTS latitude DECIMAL(10, 8);
+ALTER TABLE store_branches ADD COLUMN IF NOT EXISTS longitude DECIMAL(11, 8);
+
+-- Resized/WebP variants of uploaded photos, {photo URL: thumb/medium/large URLs}
+ALTER TABLE IF EXISTS profiles ADD COLUMN IF NOT EXISTS photo_variants JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE IF EXISTS branches ADD COLUMN IF NOT EXISTS photo_variants JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE IF EXISTS products ADD COLUMN IF NOT EXISTS photo_variants JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE IF EXISTS used_items ADD COLUMN IF NOT EXISTS photo_variants JSONB NOT NULL DEFAULT '{}';
+
+-- Rows created before uploads reserved them first are all stored
+ALTER TABLE IF EXISTS media_objects ADD COLUMN IF NOT EXISTS stored BOOLEAN NOT NULL DEFAULT TRUE;
+
+-- Chat history (conversations/messages) keyset pagination, newest first
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON messages(conversation_id, created_at DESC, id DESC) WHERE is_deleted = false;
+
+-- Public /all lists: newest-first pages and keyset batches when streamed
+CREATE INDEX IF NOT EXISTS idx_academy_details_created ON academy_details(created_at DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_academy_branches_created ON academy_branches(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_academy_programs_created ON academy_programs(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_clinic_details_created ON clinic_details(created_at DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_clinic_branches_created ON clinic_branches(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_clinic_services_created ON clinic_services(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_store_details_created ON store_details(created_at DESC, user_id DESC);
+
 -- ============================================
 -- TRIGGER FUNCTIONS FOR updated_at
 -- ============================================
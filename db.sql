@@ -63,6 +63,9 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram matching for typo-tolerant marketplace search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- =====================================================
 -- ENUMS
 -- =====================================================
@@ -200,6 +203,7 @@ CREATE TABLE profiles (
   phone VARCHAR(20),
   whatsapp_number VARCHAR(20),
   profile_photo_url TEXT,
+  photo_variants JSONB NOT NULL DEFAULT '{}', -- {photo URL: thumb/medium/large URLs}
   bio TEXT,
   date_of_birth DATE,
   gender VARCHAR(20),
@@ -337,6 +341,7 @@ CREATE TABLE branches (
   -- Metadata
   is_active BOOLEAN DEFAULT true,
   branch_photo_url TEXT,
+  photo_variants JSONB NOT NULL DEFAULT '{}',
 
   -- Timestamps
   created_at TIMESTAMPTZ DEFAULT NOW(),
@@ -600,6 +605,7 @@ CREATE TABLE products (
 
   -- Media
   photos TEXT[], -- Array of photo URLs
+  photo_variants JSONB NOT NULL DEFAULT '{}', -- {photo URL: thumb/medium/large URLs}
   intro_video_url TEXT,
 
   -- Variants
@@ -895,6 +901,7 @@ CREATE TABLE used_items (
 
   -- Media
   photos TEXT[],
+  photo_variants JSONB NOT NULL DEFAULT '{}',
 
   -- Contact
   contact_phone VARCHAR(20) NOT NULL,
@@ -910,6 +917,13 @@ CREATE TABLE used_items (
   is_active BOOLEAN DEFAULT true,
   view_count INTEGER DEFAULT 0,
 
+  -- Search (kept in sync by Postgres on every insert/update)
+  search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(brand, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+  ) STORED,
+
   -- Timestamps
   sold_at TIMESTAMPTZ,
   created_at TIMESTAMPTZ DEFAULT NOW(),
@@ -1140,6 +1154,40 @@ CREATE TABLE user_activity_logs (
   created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- =====================================================
+-- UPLOADED MEDIA (content-addressed, reference counted)
+-- =====================================================
+
+-- One row per stored object; identical uploads share it. The row is
+-- inserted (stored = false) before the object is uploaded, so every upload
+-- in flight holds a reference, and the object is removed from storage when
+-- ref_count drops to 0.
+CREATE TABLE media_objects (
+  bucket TEXT NOT NULL,
+  content_hash CHAR(64) NOT NULL, -- SHA-256 of the uploaded bytes
+  path TEXT NOT NULL, -- Object in the bucket (the large variant for processed photos)
+  content_type TEXT NOT NULL,
+  size BIGINT NOT NULL,
+  variants JSONB, -- Rendered sizes (width/height), null when stored as uploaded
+  ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+  stored BOOLEAN NOT NULL DEFAULT TRUE, -- False while the first upload is still in flight
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+
+  PRIMARY KEY (bucket, content_hash),
+  UNIQUE (bucket, path)
+);
+
+-- Who holds the references, so users can only release their own
+CREATE TABLE media_references (
+  bucket TEXT NOT NULL,
+  content_hash CHAR(64) NOT NULL,
+  owner_id UUID NOT NULL,
+  ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+
+  PRIMARY KEY (bucket, content_hash, owner_id),
+  FOREIGN KEY (bucket, content_hash) REFERENCES media_objects(bucket, content_hash) ON DELETE CASCADE
+);
+
 -- =====================================================
 -- INDEXES FOR PERFORMANCE
 -- =====================================================
@@ -1163,6 +1211,9 @@ CREATE INDEX idx_programs_active ON programs(is_active);
 CREATE INDEX idx_services_clinic ON services(clinic_id);
 CREATE INDEX idx_services_category ON services(category);
 
+-- Academy coaches (academy profile page)
+CREATE INDEX idx_academy_coaches_academy ON academy_coaches(academy_id);
+
 -- Bookings
 CREATE INDEX idx_bookings_swimmer ON bookings(swimmer_id);
 CREATE INDEX idx_bookings_provider ON bookings(provider_id);
@@ -1197,11 +1248,18 @@ CREATE INDEX idx_notifications_created ON notifications(created_at);
 -- Messages
 CREATE INDEX idx_messages_conversation ON messages(conversation_id);
 CREATE INDEX idx_messages_sender ON messages(sender_id);
+-- Keyset pagination of a conversation's history (newest first)
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at DESC, id DESC) WHERE is_deleted = false;
 
 -- Cart items
 CREATE INDEX idx_cart_swimmer ON cart_items(swimmer_id);
 CREATE INDEX idx_cart_store ON cart_items(store_id);
 
+-- Used items marketplace: newest-first browsing, full-text and typo-tolerant search
+CREATE INDEX idx_used_items_listing ON used_items(created_at DESC, id DESC) WHERE is_active = true AND is_sold = false;
+CREATE INDEX idx_used_items_search ON used_items USING GIN (search_vector);
+CREATE INDEX idx_used_items_title_trgm ON used_items USING GIN (title gin_trgm_ops);
+
 -- =====================================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
 -- =====================================================
@@ -1234,6 +1292,9 @@ ALTER TABLE conversations ENABLE ROW LEVEL SECURITY;
 ALTER TABLE messages ENABLE ROW LEVEL SECURITY;
 ALTER TABLE favorites ENABLE ROW LEVEL SECURITY;
 ALTER TABLE saved_payment_methods ENABLE ROW LEVEL SECURITY;
+-- Backend only: no policies
+ALTER TABLE media_objects ENABLE ROW LEVEL SECURITY;
+ALTER TABLE media_references ENABLE ROW LEVEL SECURITY;
 
 -- Profiles: Users can read all profiles, but only update their own
 CREATE POLICY "Public profiles are viewable by everyone"